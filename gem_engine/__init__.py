@@ -0,0 +1,13 @@
+"""Gem Catcher engine: the one simulation behind every game variant.
+
+    from gem_engine import load_game, run_session
+    game = run_session(load_game("template", seed=1))
+
+The root-level scripts (template.py, Final_project.py, ...) are presets of
+this package; see presets.py.  OpenGL is only loaded when a window is
+opened (render.py), never for headless sessions.
+"""
+from .headless import load_game, load_module, new_game, run_session, state_digest
+from .presets import PRESETS, play
+
+__all__ = ["PRESETS", "load_game", "load_module", "new_game", "play", "run_session", "state_digest"]
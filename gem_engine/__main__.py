@@ -0,0 +1,4 @@
+# python -m gem_engine [SESSIONS] [PRESET]: headless soak run, see headless.main
+from .headless import main
+
+main()
@@ -0,0 +1,78 @@
+"""Time-sliced scheduler for expensive per-agent AI decisions.
+
+Cheap work (moving along the current plan) runs for every agent every
+frame.  Expensive work (path checks, line of sight, picking a target) goes
+through run(): agents are visited round-robin, resuming where the last
+frame stopped, until the frame's microsecond budget is spent, so the AI
+never costs more than budget_us per frame no matter how many agents exist.
+An agent's decision latency is the simulated time between two of its
+decisions; recent latencies are kept for metrics(), which the headless
+soak and the server's room metrics report.
+
+A wall-clock budget makes the number of decisions per frame depend on the
+machine.  Set deterministic to cap decisions by max_per_frame only, which
+recorded and headless sessions need to reproduce exactly.
+"""
+import time
+from collections import deque
+from typing import Callable, Dict
+
+class AITickScheduler:
+    def __init__(self, budget_us: float = 300.0, max_per_frame: int = 8,
+                 deterministic: bool = False, window: int = 2048):
+        self.budget_us = budget_us
+        self.max_per_frame = max_per_frame
+        self.deterministic = deterministic
+        self._cursor = 0
+        self._last_decided = []   # sim time of each agent's last decision
+        self._latencies = deque(maxlen=window)
+        self.decisions_last_frame = 0
+        self.used_us_last_frame = 0.0
+
+    def clear(self):
+        self._cursor = 0
+        self._last_decided.clear()
+        self._latencies.clear()
+
+    def run(self, n_agents: int, decide: Callable[[int], None], now: float) -> int:
+        """Make as many decisions as this frame allows; returns how many."""
+        last = self._last_decided
+        if len(last) > n_agents:
+            del last[n_agents:]
+        while len(last) < n_agents:
+            last.append(None)
+        if n_agents == 0:
+            self.decisions_last_frame = 0
+            self.used_us_last_frame = 0.0
+            return 0
+        cap = min(n_agents, self.max_per_frame) if self.deterministic else n_agents
+        deadline = time.perf_counter_ns() + int(self.budget_us * 1000.0)
+        start = time.perf_counter_ns()
+        done = 0
+        i = self._cursor % n_agents
+        while done < cap:
+            decide(i)
+            if last[i] is not None:
+                self._latencies.append(now - last[i])
+            last[i] = now
+            done += 1
+            i = (i + 1) % n_agents
+            if not self.deterministic and time.perf_counter_ns() >= deadline:
+                break
+        self._cursor = i
+        self.decisions_last_frame = done
+        self.used_us_last_frame = (time.perf_counter_ns() - start) / 1000.0
+        return done
+
+    def metrics(self) -> Dict[str, float]:
+        lat = sorted(self._latencies)
+        def pct(p):
+            return lat[min(len(lat) - 1, int(p * len(lat)))] if lat else 0.0
+        return {
+            "agents": len(self._last_decided),
+            "decisions_last_frame": self.decisions_last_frame,
+            "used_us_last_frame": self.used_us_last_frame,
+            "latency_p50": pct(0.50),
+            "latency_p99": pct(0.99),
+            "latency_max": lat[-1] if lat else 0.0,
+        }
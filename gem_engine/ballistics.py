@@ -0,0 +1,63 @@
+"""Closed-form jump arcs with the landing worked out up front.
+
+While airborne the player follows z(t) = z0 + vz0*t + g*t^2/2 and moves
+horizontally at a constant velocity.  plan_jump() samples the heightfield
+once along that horizontal path and solves, per sample interval, for the
+first time the arc meets ground height + radius.  After that, every
+airborne frame is just an evaluation of the polynomial; the landing no
+longer depends on frame rate, and the heightfield is only queried again
+when the horizontal motion changes and the arc has to be re-planned.
+"""
+import math
+from typing import Callable
+
+SAMPLE_DIST = 0.25   # heightfield sample spacing along the path
+MAX_FLIGHT = 10.0    # seconds; a safety cap for arcs that never come down
+
+class JumpPlan:
+    __slots__ = ("t0", "x0", "y0", "z0", "vz0", "vx", "vy", "gravity", "t_land", "h_land")
+
+    def __init__(self, t0, x0, y0, z0, vz0, vx, vy, gravity, t_land, h_land):
+        self.t0 = t0; self.x0 = x0; self.y0 = y0; self.z0 = z0; self.vz0 = vz0
+        self.vx = vx; self.vy = vy; self.gravity = gravity
+        self.t_land = t_land; self.h_land = h_land
+
+    def z_at(self, t: float) -> float:
+        tau = t - self.t0
+        return self.z0 + self.vz0*tau + 0.5*self.gravity*tau*tau
+
+    def vz_at(self, t: float) -> float:
+        return self.vz0 + self.gravity*(t - self.t0)
+
+    def xy_at(self, t: float):
+        tau = t - self.t0
+        return self.x0 + self.vx*tau, self.y0 + self.vy*tau
+
+    def landed(self, t: float) -> bool:
+        return t - self.t0 >= self.t_land
+
+def _descend_time(z0: float, vz0: float, gravity: float, level: float) -> float:
+    # later root of z0 + vz0*t + g*t^2/2 = level (gravity < 0)
+    disc = vz0*vz0 - 2.0*gravity*(z0 - level)
+    if disc < 0.0:
+        return math.inf
+    return (vz0 + math.sqrt(disc)) / -gravity
+
+def plan_jump(t0: float, x0: float, y0: float, z0: float, vz0: float, vx: float, vy: float,
+              gravity: float, radius: float, height_at: Callable[[float, float], float]) -> JumpPlan:
+    """Plan the arc from the state at time t0.  The player lands when its
+    centre comes down to ground height + radius, or when it moves over
+    ground already higher than that (it snaps up, as the stepped physics did)."""
+    speed = math.hypot(vx, vy)
+    step = SAMPLE_DIST / speed if speed > 0.0 else MAX_FLIGHT
+    t = 0.0
+    while t < MAX_FLIGHT:
+        h = height_at(x0 + vx*t, y0 + vy*t)
+        level = h + radius
+        if (t > 0.0 or vz0 <= 0.0) and z0 + vz0*t + 0.5*gravity*t*t <= level + 1e-4:
+            return JumpPlan(t0, x0, y0, z0, vz0, vx, vy, gravity, t, h)
+        t_hit = _descend_time(z0, vz0, gravity, level)
+        if t_hit <= t + step:
+            return JumpPlan(t0, x0, y0, z0, vz0, vx, vy, gravity, max(t, t_hit), h)
+        t += step
+    return JumpPlan(t0, x0, y0, z0, vz0, vx, vy, gravity, MAX_FLIGHT, 0.0)
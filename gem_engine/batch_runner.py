@@ -0,0 +1,148 @@
+"""Fan seeded headless sessions out over a process pool and aggregate outcomes.
+
+Used for balancing: run tens of thousands of sessions with some constants
+overridden and look at the score, level and time-of-death distributions.
+
+    python -m gem_engine.batch_runner --sessions 20000 --policy greedy \\
+        --set LAVA_DPS=10 --set LEVEL_GEMS=6 [--preset final]
+
+Each task is a contiguous block of seeds.  A worker plays the whole block
+and sends back one packed array of doubles (RESULT_FIELDS per session), so
+the only traffic over the pool's pipes is a few bytes per session.
+"""
+import argparse, ast, math, multiprocessing, os, random, time
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .headless import load_module, new_game, run_session
+from .presets import PRESETS
+
+RESULT_FIELDS = 5  # seed, score, level, end time, shot (1.0) / timed out (0.0)
+MAX_SESSION_TIME = 3600.0
+
+# ---------- policies: factories taking a seed, returning policy(game) ----------
+def idle_policy(seed: int):
+    return None
+
+def random_walk_policy(seed: int):
+    r = random.Random(seed ^ 0x5EED)
+    def policy(game):
+        if r.random() < 0.05:
+            game.keys.clear()
+            game.keys.add(r.choice((b"w", b"a", b"s", b"d")))
+        if r.random() < 0.01:
+            game.on_key(b" ", 0, 0)
+    return policy
+
+def greedy_policy(seed: int):
+    """Turn the camera toward the nearest gem and walk; jump when stuck."""
+    last = [None, 0]
+    def policy(game):
+        if not len(game.gems):
+            game.keys.clear()
+            return
+        px, py = game.player_x, game.player_y
+        xs, ys = game.gems.positions()
+        i = int(np.argmin((xs - np.float64(px))**2 + (ys - np.float64(py))**2))
+        gx, gy = float(xs[i]), float(ys[i])
+        game.cam_yaw = math.degrees(math.atan2(gy - py, gx - px))
+        game.keys.clear()
+        game.keys.add(b"w")
+        if last[0] == (px, py):
+            last[1] += 1
+            if last[1] > 10:
+                game.on_key(b" ", 0, 0)
+                last[1] = 0
+        else:
+            last[0] = (px, py); last[1] = 0
+    return policy
+
+POLICIES = {"idle": idle_policy, "random": random_walk_policy, "greedy": greedy_policy}
+
+# ---------- workers ----------
+def _run_block(task: Tuple[int, int, str, str, Dict, float]) -> bytes:
+    first_seed, count, preset, policy_name, overrides, dt = task
+    out = array("d")
+    module = load_module(preset, overrides)
+    for seed in range(first_seed, first_seed + count):
+        game = new_game(module, seed)
+        run_session(game, POLICIES[policy_name](seed), dt=dt, max_time=MAX_SESSION_TIME)
+        # only the enemy ends a game with time left on the clock
+        shot = 1.0 if not game.running and game.remaining > 0.0 else 0.0
+        out.extend((seed, game.score, game.level, game.clock.now, shot))
+    return out.tobytes()
+
+def run_batch(sessions: int, policy: str = "greedy", overrides: Dict = None,
+              workers: int = None, block: int = 16, first_seed: int = 0,
+              dt: float = 1.0 / 60.0, preset: str = "full") -> List[Tuple[int, float, int, float, bool]]:
+    """Run seeds first_seed .. first_seed+sessions-1; returns one tuple per session."""
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy {policy!r}; choose from {sorted(POLICIES)}")
+    if preset not in PRESETS:
+        raise ValueError(f"unknown preset {preset!r}; choose from {sorted(PRESETS)}")
+    tasks = [(s, min(block, first_seed + sessions - s), preset, policy, overrides or {}, dt)
+             for s in range(first_seed, first_seed + sessions, block)]
+    results = []
+    with multiprocessing.Pool(workers or os.cpu_count()) as pool:
+        for packed in pool.imap_unordered(_run_block, tasks):
+            vals = array("d"); vals.frombytes(packed)
+            for i in range(0, len(vals), RESULT_FIELDS):
+                seed, score, level, end, shot = vals[i:i + RESULT_FIELDS]
+                results.append((int(seed), score, int(level), end, shot > 0.5))
+    results.sort()
+    return results
+
+# ---------- aggregation ----------
+def histograms(results, score_bin: float = 50.0, time_bin: float = 30.0):
+    scores = Counter(int(r[1] // score_bin) * score_bin for r in results)
+    levels = Counter(r[2] for r in results)
+    deaths = Counter(int(r[3] // time_bin) * time_bin for r in results if r[4])
+    return scores, levels, deaths
+
+def _print_hist(title: str, hist: Counter, total: int, width: int = 50):
+    print(title)
+    if not hist:
+        print("  (none)")
+        return
+    peak = max(hist.values())
+    for key in sorted(hist):
+        n = hist[key]
+        print(f"  {key:>8g} {n:>7d} {100.0*n/total:5.1f}% {'#' * max(1, round(width*n/peak))}")
+
+def _parse_override(text: str):
+    name, _, value = text.partition("=")
+    try:
+        return name.strip(), ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f"bad --set value: {text!r}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=1000)
+    ap.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="full")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0, help="first seed")
+    ap.add_argument("--dt", type=float, default=1.0 / 60.0)
+    ap.add_argument("--set", type=_parse_override, action="append", default=[],
+                    metavar="NAME=VALUE", help="override a game constant, e.g. LAVA_DPS=10")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    results = run_batch(args.sessions, args.policy, dict(args.set), args.workers,
+                        first_seed=args.seed, dt=args.dt, preset=args.preset)
+    wall = time.perf_counter() - t0
+    scores, levels, deaths = histograms(results)
+    n = len(results)
+    mean = sum(r[1] for r in results) / max(1, n)
+    print(f"{n} sessions in {wall:.1f}s ({n / wall:.1f}/s), mean score {mean:.1f}, "
+          f"shot {sum(1 for r in results if r[4])}")
+    _print_hist("score", scores, n)
+    _print_hist("level reached", levels, n)
+    _print_hist("time of death (s, shot only)", deaths, n)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Client side of the game server: send input, keep the newest snapshot.
+
+GameClient runs on any asyncio loop (bots, load tests).  RemoteGame puts
+one on a background thread for the GLUT window, which then draws the
+server's state instead of simulating its own, except for the player's
+bowl, which it predicts (prediction.py):
+
+    python template.py --connect 127.0.0.1:7777 [--room N]
+"""
+import asyncio, os, random, struct, threading, time
+
+from . import protocol, snapshot
+from .game import KEY_LEFT, KEY_RIGHT
+from .prediction import Predictor
+from .replay import EV_KEY, EV_KEY_UP, EV_MOUSE, EV_SPECIAL
+
+MAX_REDIRECTS = 4
+
+class GameClient:
+    def __init__(self):
+        self.reader = self.writer = None
+        self.room = self.seed = self.preset = self.tick_rate = self.role = None
+        self.decoder = snapshot.Decoder()
+        self.latest = None     # newest snapshot.Frame
+        self.on_frame = None   # called with each decoded Frame, if set
+        self.snapshots = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.redirects = 0
+        self.bad_frames = 0    # snapshots that failed to decode and were skipped
+        self._hello = None
+
+    async def connect(self, host: str, port: int, room: int, preset: str = "full",
+                      seed: int = 0, role: int = protocol.PLAYER) -> "GameClient":
+        """Join room at host:port, or wherever it redirects to (a lobby)."""
+        self._hello = (room, seed, preset, role)
+        await self._join(host, port)
+        return self
+
+    async def _join(self, host: str, port: int):
+        for _ in range(MAX_REDIRECTS):
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+            self.writer.write(protocol.hello(*self._hello))
+            kind, payload = await protocol.read_frame(self.reader)
+            if kind == protocol.REDIRECT:
+                self.writer.close()
+                host, port = protocol.REDIRECT_MSG.unpack(payload)
+                host = protocol.unpack_preset(host)
+                continue
+            if kind != protocol.WELCOME:
+                raise ConnectionError("server did not welcome the client")
+            self.room, self.seed, preset, self.tick_rate, self.role = protocol.WELCOME_MSG.unpack(payload)
+            self.preset = protocol.unpack_preset(preset)
+            self._hello = (self.room, self.seed, self.preset, self.role)   # come back as the same
+            return
+        raise ConnectionError("too many redirects")
+
+    def send(self, kind: int, code: int, state: int = 0, x: int = 0, y: int = 0):
+        self._write(protocol.input_frame(kind, code, state, x, y))
+
+    def send_command(self, seq: int, buttons: int, yaw: float):
+        self._write(protocol.command(seq, buttons, yaw))
+
+    def _write(self, data: bytes):
+        self.writer.write(data)
+        self.bytes_out += len(data)
+
+    async def receive(self):
+        """Decode and acknowledge snapshots until the server hangs up,
+        following the room when it is moved to another server.  A snapshot
+        that does not decode is skipped and not acked: the server goes on
+        sending deltas against the last ack, or a keyframe once that is too
+        old."""
+        try:
+            while True:
+                kind, payload = await protocol.read_frame(self.reader)
+                self.bytes_in += len(payload) + 5
+                if kind == protocol.STATE:
+                    try:
+                        self.latest = self.decoder.decode(payload)
+                    except (ValueError, struct.error):
+                        self.bad_frames += 1
+                        continue
+                    self.snapshots += 1
+                    self._write(protocol.ack(self.latest.tick))
+                    if self.on_frame is not None:
+                        self.on_frame(self.latest)
+                elif kind == protocol.REDIRECT:
+                    self.writer.close()
+                    host, port = protocol.REDIRECT_MSG.unpack(payload)
+                    await self._join(protocol.unpack_preset(host), port)
+                    self.redirects += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+MAX_PREDICTED_TICKS = 5   # ticks predicted back to back after a stall
+
+class RemoteGame:
+    """A GameClient on its own thread with the input methods of a GameState,
+    so the renderer can hand it keys and mouse clicks.  Once attached to the
+    GameState being drawn, pump() brings in the newest snapshot and, for a
+    player, predicts its movement one command per server tick."""
+
+    def __init__(self, host: str, port: int, room: int, preset: str, seed: int = 0):
+        self.client = GameClient()
+        self.loop = asyncio.new_event_loop()
+        self.error = None
+        self.st = self.predictor = None
+        self._shown = None
+        self._last = None
+        self._behind = 0.0
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(host, port, room, preset, seed, ready),
+                         daemon=True).start()
+        ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self, host, port, room, preset, seed, ready):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.client.connect(host, port, room, preset, seed))
+        except OSError as e:
+            self.error = e
+            return
+        finally:
+            ready.set()
+        self.loop.run_until_complete(self.client.receive())
+
+    def attach(self, module, st):
+        """Draw into st, a GameState of module (the room's preset)."""
+        self.st = st
+        if self.client.role == protocol.PLAYER:
+            self.predictor = Predictor(module, self.client.tick_rate)
+
+    def _send(self, *ev):
+        self.loop.call_soon_threadsafe(self.client.send, *ev)
+
+    def on_key(self, key: bytes, x: int, y: int):
+        if key == b"q":
+            os._exit(0)
+        if self.predictor is None or not self.predictor.press(key):
+            self._send(EV_KEY, key[0], 0, x, y)
+
+    def on_key_up(self, key: bytes, x: int, y: int):
+        if self.predictor is None or not self.predictor.release(key):
+            self._send(EV_KEY_UP, key[0], 0, x, y)
+
+    def on_special(self, key: int, x: int, y: int):
+        p = self.predictor
+        if p is not None and p.yaw is not None and key in (KEY_LEFT, KEY_RIGHT):
+            p.rotate(self.st, key)
+        else:
+            self._send(EV_SPECIAL, key, 0, x, y)
+
+    def on_mouse(self, button, state, x, y):
+        self._send(EV_MOUSE, button, state, x, y)
+
+    def pump(self):
+        st, p = self.st, self.predictor
+        frame = self.client.latest
+        if frame is not None and frame is not self._shown:
+            if p is not None:
+                p.reconcile(st, frame, self._shown)
+            else:
+                snapshot.apply(st, frame, self._shown)
+            self._shown = frame
+        if p is None or p.yaw is None:
+            return
+        now = time.perf_counter()
+        self._behind += now - (self._last or now)
+        self._last = now
+        ran = 0
+        while self._behind >= p.dt and ran < MAX_PREDICTED_TICKS:
+            seq, buttons, yaw = p.next_command()
+            self.loop.call_soon_threadsafe(self.client.send_command, seq, buttons, yaw)
+            p.run(st, buttons, yaw)
+            self._behind -= p.dt
+            ran += 1
+        self._behind = min(self._behind, p.dt)
+
+async def spectator(host: str, port: int, room: int, stop: asyncio.Event, preset: str = "full",
+                    role: int = protocol.SPECTATOR) -> GameClient:
+    """Watch room until stop is set; returns the client for its counts.
+    With role PLAYER it holds the room's player seat without pressing
+    anything, an idle player."""
+    c = await GameClient().connect(host, port, room, preset, role=role)
+    receiving = asyncio.create_task(c.receive())
+    await stop.wait()
+    await c.close()
+    await receiving
+    return c
+
+async def bot(host: str, port: int, room: int, preset: str = "full", seed: int = 0,
+              stop: asyncio.Event = None, rate: float = 10.0) -> GameClient:
+    """A loopback player mashing movement, jump and camera keys rate times
+    a second until stop is set; returns its client for the byte counts."""
+    c = await GameClient().connect(host, port, room, preset, seed)
+    receiving = asyncio.create_task(c.receive())
+    r = random.Random(seed)
+    held = None
+    while stop is None or not stop.is_set():
+        if r.random() < 0.3:
+            if held is not None:
+                c.send(EV_KEY_UP, held)
+            held = ord(r.choice("wasd"))
+            c.send(EV_KEY, held)
+        if r.random() < 0.05:
+            c.send(EV_KEY, ord(" "))
+            c.send(EV_KEY_UP, ord(" "))
+        if r.random() < 0.1:
+            c.send(EV_SPECIAL, r.choice((KEY_LEFT, KEY_RIGHT)))
+        await asyncio.sleep(1.0 / rate)
+    await c.close()
+    await receiving
+    return c
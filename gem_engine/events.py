@@ -0,0 +1,41 @@
+"""Frame-rate-independent random world events.
+
+Each event source has a rate in occurrences per simulated second.  Arrivals
+are a Poisson process: the gap to the next one is drawn from an exponential
+distribution, so the expected count over a stretch of time is the same
+whether it is simulated in 10 steps or 10,000.  A step where nothing is due
+costs a single heap peek.
+"""
+import heapq, itertools, random
+from typing import Callable, List
+
+class EventScheduler:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self._sources: List[tuple] = []   # (rate, callback)
+        self._heap: List[tuple] = []      # (due_time, seq, source index)
+        self._seq = itertools.count()
+
+    def every(self, rate: float, callback: Callable[[], None], now: float = 0.0):
+        """Call callback at random times, rate times per second on average."""
+        self._sources.append((rate, callback))
+        self._schedule(len(self._sources) - 1, now)
+
+    def _schedule(self, idx: int, now: float):
+        rate = self._sources[idx][0]
+        if rate > 0.0:
+            heapq.heappush(self._heap, (now + self.rng.expovariate(rate), next(self._seq), idx))
+
+    def reset(self, now: float):
+        """Forget pending arrivals and draw fresh ones starting at now."""
+        self._heap.clear()
+        for idx in range(len(self._sources)):
+            self._schedule(idx, now)
+
+    def advance(self, now: float):
+        """Fire every arrival due at or before now, in time order."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            due, _, idx = heapq.heappop(heap)
+            self._sources[idx][1]()
+            self._schedule(idx, due)
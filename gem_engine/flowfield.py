@@ -0,0 +1,87 @@
+"""Shared flow field for enemies chasing the player around obstacles.
+
+The arena is rasterised into one cell per grid square.  A breadth-first
+search from the player's cell (8-connected, no cutting past blocked
+corners) gives every free cell the neighbour one step closer to the
+player.  The field is rebuilt only when the player enters another cell or
+the geometry version changes; looking up where an enemy should head next
+is then a couple of array reads, however many enemies ask.
+"""
+from array import array
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+_NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+class FlowField:
+    def __init__(self, grid_size: int, cell: float):
+        self.grid_size = grid_size
+        self.cell = cell
+        self.side = 2 * grid_size + 1
+        n = self.side * self.side
+        self.blocked = bytearray(n)
+        self.dist = array("i", [-1]) * n
+        self.next_cell = array("i", [-1]) * n
+        self._geom_version = None
+        self._target = None
+        self.rebuilds = 0
+
+    def cell_of(self, x: float, y: float) -> int:
+        g, side = self.grid_size, self.side
+        i = min(side - 1, max(0, int(round(x / self.cell)) + g))
+        j = min(side - 1, max(0, int(round(y / self.cell)) + g))
+        return j * side + i
+
+    def center_of(self, idx: int) -> Tuple[float, float]:
+        j, i = divmod(idx, self.side)
+        return (i - self.grid_size) * self.cell, (j - self.grid_size) * self.cell
+
+    def update(self, target_x: float, target_y: float,
+               hits_obstacle: Callable[[float, float], bool], geom_version: int) -> bool:
+        """Bring the field up to date; returns True if it had to be rebuilt."""
+        target = self.cell_of(target_x, target_y)
+        if geom_version != self._geom_version:
+            for idx in range(len(self.blocked)):
+                self.blocked[idx] = 1 if hits_obstacle(*self.center_of(idx)) else 0
+            self._geom_version = geom_version
+        elif target == self._target:
+            return False
+        self._target = target
+        self._bfs(target)
+        self.rebuilds += 1
+        return True
+
+    def _bfs(self, target: int):
+        side, blocked = self.side, self.blocked
+        dist, nxt = self.dist, self.next_cell
+        for idx in range(len(dist)):
+            dist[idx] = -1
+            nxt[idx] = -1
+        dist[target] = 0
+        nxt[target] = target
+        queue = deque((target,))
+        while queue:
+            cur = queue.popleft()
+            cj, ci = divmod(cur, side)
+            d = dist[cur] + 1
+            for di, dj in _NEIGHBOURS:
+                i, j = ci + di, cj + dj
+                if i < 0 or j < 0 or i >= side or j >= side:
+                    continue
+                idx = j * side + i
+                if dist[idx] >= 0 or blocked[idx]:
+                    continue
+                if di and dj and (blocked[cj * side + i] or blocked[j * side + ci]):
+                    continue
+                dist[idx] = d
+                nxt[idx] = cur
+                queue.append(idx)
+
+    def waypoint(self, x: float, y: float) -> Optional[Tuple[float, float]]:
+        """Centre of the next cell on the way to the target, or None when
+        (x, y) is already in the target's cell or cannot reach it."""
+        idx = self.cell_of(x, y)
+        nxt = self.next_cell[idx]
+        if nxt < 0 or nxt == idx:
+            return None
+        return self.center_of(nxt)
@@ -0,0 +1,804 @@
+"""The game: one simulation shared by every Gem Catcher variant.
+
+Which features a session has is decided by the switches below; presets.py
+holds the combinations that make up each variant.  Load a configured copy
+with headless.load_module / load_game rather than importing this directly.
+
+Module level is configuration only.  Everything a session changes lives in
+a GameState, which every function here takes as its first argument, so any
+number of sessions can share one configured module.  Nothing here draws:
+render.py opens a window (or not) and gl_renderer.py holds the OpenGL code.
+"""
+import random, math, os
+from functools import partial
+
+from typing import List, Tuple
+
+from .ai_scheduler import AITickScheduler
+from .ballistics import plan_jump
+from .events import EventScheduler
+from .flowfield import FlowField
+from .gems import GemPalette, GemPool
+from .raycast import RayGrid
+from .sim_clock import SimClock, substeps
+from .swarm import CHASE, PATROL, EnemyPool
+
+# ---------------- FEATURES ----------------
+PRESET = "full"          # name of the preset this copy was loaded with
+LEVEL_MODE = "gems"      # "gems": level up every LEVEL_GEMS gems; "score": at LEVEL_THRESHOLDS
+TREASURE = True          # help/harm treasure boxes
+TERRAIN = True           # raised blocks, stepped slopes, climbing, smashing cubes while boosted
+LAVA = True
+ENEMY = True
+SCENERY = True           # skybox, floor tiles and perimeter pillars
+CAMERA = "orbit"         # "orbit" (pitch + zoom) or "chase" (fixed offset behind the player)
+FP_TOGGLE = "mouse"      # what toggles first person: "mouse", "v" or None
+PLAYER_MODEL = "bowl"    # "bowl" or "ball"
+CHEAT_GHOST = True       # cheat mode also walks through obstacles
+INVERT_ARROWS = True
+WINDOW_TITLE = b"Gem Catcher - Full Feature Build"
+
+START_TIME = 300.0
+GRID_SIZE = 20
+CELL = 1.0
+
+PLAYER_DIAM = 0.9
+PLAYER_RADIUS = PLAYER_DIAM * 0.5   # derived: see headless.DERIVED
+GEM_RADIUS = 0.4
+OBSTACLE_SIZE = 1.0
+
+BASE_SPEED = 7.0
+BOOST_MULTIPLIER = 2.0
+BOOST_DURATION = 5.0
+BREAK_TTL = 0.6
+
+JUMP_V0 = 9.5
+GRAVITY = -18.0
+CLIMB_MARGIN = 0.05
+
+LAVA_SLOW_MULT = 0.5
+LAVA_DPS = 20.0
+MAX_LAVA = 6
+LAVA_MIN_R = 2.5
+LAVA_MAX_R = 4.0
+LAVA_TTL = 8.0
+LAVA_BASE = 2
+
+LEVEL_GEMS = 5
+LEVEL_UP_GEMS = 2          # extra gems dropped on each level up
+LEVEL_SPEED_BONUS = 0.0    # permanent speed gain per level
+LEVEL_THRESHOLDS = [50, 120, 220, 360, 520]  # LEVEL_MODE "score"
+TIME_PENALTY_ON_LEVEL = 5                    # LEVEL_MODE "score"
+INITIAL_CUBES = 12
+
+MAX_TREASURE = 4
+TREASURE_SPAWN_RATE = 0.48  # extra treasure boxes per second (was 0.008 per frame at ~60 FPS)
+
+GEM_TYPES = [
+    ("Red",    (1.0, 0.2, 0.2), 10),
+    ("Blue",   (0.2, 0.4, 1.0), 20),
+    ("Yellow", (1.0, 0.9, 0.2), 30),
+]
+BOOST_CHANCE = 0.06
+BOOST_TYPE = ("Boost", (0.1, 1.0, 0.1), 0)
+TOP_GEM_TYPE = ("Gold", (1.0, 0.8, 0.2), 50)  # the gem on top of every slope
+CHEAT_GEM_COLOR = (0.1, 1.0, 0.1)             # every gem while cheating
+
+CAM_DIST_MIN = 6.0
+CAM_DIST_MAX = 40.0
+CAM_ZOOM_STEP = 1.0
+CAM_PULL_MARGIN = 0.3  # keep the third-person eye this far in front of a wall
+FP_EYE_OFFSET = 0.4
+CHASE_BACK = 10.0
+CHASE_UP = 6.0
+
+HEIGHT_MEMO_QUANT = 1000.0  # ground height is memoised per 1/1000 unit
+HEIGHT_MEMO_MAX = 4096
+TIME_SCALE_STEP = 2.0
+
+enemy_z = 0.5
+ENEMY_SPEED = 7.5  # slightly faster than player base speed
+ENEMY_GUN_RANGE = 1.2
+ENEMY_GUN_Z = 0.9       # muzzle height the enemy shoots and looks from
+ENEMY_LEVEL = 4         # first chaser shows up at this level
+ENEMIES_PER_LEVEL = 3   # extra chasers for every level after that
+MAX_ENEMIES = 500
+ENEMY_AGGRO_CELLS = 30  # chase by path distance even without line of sight
+ENEMY_PATROL_RADIUS = 6.0
+
+# GLUT's codes for the special keys and mouse events the game reacts to;
+# session logs store them as they come.
+KEY_LEFT, KEY_UP, KEY_RIGHT, KEY_DOWN = 100, 101, 102, 103
+MOUSE_LEFT, MOUSE_DOWN = 0, 0
+
+# Enemy decisions are time-sliced: at most AI_BUDGET_US of them per frame,
+# or exactly AI_MAX_DECISIONS when ai.deterministic (recording / headless).
+AI_BUDGET_US = 300.0
+AI_MAX_DECISIONS = 8
+
+class GameState:
+    """One session: the player, the world, input and camera, and the
+    services that drive them.  The step/input methods forward to the
+    module functions so a GameState can be driven like the old module."""
+    __slots__ = (
+        "player_x", "player_y", "player_z", "vz", "on_ground", "jump_plan", "jump_key",
+        "player_speed", "speed_bonus", "boost_until", "roll_angle", "roll_axis_x", "roll_axis_y",
+        "score", "level", "remaining", "running", "cheat_mode", "gems_collected",
+        "gems", "obstacles", "breaking_obs", "obstacles_rect", "slopes", "treasure_boxes",
+        "lava_pools", "lava_dmg_accum", "geom_version", "ray_grid", "height_memo",
+        "height_memo_version",
+        "keys", "cam_yaw", "cam_pitch", "cam_dist", "first_person_mode", "popup_msg", "popup_until",
+        "rng", "clock", "events", "recorder", "enemies", "enemy_flow", "ai",
+        "rewind", "lag_steps",
+    )
+
+    def __init__(self, clock: SimClock = None):
+        self.player_x = 0.0
+        self.player_y = 0.0
+        self.player_z = PLAYER_RADIUS
+        self.vz = 0.0
+        self.on_ground = True
+        self.jump_plan = None   # ballistics.JumpPlan while airborne
+        self.jump_key = None    # (geom_version, cheat_mode) the plan was made for
+        self.player_speed = BASE_SPEED
+        self.speed_bonus = 0.0
+        self.boost_until = 0.0
+        self.roll_angle = 0.0
+        self.roll_axis_x = 1.0
+        self.roll_axis_y = 0.0
+
+        self.score = 0
+        self.level = 1
+        self.remaining = START_TIME
+        self.running = True
+        self.cheat_mode = False
+        self.gems_collected = 0
+
+        self.gems = GemPool(GemPalette(GEM_TYPES + [BOOST_TYPE, TOP_GEM_TYPE],
+                                       (BOOST_TYPE[0],), CHEAT_GEM_COLOR))
+        self.obstacles: List[Tuple[float,float]] = []
+        self.breaking_obs: List[Tuple[float,float,float,float]] = []
+        self.obstacles_rect: List[Tuple[float,float,float,float,float]] = []
+        self.slopes: List[Tuple[float,float,str,float,float,int,float]] = []
+        self.treasure_boxes: List[Tuple[float,float,str]] = []
+        self.lava_pools: List[Tuple[float,float,float,float]] = []
+        self.lava_dmg_accum = 0.0
+        self.geom_version = 0  # bumped whenever obstacles, obstacles_rect or slopes change
+        self.ray_grid = RayGrid(GRID_SIZE, CELL)  # line of sight and camera collision
+        self.height_memo = {}
+        self.height_memo_version = None
+
+        self.keys = set()
+        self.cam_yaw = 0.0
+        self.cam_pitch = 12.0
+        self.cam_dist = 12.0
+        self.first_person_mode = False
+        self.popup_msg = ""
+        self.popup_until = 0.0
+
+        # All gameplay randomness and timing goes through these so a session can be
+        # replayed bit-for-bit from its seed and recorded inputs (see replay.py).
+        # Swap in another SimClock to pause, scale or fast-forward the game.
+        self.rng = random.Random()
+        self.clock = clock if clock is not None else SimClock()
+        self.events = EventScheduler(self.rng)
+        self.events.every(TREASURE_SPAWN_RATE, partial(maybe_spawn_treasure_box, self))
+        self.recorder = None
+        self.enemies = EnemyPool(MAX_ENEMIES, GRID_SIZE*CELL)
+        self.enemy_flow = FlowField(GRID_SIZE, CELL)  # shared by every chaser
+        self.ai = AITickScheduler(AI_BUDGET_US, AI_MAX_DECISIONS)
+        self.rewind = None   # rewind.PositionHistory in a networked room
+        self.lag_steps = 0   # how far behind the player's client sees the enemies
+
+    def step(self, dt: float):
+        step(self, dt)
+
+    def restart_game(self):
+        restart_game(self)
+
+    def on_key(self, key: bytes, x: int, y: int):
+        on_key(self, key, x, y)
+
+    def on_key_up(self, key: bytes, x: int, y: int):
+        on_key_up(self, key, x, y)
+
+    def on_special(self, key: int, x: int, y: int):
+        on_special(self, key, x, y)
+
+    def on_mouse(self, button, state, x, y):
+        on_mouse(self, button, state, x, y)
+
+def clamp(v, a, b):
+    return max(a, min(b, v))
+
+def aabb_overlap(ax, ay, asz, bx, by, bsz) -> bool:
+    ha = asz * 0.5
+    hb = bsz * 0.5
+    return (abs(ax - bx) <= ha + hb) and (abs(ay - by) <= ha + hb)
+
+def rect_overlap(ax, ay, asx, asy, bx, by, bsx, bsy) -> bool:
+    return (abs(ax - bx) <= asx*0.5 + bsx*0.5) and (abs(ay - by) <= asy*0.5 + bsy*0.5)
+
+def dist2(ax, ay, bx, by):
+    dx, dy = ax - bx, ay - by
+    return dx*dx + dy*dy
+
+def geometry_changed(st):
+    st.geom_version += 1
+
+def solid_rays(st):
+    st.ray_grid.sync(st.geom_version, st.obstacles, OBSTACLE_SIZE, st.obstacles_rect, st.slopes)
+    return st.ray_grid
+
+def rand_xy_avoiding_player(st, min_dist=1.0):
+    rng = st.rng
+    for _ in range(200):
+        x = rng.randint(-GRID_SIZE, GRID_SIZE) * CELL
+        y = rng.randint(-GRID_SIZE, GRID_SIZE) * CELL
+        if dist2(x, y, st.player_x, st.player_y) > (min_dist*min_dist):
+            return x, y
+    return 0.0, 0.0
+
+def slope_height_at(s, x, y):
+    sx, sy, sdir, length, width, steps, step_h = s
+    if sdir == 'x':
+        if abs(y - sy) > width*0.5: return 0.0
+        t = (x - (sx - length*0.5)) / length
+    else:
+        if abs(x - sx) > width*0.5: return 0.0
+        t = (y - (sy - length*0.5)) / length
+    if t < 0.0 or t > 1.0: return 0.0
+    idx = int(math.floor(t * steps))
+    if idx < 0: idx = 0
+    if idx >= steps: idx = steps - 1
+    return (idx + 1) * step_h
+
+def ground_height_at(st, x, y):
+    if not TERRAIN:
+        return 0.0
+    h = 0.0
+    for (ox, oy) in st.obstacles:
+        if aabb_overlap(x, y, PLAYER_DIAM, ox, oy, OBSTACLE_SIZE):
+            h = max(h, 1.0)
+    for (rx, ry, sx, sy, sz) in st.obstacles_rect:
+        if rect_overlap(x, y, PLAYER_DIAM, PLAYER_DIAM, rx, ry, sx, sy):
+            h = max(h, sz)
+    for s in st.slopes:
+        t = slope_height_at(s, x, y)
+        h = max(h, t)
+    return h
+
+def ground_height_memo(st, x, y):
+    """ground_height_at on a quantised position, remembered until the
+    geometry version changes; standing still costs a dict lookup."""
+    memo = st.height_memo
+    if st.height_memo_version != st.geom_version:
+        memo.clear()
+        st.height_memo_version = st.geom_version
+    key = (round(x * HEIGHT_MEMO_QUANT), round(y * HEIGHT_MEMO_QUANT))
+    h = memo.get(key)
+    if h is None:
+        if len(memo) >= HEIGHT_MEMO_MAX:
+            memo.clear()
+        h = ground_height_at(st, key[0] / HEIGHT_MEMO_QUANT, key[1] / HEIGHT_MEMO_QUANT)
+        memo[key] = h
+    return h
+
+def pos_hits_any_obstacle(st, x, y):
+    if any(aabb_overlap(x, y, GEM_RADIUS*2, ox, oy, OBSTACLE_SIZE) for (ox, oy) in st.obstacles): return True
+    if any(rect_overlap(x, y, GEM_RADIUS*2, GEM_RADIUS*2, rx, ry, sx, sy) for (rx,ry,sx,sy,sz) in st.obstacles_rect): return True
+    for s in st.slopes:
+        sx, sy, sdir, length, width, steps, step_h = s
+        if sdir == 'x':
+            if abs(y - sy) <= width*0.5 and (sx - length*0.5) <= x <= (sx + length*0.5): return True
+        else:
+            if abs(x - sx) <= width*0.5 and (sy - length*0.5) <= y <= (sy + length*0.5): return True
+    return False
+
+def spawn_gem(st, force_boost: bool=False):
+    rng = st.rng
+    if force_boost or rng.random() < BOOST_CHANCE:
+        kind = st.gems.palette.kind[BOOST_TYPE[0]]
+    else:
+        kind = rng.randrange(len(GEM_TYPES))  # draws exactly like rng.choice(GEM_TYPES)
+    for _ in range(200):
+        x, y = rand_xy_avoiding_player(st, min_dist=1.0)
+        if pos_hits_any_obstacle(st, x, y):
+            continue
+        st.gems.add(x, y, kind)
+        return
+    st.gems.add(0.0, 0.0, kind)
+
+def spawn_gem_at(st, x, y, kind: int):
+    st.gems.add(x, y, kind)
+
+def spawn_lava_pool(st):
+    rng = st.rng
+    for _ in range(200):
+        x, y = rand_xy_avoiding_player(st, min_dist=5.0)
+        r = rng.uniform(LAVA_MIN_R, LAVA_MAX_R)
+        if pos_hits_any_obstacle(st, x, y): continue
+        t = rng.uniform(LAVA_TTL*0.8, LAVA_TTL*1.2)
+        st.lava_pools.append((x, y, r, t))
+        return
+
+def in_lava(st, x, y):
+    for (lx, ly, lr, lt) in st.lava_pools:
+        if dist2(x, y, lx, ly) <= (lr + PLAYER_RADIUS*0.2)**2:
+            return True
+    return False
+
+def spawn_treasure_box(st):
+    rng = st.rng
+    for _ in range(200):
+        x = rng.randint(-GRID_SIZE, GRID_SIZE) * CELL
+        y = rng.randint(-GRID_SIZE, GRID_SIZE) * CELL
+        if dist2(x, y, st.player_x, st.player_y) < (2.0*2.0):
+            continue
+        if pos_hits_any_obstacle(st, x, y):
+            continue
+        effect = rng.choice(["help", "harm"])
+        st.treasure_boxes.append((x, y, effect))
+        return
+    st.treasure_boxes.append((0.0,0.0, rng.choice(["help","harm"])))
+
+def spawn_rect_obstacle(st):
+    rng = st.rng
+    for _ in range(200):
+        rx, ry = rand_xy_avoiding_player(st, min_dist=3.0)
+        sx = rng.uniform(1.2, 3.0)
+        sy = rng.uniform(0.8, 2.2)
+        sz = rng.uniform(1.0, 2.0)
+        if pos_hits_any_obstacle(st, rx, ry): continue
+        st.obstacles_rect.append((rx, ry, sx, sy, sz))
+        geometry_changed(st)
+        return
+
+def spawn_slope_with_top_gem(st):
+    rng = st.rng
+    for _ in range(200):
+        sx, sy = rand_xy_avoiding_player(st, min_dist=6.0)
+        sdir = rng.choice(['x','y'])
+        length = rng.uniform(4.0, 7.0)
+        width = rng.uniform(1.2, 2.0)
+        steps = rng.randint(4, 6)
+        step_h = rng.uniform(0.35, 0.55)
+        if pos_hits_any_obstacle(st, sx, sy): continue
+        st.slopes.append((sx, sy, sdir, length, width, steps, step_h))
+        geometry_changed(st)
+        if sdir == 'x':
+            tx = sx + length*0.5
+            ty = sy
+        else:
+            tx = sx
+            ty = sy + length*0.5
+        spawn_gem_at(st, tx, ty, st.gems.palette.kind[TOP_GEM_TYPE[0]])
+        return
+
+def maybe_spawn_treasure_box(st):
+    if TREASURE and len(st.treasure_boxes) < MAX_TREASURE:
+        spawn_treasure_box(st)
+
+def setup_initial_spawns(st):
+    st.gems.clear()
+    st.obstacles.clear()
+    st.obstacles_rect.clear()
+    st.slopes.clear()
+    st.treasure_boxes.clear()
+    for _ in range(INITIAL_CUBES):
+        ox, oy = rand_xy_avoiding_player(st, min_dist=4.0)
+        st.obstacles.append((ox, oy))
+    geometry_changed(st)
+    if TERRAIN:
+        for _ in range(4):
+            spawn_rect_obstacle(st)
+        spawn_slope_with_top_gem(st)
+    for _ in range(8):
+        spawn_gem(st)
+    if TREASURE:
+        for _ in range(2):
+            spawn_treasure_box(st)
+    if LAVA:
+        for _ in range(min(LAVA_BASE, MAX_LAVA)):
+            spawn_lava_pool(st)
+    if not st.gems:
+        spawn_gem(st)
+
+def on_level_up(st):
+    st.level += 1
+    st.score += 50
+    st.remaining = max(0.0, st.remaining + 20.0)
+    for _ in range(LEVEL_UP_GEMS):
+        spawn_gem(st)
+    if TERRAIN:
+        for _ in range(2):
+            spawn_rect_obstacle(st)
+        spawn_slope_with_top_gem(st)
+    ox, oy = rand_xy_avoiding_player(st, min_dist=2.0)
+    st.obstacles.append((ox, oy))
+    geometry_changed(st)
+    st.speed_bonus += LEVEL_SPEED_BONUS
+    st.cam_dist = clamp(st.cam_dist - 1.0, CAM_DIST_MIN, CAM_DIST_MAX)
+
+def level_from_score(sc: int) -> int:
+    lvl = 1
+    for t in LEVEL_THRESHOLDS:
+        if sc >= t:
+            lvl += 1
+    return lvl
+
+def apply_level_changes(st, prev_level: int, new_level: int):
+    # LEVEL_MODE "score": more cubes and gems and less time at each threshold
+    if new_level <= prev_level:
+        return
+    for _ in range(6 + 2*(new_level-1)):
+        ox, oy = rand_xy_avoiding_player(st, min_dist=PLAYER_DIAM + OBSTACLE_SIZE)
+        st.obstacles.append((ox, oy))
+    geometry_changed(st)
+    for _ in range(4 + (new_level-1)):
+        spawn_gem(st)
+    st.remaining = max(0.0, st.remaining - TIME_PENALTY_ON_LEVEL)
+
+def jump_ground_height(st, x, y):
+    return 0.0 if st.cheat_mode else ground_height_memo(st, x, y)
+
+def try_move(st, dx: float, dy: float):
+    player_x, player_y, player_z = st.player_x, st.player_y, st.player_z
+    nx = clamp(player_x + dx, -GRID_SIZE*CELL, GRID_SIZE*CELL)
+    ny = clamp(player_y + dy, -GRID_SIZE*CELL, GRID_SIZE*CELL)
+
+    if st.cheat_mode and CHEAT_GHOST:
+        st.player_x = nx
+        st.player_y = ny
+        return
+
+    blocked_x = False
+    blocked_y = False
+
+    obstacles = st.obstacles
+    top = 1.0 if TERRAIN else math.inf
+    smash = TERRAIN and st.clock.now < st.boost_until
+    i = 0
+    while i < len(obstacles):
+        ox, oy = obstacles[i]
+        hit_x = aabb_overlap(nx, player_y, PLAYER_DIAM, ox, oy, OBSTACLE_SIZE)
+        hit_y = aabb_overlap(player_x, ny, PLAYER_DIAM, ox, oy, OBSTACLE_SIZE)
+        if hit_x or hit_y:
+            if smash:
+                st.breaking_obs.append((ox, oy, 1.0, BREAK_TTL))
+                obstacles.pop(i)
+                geometry_changed(st)
+                continue
+            else:
+                if hit_x and player_z < top + PLAYER_RADIUS - CLIMB_MARGIN:
+                    blocked_x = True
+                if hit_y and player_z < top + PLAYER_RADIUS - CLIMB_MARGIN:
+                    blocked_y = True
+        i += 1
+
+    for (rx, ry, sx, sy, sz) in st.obstacles_rect:
+        hit_x = rect_overlap(nx, player_y, PLAYER_DIAM, PLAYER_DIAM, rx, ry, sx, sy)
+        hit_y = rect_overlap(player_x, ny, PLAYER_DIAM, PLAYER_DIAM, rx, ry, sx, sy)
+        if hit_x:
+            if player_z < sz + PLAYER_RADIUS - CLIMB_MARGIN:
+                blocked_x = True
+        if hit_y:
+            if player_z < sz + PLAYER_RADIUS - CLIMB_MARGIN:
+                blocked_y = True
+
+    for s in st.slopes:
+        sx, sy, sdir, length, width, steps, step_h = s
+        if sdir == 'x':
+            fx = rect_overlap(nx, player_y, PLAYER_DIAM, PLAYER_DIAM, sx, sy, length, width)
+            fy = rect_overlap(player_x, ny, PLAYER_DIAM, PLAYER_DIAM, sx, sy, length, width)
+        else:
+            fx = rect_overlap(nx, player_y, PLAYER_DIAM, PLAYER_DIAM, sx, sy, width, length)
+            fy = rect_overlap(player_x, ny, PLAYER_DIAM, PLAYER_DIAM, sx, sy, width, length)
+        if fx:
+            hloc = slope_height_at(s, nx, player_y)
+            if player_z < hloc + PLAYER_RADIUS - CLIMB_MARGIN:
+                blocked_x = True
+        if fy:
+            hloc = slope_height_at(s, player_x, ny)
+            if player_z < hloc + PLAYER_RADIUS - CLIMB_MARGIN:
+                blocked_y = True
+
+    if not blocked_x:
+        st.player_x = nx
+    if not blocked_y:
+        st.player_y = ny
+
+def collect_overlaps(st):
+    player_x, player_y = st.player_x, st.player_y
+    now = st.clock.now
+    gems = st.gems
+    hit = gems.touching(player_x, player_y, PLAYER_RADIUS+GEM_RADIUS)
+    if len(hit):
+        kinds = gems.kind[hit]
+        boost = gems.palette.boost[kinds]
+        if boost.any():
+            st.boost_until = now + BOOST_DURATION
+        st.score += int(gems.palette.points[kinds[~boost]].sum())
+        gems.remove(hit)
+    for _ in range(len(hit)):
+        st.gems_collected += 1
+        spawn_gem(st)
+        if LEVEL_MODE == "gems" and st.gems_collected % LEVEL_GEMS == 0:
+            on_level_up(st)
+    boxes = st.treasure_boxes
+    t_remove = []
+    for i, (tx, ty, effect) in enumerate(boxes):
+        if dist2(tx, ty, player_x, player_y) <= (PLAYER_RADIUS + 0.8)**2:
+            t_remove.append(i)
+            if effect == "help":
+                st.score += 50
+                st.popup_msg = "+50 (treasure)"
+            else:
+                st.score = max(0, st.score - 30)
+                st.remaining = max(0.0, st.remaining - 10)
+                st.popup_msg = "-30 & -10s (trap)"
+            st.popup_until = now + 2.0
+    for i in reversed(t_remove):
+        boxes.pop(i)
+        if st.rng.random() < 0.8:
+            spawn_treasure_box(st)
+
+def on_key(st, key: bytes, x: int, y: int):
+    clock = st.clock
+    if st.recorder is not None:
+        st.recorder.key(key)
+    st.keys.add(key)
+    if key == b"c":
+        st.cheat_mode = not st.cheat_mode
+    elif key == b"r":
+        restart_game(st)
+    elif key == b" ":
+        if st.running and st.on_ground:
+            st.on_ground = False
+            st.vz = JUMP_V0
+            st.jump_plan = None
+    elif key == b"p":
+        reset_player_position(st)
+    elif key in (b'+', b'=',):
+        st.cam_dist = clamp(st.cam_dist - CAM_ZOOM_STEP, CAM_DIST_MIN, CAM_DIST_MAX)
+    elif key in (b'-', b'_',):
+        st.cam_dist = clamp(st.cam_dist + CAM_ZOOM_STEP, CAM_DIST_MIN, CAM_DIST_MAX)
+    elif key == b"v" and FP_TOGGLE == "v":
+        st.first_person_mode = not st.first_person_mode
+    elif key == b'\x1b':
+        clock.toggle_pause()
+    elif key == b'[':
+        clock.set_scale(clock.scale / TIME_SCALE_STEP)
+    elif key == b']':
+        clock.set_scale(clock.scale * TIME_SCALE_STEP)
+    elif key == b'q':
+        if st.recorder is not None:
+            st.recorder.close()
+        os._exit(0)
+
+def on_key_up(st, key: bytes, x: int, y: int):
+    if st.recorder is not None:
+        st.recorder.key_up(key)
+    if key in st.keys:
+        st.keys.remove(key)
+
+def on_special(st, key: int, x: int, y: int):
+    if st.recorder is not None:
+        st.recorder.special(key)
+    sign = 1 if INVERT_ARROWS else -1
+    if key == KEY_LEFT:
+        st.cam_yaw += 4 * sign
+    elif key == KEY_RIGHT:
+        st.cam_yaw -= 4 * sign
+    elif key == KEY_UP:
+        st.cam_pitch = clamp(st.cam_pitch - 3 * sign, -35.0, 70.0)
+    elif key == KEY_DOWN:
+        st.cam_pitch = clamp(st.cam_pitch + 3 * sign, -35.0, 70.0)
+
+def on_mouse(st, button, state, x, y):
+    if st.recorder is not None:
+        st.recorder.mouse(button, state, x, y)
+    if FP_TOGGLE == "mouse" and button == MOUSE_LEFT and state == MOUSE_DOWN:
+        # Toggle first_person_mode on each left click press
+        st.first_person_mode = not st.first_person_mode
+
+def restart_game(st):
+    st.player_x = 0.0; st.player_y = 0.0; st.player_z = PLAYER_RADIUS; st.vz = 0.0
+    st.on_ground = True; st.jump_plan = None
+    st.player_speed = BASE_SPEED; st.speed_bonus = 0.0; st.boost_until = 0.0; st.roll_angle = 0.0
+    st.score = 0; st.level = 1; st.remaining = START_TIME; st.running = True; st.gems_collected = 0
+    st.cam_yaw = 0.0; st.cam_pitch = 10.0; st.cam_dist = 12.0
+    st.clock.reset()
+    st.enemies.clear()
+    st.ai.clear()
+    setup_initial_spawns(st)
+    st.events.reset(st.clock.now)
+
+def reset_player_position(st):
+    st.player_x = 0.0
+    st.player_y = 0.0
+    st.player_z = PLAYER_RADIUS
+    st.vz = 0.0
+    st.on_ground = True
+
+def enemies_wanted(st):
+    if not ENEMY or st.level < ENEMY_LEVEL:
+        return 0
+    return min(MAX_ENEMIES, 1 + ENEMIES_PER_LEVEL * (st.level - ENEMY_LEVEL))
+
+def spawn_enemy(st):
+    ex, ey = rand_xy_avoiding_player(st, min_dist=GRID_SIZE*0.9)
+    st.enemies.spawn(ex, ey)
+
+def decide_enemy(st, i):
+    # The expensive part of enemy AI; ai.run() calls it for a few enemies a frame.
+    enemies = st.enemies
+    ex, ey = float(enemies.x[i]), float(enemies.y[i])
+    d = st.enemy_flow.dist[st.enemy_flow.cell_of(ex, ey)]
+    if 0 <= d <= ENEMY_AGGRO_CELLS or solid_rays(st).line_of_sight(ex, ey, ENEMY_GUN_Z, st.player_x, st.player_y, st.player_z):
+        enemies.mode[i] = CHASE
+        return
+    if enemies.mode[i] == PATROL and dist2(ex, ey, enemies.goal_x[i], enemies.goal_y[i]) > 0.25:
+        return
+    enemies.mode[i] = PATROL
+    enemies.goal_x[i] = clamp(ex + st.rng.uniform(-ENEMY_PATROL_RADIUS, ENEMY_PATROL_RADIUS), -GRID_SIZE*CELL, GRID_SIZE*CELL)
+    enemies.goal_y[i] = clamp(ey + st.rng.uniform(-ENEMY_PATROL_RADIUS, ENEMY_PATROL_RADIUS), -GRID_SIZE*CELL, GRID_SIZE*CELL)
+
+def think_enemies(st):
+    st.enemy_flow.update(st.player_x, st.player_y, partial(pos_hits_any_obstacle, st), st.geom_version)
+    st.ai.run(st.enemies.count, partial(decide_enemy, st), st.clock.now)
+
+def move_enemy(st, dt):
+    if st.enemies.count == 0:
+        return
+    # Every frame: chasers head for the next cell of one shared flow field,
+    # patrollers for their goal, all pushed apart from their neighbours.
+    st.enemies.steer(dt, ENEMY_SPEED, st.enemy_flow, st.player_x, st.player_y)
+
+def check_enemy_shot(st):
+    # If any enemy is close enough and has a clear shot, it shoots ("game over").
+    # Over the network the enemies are taken where the client saw them (rewind.py).
+    player_x, player_y, player_z = st.player_x, st.player_y, st.player_z
+    if st.rewind is not None and st.lag_steps > 0:
+        xs, ys = st.rewind.back(st.lag_steps)
+        near = ((xs - player_x)**2 + (ys - player_y)**2 <= ENEMY_GUN_RANGE**2).nonzero()[0]
+    else:
+        xs, ys = st.enemies.positions()
+        near = st.enemies.in_range(player_x, player_y, ENEMY_GUN_RANGE).nonzero()[0]
+    if len(near) == 0:
+        return
+    rays = []
+    for i in near.tolist():
+        ex, ey = float(xs[i]), float(ys[i])
+        dx, dy, dz = player_x - ex, player_y - ey, player_z - ENEMY_GUN_Z
+        rays.append((ex, ey, ENEMY_GUN_Z, dx, dy, dz, math.sqrt(dx*dx + dy*dy + dz*dz)))
+    if any(hit is None for hit in solid_rays(st).cast_many(rays)):
+        st.running = False
+        st.popup_msg = "GAME OVER: Shot by Enemy!"
+        st.popup_until = st.clock.now + 3.0
+
+def step_lava(st, dt: float):
+    if in_lava(st, st.player_x, st.player_y):
+        st.player_speed *= LAVA_SLOW_MULT
+        st.lava_dmg_accum += LAVA_DPS * dt
+        dec = int(st.lava_dmg_accum)
+        if dec > 0:
+            st.score = max(0, st.score - dec)
+            st.lava_dmg_accum -= dec
+    lava_pools = st.lava_pools
+    k = len(lava_pools) - 1
+    while k >= 0:
+        lx, ly, lr, lt = lava_pools[k]
+        lt -= dt
+        if lt <= 0.0:
+            lava_pools.pop(k)
+        else:
+            lava_pools[k] = (lx, ly, lr, lt)
+        k -= 1
+    target_lava = min(MAX_LAVA, LAVA_BASE + st.level//2)
+    while len(lava_pools) < target_lava:
+        spawn_lava_pool(st)
+
+def update(st):
+    """Step st by however much time its clock says has passed."""
+    recorder = st.recorder
+    for dt in substeps(st.clock.tick()):
+        if recorder is not None:
+            dt = recorder.tick(dt)
+        step(st, dt)
+
+def move_player(st, dt: float):
+    """Walk by the held keys and follow the jump arc for the dt that ends at
+    st.clock.now.  Networked clients run this ahead of the server to predict
+    their own bowl (prediction.py)."""
+    now = st.clock.now
+    st.player_speed = BASE_SPEED + st.speed_bonus
+    if now < st.boost_until:
+        st.player_speed *= BOOST_MULTIPLIER
+    prev_x, prev_y = st.player_x, st.player_y
+    if st.running:
+        keys = st.keys
+        move_x = 0.0; move_y = 0.0
+        if b"w" in keys: move_y += 1
+        if b"s" in keys: move_y -= 1
+        if b"a" in keys: move_x += 1
+        if b"d" in keys: move_x -= 1
+        if move_x != 0 or move_y != 0:
+            mag = math.sqrt(move_x*move_x + move_y*move_y)
+            move_x /= mag; move_y /= mag
+            yaw = math.radians(st.cam_yaw)
+            fwdx = math.cos(yaw); fwdy = math.sin(yaw)
+            leftx = -fwdy; lefty = fwdx
+            dirx = fwdx*move_y + leftx*move_x
+            diry = fwdy*move_y + lefty*move_x
+            speed = st.player_speed
+            try_move(st, dirx * speed * dt, diry * speed * dt)
+            moved = math.hypot(st.player_x - prev_x, st.player_y - prev_y)
+            if moved > 0.0:
+                st.roll_axis_x, st.roll_axis_y = dirx, diry
+                st.roll_angle = (st.roll_angle + (moved / PLAYER_RADIUS) * (180.0 / math.pi)) % 360.0
+    if not st.on_ground:
+        # follow the planned arc; re-plan only when the horizontal motion
+        # strays from it (new input, speed change, blocked) or the ground does
+        key = (st.geom_version, st.cheat_mode)
+        plan = st.jump_plan
+        if plan is not None and key == st.jump_key:
+            px, py = plan.xy_at(now)
+            if abs(px - st.player_x) > 1e-6 or abs(py - st.player_y) > 1e-6:
+                plan = None
+        if plan is None or key != st.jump_key:
+            plan = plan_jump(now - dt, prev_x, prev_y, st.player_z, st.vz,
+                             (st.player_x - prev_x) / dt, (st.player_y - prev_y) / dt,
+                             GRAVITY, PLAYER_RADIUS, partial(jump_ground_height, st))
+            st.jump_key = key
+        if plan.landed(now):
+            st.player_z = plan.h_land + PLAYER_RADIUS
+            st.vz = 0.0
+            st.on_ground = True
+            st.jump_plan = None
+        else:
+            st.player_z = plan.z_at(now)
+            st.vz = plan.vz_at(now)
+            st.jump_plan = plan
+    else:
+        gh = 0.0 if st.cheat_mode else ground_height_memo(st, st.player_x, st.player_y)
+        st.player_z = gh + PLAYER_RADIUS
+
+def step(st, dt: float):
+    """Advance the simulation by dt seconds; no GL calls, safe to run headless."""
+    st.clock.advance(dt)
+    now = st.clock.now
+    if st.running:
+        st.remaining = max(0.0, st.remaining - dt)
+        if st.remaining <= 0.0:
+            st.running = False
+    move_player(st, dt)
+    if LAVA:
+        step_lava(st, dt)
+    collect_overlaps(st)
+    if LEVEL_MODE == "score":
+        new_level = level_from_score(st.score)
+        if new_level != st.level:
+            prev, st.level = st.level, new_level
+            apply_level_changes(st, prev, new_level)
+    st.events.advance(now)
+    breaking_obs = st.breaking_obs
+    j = len(breaking_obs) - 1
+    while j >= 0:
+        bx, by, bs, ttl = breaking_obs[j]
+        ttl -= dt
+        bs = max(0.0, ttl / BREAK_TTL)
+        breaking_obs[j] = (bx, by, bs, ttl)
+        if ttl <= 0.0:
+            breaking_obs.pop(j)
+        j -= 1
+    # Chasers from ENEMY_LEVEL on; later levels field more of them
+    while st.enemies.count < enemies_wanted(st):
+        spawn_enemy(st)
+    if st.enemies.count:
+        think_enemies(st)
+        move_enemy(st, dt)
+    if st.rewind is not None:
+        st.rewind.record(*st.enemies.positions())
+    if st.enemies.count:
+        check_enemy_shot(st)
@@ -0,0 +1,75 @@
+"""Gems stored as a palette type id (uint8) next to float32 positions.
+
+Everything a gem's type decides (points, whether it is a speed boost, its
+colour in normal and in cheat mode) lives once in a GemPalette; a gem is
+just an index into it.  Pickup tests run over the position arrays in one
+go and drawing looks colours up by type instead of choosing per gem.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+class GemPalette:
+    """Per-type tables built from (name, rgb, points) entries."""
+    def __init__(self, types: Sequence[Tuple[str, Tuple[float, float, float], int]],
+                 boost: Sequence[str], cheat_color: Tuple[float, float, float]):
+        if len(types) > 256:
+            raise ValueError("a gem palette holds at most 256 types")
+        self.names: List[str] = [t[0] for t in types]
+        self.kind: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.points = np.array([t[2] for t in types], np.int32)
+        self.boost = np.array([t[0] in boost for t in types], bool)
+        self.color = np.array([t[1] for t in types], np.float32).reshape(-1, 3)
+        self.cheat_color = np.tile(np.asarray(cheat_color, np.float32), (len(types), 1))
+
+    def colors(self, cheat: bool) -> np.ndarray:
+        return self.cheat_color if cheat else self.color
+
+class GemPool:
+    def __init__(self, palette: GemPalette, capacity: int = 64):
+        self.palette = palette
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.kind = np.zeros(capacity, np.uint8)
+        self.count = 0  # gems occupy slots [0, count), in spawn order
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, x: float, y: float, kind: int):
+        n = self.count
+        if n == len(self.x):
+            self.x = np.resize(self.x, 2 * n)
+            self.y = np.resize(self.y, 2 * n)
+            self.kind = np.resize(self.kind, 2 * n)
+        self.x[n] = x
+        self.y[n] = y
+        self.kind[n] = kind
+        self.count = n + 1
+
+    def positions(self):
+        return self.x[:self.count], self.y[:self.count]
+
+    def kinds(self) -> np.ndarray:
+        return self.kind[:self.count]
+
+    def touching(self, px: float, py: float, reach: float) -> np.ndarray:
+        """Indices, in order, of the gems within reach of (px, py)."""
+        x, y = self.positions()
+        dx = x.astype(np.float64) - px
+        dy = y.astype(np.float64) - py
+        return (dx*dx + dy*dy <= reach * reach).nonzero()[0]
+
+    def remove(self, idx: np.ndarray):
+        """Drop the gems at idx; the rest keep their order."""
+        n = self.count
+        keep = np.ones(n, bool)
+        keep[idx] = False
+        m = int(keep.sum())
+        self.x[:m] = self.x[:n][keep]
+        self.y[:m] = self.y[:n][keep]
+        self.kind[:m] = self.kind[:n][keep]
+        self.count = m
@@ -0,0 +1,368 @@
+"""OpenGL/GLUT renderer: the game window, its drawing and its input callbacks.
+
+Only imported when a window is opened (render.make_renderer("gl")).  Every
+draw function takes the configured game module g, for the feature switches
+and sizes, and the GameState st being shown.
+"""
+import math
+from functools import partial
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+
+from .render import Renderer
+
+WIN_W, WIN_H = 1280, 720
+
+def draw_text_screen(x: float, y: float, s: str, font=GLUT_BITMAP_HELVETICA_18):
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity()
+    glMatrixMode(GL_MODELVIEW); glPushMatrix(); glLoadIdentity()
+    glRasterPos2f(x, y)
+    glColor3f(1.0, 1.0, 1.0)
+    for ch in s:
+        glutBitmapCharacter(font, ord(ch))
+    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+
+def draw_ground_grid(g):
+    GRID_SIZE, CELL = g.GRID_SIZE, g.CELL
+    glColor3f(0.2, 0.2, 0.2)
+    step = CELL
+    for i in range(-GRID_SIZE, GRID_SIZE+1):
+        glPushMatrix()
+        glTranslatef(i*step, 0.0, -0.01)
+        glScalef(0.05, (2*GRID_SIZE+1)*step, 0.02)
+        glutSolidCube(1.0)
+        glPopMatrix()
+        glPushMatrix()
+        glTranslatef(0.0, i*step, -0.01)
+        glScalef((2*GRID_SIZE+1)*CELL, 0.05, 0.02)
+        glutSolidCube(1.0)
+        glPopMatrix()
+
+def draw_skybox(g):
+    glDepthMask(GL_FALSE)
+    glPushMatrix()
+    glColor3f(0.04, 0.05, 0.09)
+    size = (2*g.GRID_SIZE + 4)
+    glTranslatef(0.0, 0.0, size * 0.5)
+    glScalef(size*g.CELL, size*g.CELL, size)
+    glutSolidCube(1.0)
+    glPopMatrix()
+    glDepthMask(GL_TRUE)
+
+def draw_ground_tiles(g):
+    tile = 1.0
+    half = g.GRID_SIZE
+    for i in range(-half, half+1):
+        for j in range(-half, half+1):
+            shade = 0.15 + 0.05 * ((i + j) & 1)
+            glColor3f(shade, shade*1.05, shade*1.10)
+            glPushMatrix()
+            glTranslatef(i*tile, j*tile, -0.005)
+            glScalef(tile*0.98, tile*0.98, 0.01)
+            glutSolidCube(1.0)
+            glPopMatrix()
+
+def draw_perimeter_pillars(g):
+    GRID_SIZE, CELL = g.GRID_SIZE, g.CELL
+    for i in range(-GRID_SIZE-2, GRID_SIZE+3):
+        for j in (-GRID_SIZE-2, GRID_SIZE+2):
+            h = 2.0 + (abs(i) % 5) * 0.7
+            shade = 0.20 + 0.03*h
+            glColor3f(shade, shade+0.02, shade+0.04)
+            glPushMatrix()
+            glTranslatef(i*CELL, j*CELL, h*0.5)
+            glScalef(0.5, 0.5, h)
+            glutSolidCube(1.0)
+            glPopMatrix()
+    for j in range(-GRID_SIZE-1, GRID_SIZE+2):
+        for i in (-GRID_SIZE-2, GRID_SIZE+2):
+            h = 2.0 + (abs(j) % 5) * 0.7
+            shade = 0.20 + 0.03*h
+            glColor3f(shade, shade+0.02, shade+0.04)
+            glPushMatrix()
+            glTranslatef(i*CELL, j*CELL, h*0.5)
+            glScalef(0.5, 0.5, h)
+            glutSolidCube(1.0)
+            glPopMatrix()
+
+def draw_lava(g, st):
+    quad = gluNewQuadric()
+    for (lx, ly, lr, lt) in st.lava_pools:
+        glColor3f(0.9, 0.1, 0.1)
+        glPushMatrix()
+        glTranslatef(lx, ly, 0.06)
+        gluDisk(quad, 0.0, lr, 64, 1)
+        glPopMatrix()
+
+def draw_player(g, st):
+    if g.PLAYER_MODEL == "ball":
+        draw_player_ball(g, st)
+    else:
+        draw_player_bowl(g, st)
+
+def draw_player_ball(g, st):
+    glPushMatrix()
+    glTranslatef(st.player_x, st.player_y, st.player_z)
+    glRotatef(st.roll_angle, st.roll_axis_y, -st.roll_axis_x, 0.0)
+    glColor3f(1.0, 0.2, 0.2)
+    glutSolidSphere(g.PLAYER_RADIUS, 18, 14)
+    glPopMatrix()
+
+def draw_player_bowl(g, st):
+    PLAYER_RADIUS = g.PLAYER_RADIUS
+    quad = gluNewQuadric()
+    glPushMatrix()
+    glTranslatef(st.player_x, st.player_y, st.player_z)
+    glTranslatef(0.0, 0.0, -PLAYER_RADIUS)
+    outer_r = PLAYER_RADIUS * 1.15
+    inner_r = PLAYER_RADIUS * 0.78
+    height = PLAYER_RADIUS * 0.9
+    glColor3f(0.10, 0.45, 0.95)
+    gluDisk(quad, 0.0, outer_r, 32, 1)
+    glPushMatrix()
+    gluCylinder(quad, outer_r, outer_r*0.98, height, 32, 1)
+    glPopMatrix()
+    glColor3f(1.0, 1.0, 1.0)
+    glPushMatrix()
+    glTranslatef(0.0, 0.0, 0.02)
+    gluDisk(quad, 0.0, inner_r, 32, 1)
+    gluCylinder(quad, inner_r, inner_r*0.98, max(0.01, height - 0.02), 32, 1)
+    glPopMatrix()
+    glPopMatrix()
+
+def draw_obstacles(g, st):
+    OBSTACLE_SIZE = g.OBSTACLE_SIZE
+    glColor3f(0.6, 0.6, 0.6)
+    for ox, oy in st.obstacles:
+        glPushMatrix()
+        glTranslatef(ox, oy, 0.5)
+        glScalef(OBSTACLE_SIZE, OBSTACLE_SIZE, OBSTACLE_SIZE)
+        glutSolidCube(1.0)
+        glPopMatrix()
+    for (bx, by, bscale, bttl) in st.breaking_obs:
+        glPushMatrix()
+        glTranslatef(bx, by, 0.5 * max(0.0, bscale))
+        glScalef(OBSTACLE_SIZE * max(0.0, bscale), OBSTACLE_SIZE * max(0.0, bscale), OBSTACLE_SIZE * max(0.0, bscale))
+        f = max(0.0, bttl / g.BREAK_TTL)
+        glColor3f(0.6 * f, 0.6 * f, 0.6 * f)
+        glutSolidCube(1.0)
+        glPopMatrix()
+
+def draw_gems(g, st):
+    gems = st.gems
+    xs, ys = gems.positions()
+    colors = gems.palette.colors(st.cheat_mode)[gems.kinds()]
+    for x, y, (r, gr, b) in zip(xs.tolist(), ys.tolist(), colors.tolist()):
+        glColor3f(r, gr, b)
+        glPushMatrix()
+        glTranslatef(x, y, 0.5)
+        glutSolidSphere(g.GEM_RADIUS, 12, 10)
+        glPopMatrix()
+
+def draw_treasure_boxes(g, st):
+    for x, y, _effect in st.treasure_boxes:
+        glColor3f(0.8, 0.5, 0.0)
+        glPushMatrix()
+        glTranslatef(x, y, 0.5)
+        glutSolidCube(0.9)
+        glPopMatrix()
+
+def draw_enemy(g, st):
+    quad = gluNewQuadric()
+    xs, ys = st.enemies.positions()
+    for enemy_x, enemy_y in zip(xs.tolist(), ys.tolist()):
+        # Draw body
+        glPushMatrix()
+        glTranslatef(enemy_x, enemy_y, g.enemy_z)
+        glColor3f(0.18, 0.06, 0.13)  # dark
+        glutSolidCube(0.8)
+        # Head
+        glPushMatrix()
+        glTranslatef(0.0, 0.0, 0.55)
+        glColor3f(0.85, 0.65, 0.35)
+        glutSolidSphere(0.3, 20, 14)
+        glPopMatrix()
+        # Gun (simple cylinder pointing at player)
+        dx = st.player_x - enemy_x
+        dy = st.player_y - enemy_y
+        angle = math.degrees(math.atan2(dy, dx))
+        glPushMatrix()
+        glRotatef(angle, 0, 0, 1)
+        glTranslatef(0.27, 0, 0.40)
+        glColor3f(0.2, 0.3, 0.9)
+        gluCylinder(quad, 0.08, 0.07, 0.8, 12, 2)
+        glPopMatrix()
+        glPopMatrix()
+
+MM_LEFT = 0.60; MM_RIGHT = 0.98; MM_BOTTOM = -0.18; MM_TOP = 0.36
+def _mm_world_to_uv(g, wx: float, wy: float):
+    span = g.GRID_SIZE * g.CELL
+    u = (wx / (2.0*span)) + 0.5
+    v = (wy / (2.0*span)) + 0.5
+    return g.clamp(u, 0.0, 1.0), g.clamp(v, 0.0, 1.0)
+def _mm_uv_to_ndc(u: float, v: float):
+    x = (MM_LEFT + u * (MM_RIGHT - MM_LEFT)) * 2.0 - 1.0
+    y = (MM_BOTTOM + v * (MM_TOP - MM_BOTTOM)) * 2.0 - 1.0
+    return x, y
+def _mm_draw_quad_ndc(x0, y0, x1, y1):
+    glBegin(GL_QUADS); glVertex2f(x0, y0); glVertex2f(x1, y0); glVertex2f(x1, y1); glVertex2f(x0, y1); glEnd()
+def _mm_draw_disc_ndc(cx, cy, r, segments=18):
+    glBegin(GL_TRIANGLE_FAN); glVertex2f(cx, cy)
+    for i in range(segments+1):
+        ang = (i/segments) * 2.0 * math.pi
+        glVertex2f(cx + r*math.cos(ang), cy + r*math.sin(ang))
+    glEnd()
+
+def draw_minimap(g, st):
+    GRID_SIZE, CELL, OBSTACLE_SIZE = g.GRID_SIZE, g.CELL, g.OBSTACLE_SIZE
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity()
+    glMatrixMode(GL_MODELVIEW);  glPushMatrix();  glLoadIdentity()
+    glColor3f(0.06, 0.08, 0.10); _mm_draw_quad_ndc(MM_LEFT, MM_BOTTOM, MM_RIGHT, MM_TOP)
+    glColor3f(0.8, 0.8, 0.85)
+    glBegin(GL_LINE_LOOP); glVertex2f(MM_LEFT, MM_BOTTOM); glVertex2f(MM_RIGHT, MM_BOTTOM); glVertex2f(MM_RIGHT, MM_TOP); glVertex2f(MM_LEFT, MM_TOP); glEnd()
+    for ox, oy in st.obstacles:
+        u, v = _mm_world_to_uv(g, ox, oy); cx, cy = _mm_uv_to_ndc(u, v)
+        side = (OBSTACLE_SIZE/(2.0*GRID_SIZE*CELL))*(MM_RIGHT-MM_LEFT)
+        side_ndc_x = side*2.0; side_ndc_y = side*2.0*((MM_TOP-MM_BOTTOM)/(MM_RIGHT-MM_LEFT))
+        glColor3f(0.45,0.45,0.45); _mm_draw_quad_ndc(cx-side_ndc_x*0.6, cy-side_ndc_y*0.6, cx+side_ndc_x*0.6, cy+side_ndc_y*0.6)
+    for (rx, ry, sx, sy, sz) in st.obstacles_rect:
+        u, v = _mm_world_to_uv(g, rx, ry); cx, cy = _mm_uv_to_ndc(u, v)
+        wx = (sx/(2.0*GRID_SIZE*CELL))*(MM_RIGHT-MM_LEFT)*2.0
+        wy = (sy/(2.0*GRID_SIZE*CELL))*(MM_TOP-MM_BOTTOM)*2.0
+        glColor3f(0.55,0.55,0.6); _mm_draw_quad_ndc(cx-wx*0.5, cy-wy*0.5, cx+wx*0.5, cy+wy*0.5)
+    for (sx, sy, sdir, length, width, steps, step_h) in st.slopes:
+        u, v = _mm_world_to_uv(g, sx, sy); cx, cy = _mm_uv_to_ndc(u, v)
+        lx = (length/(2.0*GRID_SIZE*CELL))*(MM_RIGHT-MM_LEFT)*2.0
+        wy = (width /(2.0*GRID_SIZE*CELL))*(MM_TOP-MM_BOTTOM)*2.0
+        if sdir == 'x':
+            _mm_draw_quad_ndc(cx-lx*0.5, cy-wy*0.5, cx+lx*0.5, cy+wy*0.5)
+        else:
+            _mm_draw_quad_ndc(cx-wy*0.5, cy-lx*0.5, cx+wy*0.5, cy+lx*0.5)
+    xs, ys = st.gems.positions()
+    colors = st.gems.palette.colors(st.cheat_mode)[st.gems.kinds()]
+    for gx, gy, (r,gr,b) in zip(xs.tolist(), ys.tolist(), colors.tolist()):
+        u,v = _mm_world_to_uv(g, gx,gy); x,y = _mm_uv_to_ndc(u,v)
+        glColor3f(r,gr,b); _mm_draw_disc_ndc(x,y,0.012)
+    u,v = _mm_world_to_uv(g, st.player_x, st.player_y); px,py = _mm_uv_to_ndc(u,v)
+    glColor3f(0.98,0.4,0.4); _mm_draw_disc_ndc(px,py,0.018)
+    for tx, ty, _ in st.treasure_boxes:
+        u,v = _mm_world_to_uv(g, tx,ty); x,y = _mm_uv_to_ndc(u,v)
+        glColor3f(0.8,0.5,0.0); _mm_draw_disc_ndc(x,y,0.01)
+    draw_text_screen((MM_LEFT+0.02)*2.0-1.0, (MM_TOP-0.02)*2.0-1.0, "MiniMap")
+    draw_text_screen((MM_LEFT+0.02)*2.0-1.0, (MM_TOP-0.06)*2.0-1.0, f"P: ({int(st.player_x)},{int(st.player_y)}) z={st.player_z:.1f}")
+    total_obs = len(st.obstacles)+len(st.obstacles_rect)+len(st.slopes)
+    draw_text_screen((MM_LEFT+0.02)*2.0-1.0, (MM_TOP-0.10)*2.0-1.0, f"Gems: {len(st.gems)} Obs: {total_obs}")
+    glMatrixMode(GL_MODELVIEW); glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+
+def _apply_camera(g, st):
+    player_x, player_y, player_z = st.player_x, st.player_y, st.player_z
+    yaw = math.radians(st.cam_yaw)
+    pitch = math.radians(st.cam_pitch)
+    if g.CAMERA == "chase" and not st.first_person_mode:
+        eye_x = player_x - math.cos(yaw) * g.CHASE_BACK
+        eye_y = player_y - math.sin(yaw) * g.CHASE_BACK
+        gluLookAt(eye_x, eye_y, player_z + g.CHASE_UP, player_x, player_y, player_z, 0.0, 0.0, 1.0)
+        return
+
+    dirx = math.cos(pitch) * math.cos(yaw)
+    diry = math.cos(pitch) * math.sin(yaw)
+    dirz = math.sin(pitch)
+
+    if st.first_person_mode:
+        # Camera at player position + eye height offset, looking forward in player direction
+        eye_x = player_x
+        eye_y = player_y
+        eye_z = player_z + g.FP_EYE_OFFSET  # a little above player's center, like eyes height
+        center_x = player_x + math.cos(yaw)
+        center_y = player_y + math.sin(yaw)
+        center_z = eye_z + math.sin(pitch)
+        gluLookAt(eye_x, eye_y, eye_z, center_x, center_y, center_z, 0.0, 0.0, 1.0)
+    else:
+        # Pull the eye in if an obstacle sits between it and the player.
+        dist = st.cam_dist
+        hit = g.solid_rays(st).cast(player_x, player_y, player_z, -dirx, -diry, dirz, st.cam_dist)
+        if hit is not None:
+            dist = max(0.0, hit - g.CAM_PULL_MARGIN)
+        eye_x = player_x - dirx * dist
+        eye_y = player_y - diry * dist
+        eye_z = player_z + dirz * dist
+        gluLookAt(eye_x, eye_y, eye_z, player_x, player_y, player_z, 0.0, 0.0, 1.0)
+
+def draw_hud(g, st):
+    clock = st.clock
+    draw_text_screen(-0.95, 0.92, f"Score: {st.score}")
+    draw_text_screen(-0.20, 0.92, f"Time: {int(max(0, st.remaining))}s")
+    draw_text_screen(0.35, 0.92, f"Level: {st.level}")
+    if not st.running:
+        draw_text_screen(-0.18, 0.00, "TIME UP — Press R to Restart")
+    if st.cheat_mode:
+        draw_text_screen(-0.95, -0.95, "CHEAT: GEM HIGHLIGHT + GHOST")
+    if clock.now < st.boost_until:
+        draw_text_screen(-0.20, -0.95, "SPEED BOOST!")
+    if clock.paused:
+        draw_text_screen(-0.08, 0.10, "PAUSED")
+    elif clock.fixed_dt is None and clock.scale != 1.0:
+        draw_text_screen(0.70, 0.92, f"x{clock.scale:g}")
+
+def display(g, st):
+    GRID_SIZE, CELL = g.GRID_SIZE, g.CELL
+    glClearColor(0.05,0.06,0.08,1.0); glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
+    glViewport(0,0,WIN_W,WIN_H); glMatrixMode(GL_PROJECTION); glLoadIdentity(); gluPerspective(60.0,float(WIN_W)/float(WIN_H),0.1,1000.0)
+    glMatrixMode(GL_MODELVIEW); glLoadIdentity()
+    if g.SCENERY:
+        draw_skybox(g)
+    _apply_camera(g, st)
+    if g.LAVA:
+        draw_lava(g, st)
+    glColor3f(0.08,0.10,0.12); glPushMatrix(); glTranslatef(0.0,0.0,-0.01); glScalef((2*GRID_SIZE+1)*CELL,(2*GRID_SIZE+1)*CELL,0.02); glutSolidCube(1.0); glPopMatrix()
+    draw_ground_grid(g); draw_obstacles(g, st); draw_gems(g, st); draw_treasure_boxes(g, st); draw_player(g, st)
+    if g.SCENERY:
+        draw_ground_tiles(g)
+        draw_perimeter_pillars(g)
+    draw_enemy(g, st)
+    draw_hud(g, st)
+    draw_minimap(g, st)
+    if st.popup_msg and st.clock.now < st.popup_until:
+        draw_text_screen(-0.15, -0.2, st.popup_msg)
+    glutSwapBuffers()
+
+def reshape(w: int, h: int):
+    global WIN_W, WIN_H
+    WIN_W = max(200, w); WIN_H = max(200, h)
+    glViewport(0, 0, WIN_W, WIN_H)
+
+def init_gl():
+    glEnable(GL_DEPTH_TEST); glDepthFunc(GL_LEQUAL); glClearDepth(1.0); glShadeModel(GL_SMOOTH)
+
+def idle(tick):
+    tick()
+    glutPostRedisplay()
+
+class GLRenderer(Renderer):
+    """A GLUT window: draws every frame and forwards keyboard and mouse."""
+
+    def run(self, g, st, tick=None, controls=None):
+        tick = tick or partial(g.update, st)
+        controls = controls or st
+        glutInit()
+        glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGBA | GLUT_DEPTH)
+        glutInitWindowSize(WIN_W, WIN_H)
+        glutInitWindowPosition(50, 50)
+        glutCreateWindow(g.WINDOW_TITLE)
+        init_gl()
+        glutDisplayFunc(partial(self.draw, g, st))
+        glutIdleFunc(partial(idle, tick))
+        glutKeyboardFunc(controls.on_key)
+        try:
+            glutKeyboardUpFunc(controls.on_key_up)
+        except Exception:
+            pass
+        glutSpecialFunc(controls.on_special)
+        glutMouseFunc(controls.on_mouse)  # Register mouse click handler
+        glutReshapeFunc(reshape)
+        glutMainLoop()
+
+    def draw(self, g, st):
+        display(g, st)
@@ -0,0 +1,63 @@
+"""Per-room tick governor: when a server runs short of time, rooms nobody is
+playing give theirs up first.
+
+The governor watches how much of each tick's budget the server spends
+(tick_rooms over 1 / tick_rate, smoothed) and moves a shed level up when
+it passes SHED_LOAD and down when it falls under RESTORE_LOAD.  Each level
+gives a room a sim stride and a snapshot stride, by whether the room is
+idle (game over, or no input for IDLE_SECONDS) or played.
+
+A room on sim stride n is not slowed down: every n server ticks it runs
+the n ticks it is owed back to back, each of the fixed dt, so it goes
+through exactly the steps it would have at full rate and stays
+deterministic (its journal and a replay of it do not change).  What is
+saved is the per-tick overhead and, with the snapshot stride, the
+snapshots; the rooms' batches are staggered by room id so they do not
+all land on the same server tick.
+"""
+from typing import Tuple
+
+SHED_LOAD = 0.75        # share of the tick budget in use that raises the shed level
+RESTORE_LOAD = 0.4      # ... and that lowers it again
+LOAD_SMOOTHING = 0.05   # weight of the newest tick in the load average
+HOLD_TICKS = 30         # ticks between level changes
+IDLE_SECONDS = 5.0      # a room without input for this long counts as idle
+
+# per level: (sim stride, snapshot stride) for idle rooms, then for played ones
+LEVELS = (
+    ((1, 1), (1, 1)),
+    ((4, 4), (1, 1)),
+    ((8, 8), (1, 1)),
+    ((8, 8), (1, 2)),
+)
+
+class Governor:
+    def __init__(self, tick_rate: int):
+        self.budget_us = 1e6 / tick_rate
+        self.idle_ticks = int(IDLE_SECONDS * tick_rate)
+        self.load = 0.0
+        self.level = 0
+        self.changes = 0
+        self._held = 0
+
+    def observe(self, tick_us: float):
+        """Account one server tick that took tick_us."""
+        self.load += LOAD_SMOOTHING * (tick_us / self.budget_us - self.load)
+        self._held += 1
+        if self._held < HOLD_TICKS:
+            return
+        if self.load > SHED_LOAD and self.level < len(LEVELS) - 1:
+            self.level += 1
+        elif self.load < RESTORE_LOAD and self.level > 0:
+            self.level -= 1
+        else:
+            return
+        self._held = 0
+        self.changes += 1
+
+    def idle(self, room) -> bool:
+        return not room.game.running or room.tick - room.input_tick > self.idle_ticks
+
+    def strides(self, room) -> Tuple[int, int]:
+        """(sim stride, snapshot stride) for room at the current level."""
+        return LEVELS[self.level][0 if self.idle(room) else 1]
@@ -0,0 +1,89 @@
+"""Load a game variant as a plain module and drive it without opening a window.
+
+    python -m gem_engine [SESSIONS] [PRESET]   # soak: run full sessions as fast as possible
+"""
+import hashlib, importlib.util, itertools, os, sys, time
+
+from .presets import settings
+from .sim_clock import MAX_STEP, SimClock
+
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game.py")
+
+_instances = itertools.count()
+
+# settings game.py computes from others, recomputed after the overrides
+# unless they are overridden themselves
+DERIVED = {
+    "PLAYER_RADIUS": lambda game: game.PLAYER_DIAM * 0.5,
+}
+
+def load_module(preset: str = "full", overrides: dict = None):
+    # Every call execs a fresh copy of game.py, so variants with different
+    # settings can live side by side in one process.  The preset's settings,
+    # then overrides (LAVA_DPS, GEM_TYPES, ...), are applied before anything
+    # runs.  Sessions of the same variant can share one copy (see new_game).
+    name = f"{__package__}._game_{next(_instances)}"
+    spec = importlib.util.spec_from_file_location(name, GAME_SCRIPT)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    values = settings(preset, overrides)
+    for name, value in values.items():
+        if not hasattr(game, name):
+            raise AttributeError(f"game has no setting {name!r}")
+        setattr(game, name, value)
+    for name, derive in DERIVED.items():
+        if name not in values:
+            setattr(game, name, derive(game))
+    return game
+
+def new_game(module, seed: int = 0, clock: SimClock = None):
+    """A GameState of an already loaded module, seeded and restarted, ready to step()."""
+    game = module.GameState(clock)
+    game.ai.deterministic = True
+    game.rng.seed(seed)
+    game.restart_game()
+    return game
+
+def load_game(preset: str = "full", seed: int = 0, clock: SimClock = None,
+              overrides: dict = None):
+    """A configured game, seeded and restarted, ready to step()."""
+    return new_game(load_module(preset, overrides), seed, clock)
+
+def run_session(game, policy=None, dt: float = MAX_STEP, max_time: float = None):
+    """Step at a fixed dt, without sleeping, until the game ends or max_time passes."""
+    game.clock.fixed_dt = dt
+    end = None if max_time is None else game.clock.now + max_time
+    while game.running and (end is None or game.clock.now < end):
+        if policy is not None:
+            policy(game)
+        game.step(game.clock.tick())
+    return game
+
+def state_digest(game) -> str:
+    """Hash of everything that decides the outcome of a session."""
+    h = hashlib.sha256()
+    for part in (game.score, game.level, game.remaining, game.running, game.gems_collected,
+                 game.player_x, game.player_y, game.player_z, game.vz,
+                 game.gems.kinds().tobytes(), game.gems.x[:game.gems.count].tobytes(),
+                 game.gems.y[:game.gems.count].tobytes(), game.obstacles, game.obstacles_rect, game.slopes,
+                 game.treasure_boxes, game.lava_pools,
+                 game.enemies.x[:game.enemies.count].tobytes(),
+                 game.enemies.y[:game.enemies.count].tobytes()):
+        h.update(repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    preset = sys.argv[2] if len(sys.argv) > 2 else "full"
+    t0 = time.perf_counter()
+    for seed in range(sessions):
+        game = run_session(load_game(preset, seed=seed))
+        ai = game.ai.metrics()
+        print(f"seed={seed} score={game.score} level={game.level} sim_time={game.clock.now:.1f}s "
+              f"ai_latency_ms p50={ai['latency_p50'] * 1000.0:.0f} p99={ai['latency_p99'] * 1000.0:.0f}")
+    wall = time.perf_counter() - t0
+    print(f"{sessions} sessions in {wall:.1f}s ({sessions * 3600.0 / wall:.0f} sessions/hour)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Interest management: send each client only the part of the world it can see.
+
+Every snapshot the room's Frame is binned once into square cells of
+INTEREST_CELL units (CellIndex).  Each client has a View, a rectangle of
+cells around its centre that is wide enough for its camera distance; a
+client's frame is cut out of the index by merging the cells of its
+rectangle, and the delta encoder then turns cells that came into view into
+added rows and cells that left into removals.  The rectangle only moves
+when the centre crosses into another cell or the camera zooms, so edges
+do not flicker, and the cost per client depends on what it sees rather
+than on the size of the world.
+
+    python -m gem_engine.interest [--preset final] [--grid 20 40 80]
+
+compares snapshot sizes and costs with and without interest as the arena
+grows.
+"""
+import argparse, time
+from typing import Dict, Tuple
+
+from . import snapshot
+from .snapshot import ENEMIES, POS_SCALE, Frame
+
+INTEREST_CELL = 8.0          # world units per cell
+INTEREST_MARGIN = 6.0        # seen around the player even at the closest zoom
+INTEREST_PER_CAM_DIST = 1.0  # extra radius per unit of camera distance
+FIRST_PERSON_RADIUS = 48.0   # the first-person eye looks to the horizon
+VIEW_CACHE_MAX = 256         # cut-out tables kept for reuse, per room
+
+Rect = Tuple[int, int, int, int]   # i0, j0, i1, j1, inclusive
+
+_Q_CELL = INTEREST_CELL * POS_SCALE   # cell size in quantized units
+
+def interest_radius(st) -> float:
+    if st.first_person_mode:
+        return FIRST_PERSON_RADIUS
+    return INTEREST_MARGIN + INTEREST_PER_CAM_DIST * st.cam_dist
+
+class View:
+    """One client's rectangle of cells, and how many cells have entered and
+    left it so far."""
+    __slots__ = ("rect", "anchor", "entered", "left")
+
+    def __init__(self):
+        self.rect: Rect = None
+        self.anchor = None   # (cell, radius) the rectangle was computed for
+        self.entered = 0
+        self.left = 0
+
+    def update(self, x: float, y: float, radius: float) -> Rect:
+        cell = (int(x // INTEREST_CELL), int(y // INTEREST_CELL))
+        if (cell, radius) == self.anchor:
+            return self.rect
+        self.anchor = (cell, radius)
+        rect = (int((x - radius) // INTEREST_CELL), int((y - radius) // INTEREST_CELL),
+                int((x + radius) // INTEREST_CELL), int((y + radius) // INTEREST_CELL))
+        if rect != self.rect:
+            old = _area(self.rect)
+            new = _area(rect)
+            self.entered += new - _overlap(self.rect, rect)
+            self.left += old - _overlap(self.rect, rect)
+            self.rect = rect
+        return rect
+
+def _area(r: Rect) -> int:
+    return 0 if r is None else (r[2] - r[0] + 1) * (r[3] - r[1] + 1)
+
+def _overlap(a: Rect, b: Rect) -> int:
+    if a is None or b is None:
+        return 0
+    w = min(a[2], b[2]) - max(a[0], b[0]) + 1
+    h = min(a[3], b[3]) - max(a[1], b[1]) + 1
+    return max(0, w) * max(0, h)
+
+def _bin(table: Dict[tuple, tuple]) -> Dict[Tuple[int, int], Dict[tuple, tuple]]:
+    """Rows by cell; every table's key starts with the quantized x, y."""
+    cells = {}
+    for k, v in table.items():
+        c = (int(k[0] // _Q_CELL), int(k[1] // _Q_CELL))
+        d = cells.get(c)
+        if d is None:
+            d = cells[c] = {}
+        d[k] = v
+    return cells
+
+class CellIndex:
+    """A room's frames binned by cell.  Tables the capture reused (geometry
+    while geom_version holds still) keep their bins and cut-outs, so a
+    client standing still gets the very same table objects back and the
+    encoder skips them without comparing."""
+
+    def __init__(self):
+        self.frame = None
+        self.bins = []      # per table: (source table, cells)
+        self.enemies = None
+        self._cuts: Dict[tuple, tuple] = {}   # (table no, rect) -> (source table, cut-out)
+
+    def index(self, frame: Frame):
+        old = self.bins
+        bins = []
+        for i, table in enumerate(frame.tables):
+            if i < len(old) and old[i][0] is table:
+                bins.append(old[i])
+            else:
+                bins.append((table, _bin(table)))
+        self.bins = bins
+        qx, qy = snapshot.unpack_enemies(frame.blocks[ENEMIES])
+        self.enemies = (qx, qy, qx // _Q_CELL, qy // _Q_CELL)
+        self.frame = frame
+        if len(self._cuts) > VIEW_CACHE_MAX:
+            self._cuts.clear()
+
+    def view(self, rect: Rect) -> Frame:
+        """The indexed frame as seen through rect."""
+        frame = self.frame
+        i0, j0, i1, j1 = rect
+        tables = []
+        for i, (table, cells) in enumerate(self.bins):
+            hit = self._cuts.get((i, rect))
+            if hit is not None and hit[0] is table:
+                tables.append(hit[1])
+                continue
+            out = {}
+            if len(cells) <= (i1 - i0 + 1) * (j1 - j0 + 1):
+                for (ci, cj), d in cells.items():
+                    if i0 <= ci <= i1 and j0 <= cj <= j1:
+                        out.update(d)
+            else:
+                for ci in range(i0, i1 + 1):
+                    for cj in range(j0, j1 + 1):
+                        d = cells.get((ci, cj))
+                        if d:
+                            out.update(d)
+            self._cuts[(i, rect)] = (table, out)
+            tables.append(out)
+        xs, ys, ci, cj = self.enemies
+        keep = (ci >= i0) & (ci <= i1) & (cj >= j0) & (cj <= j1)
+        blocks = list(frame.blocks)
+        blocks[ENEMIES] = snapshot.pack_enemies(xs[keep], ys[keep])
+        return Frame(frame.tick, blocks, tables)
+
+def bench(preset: str, grids, ticks: int = 1200, every: int = 2):
+    """Keyframe and delta bytes and per-client cost, whole world against
+    interest, for arenas of each half-width in grids with obstacles scaled
+    to area.  Binning is paid once per room and reported apart."""
+    from .batch_runner import greedy_policy
+    from .headless import load_game
+    for grid in grids:
+        area = (grid / 20.0) ** 2
+        st = load_game(preset, seed=1, overrides={"GRID_SIZE": grid,
+                                                  "INITIAL_CUBES": int(12 * area)})
+        policy = greedy_policy(1)
+        index = CellIndex()
+        view = View()
+        prev = base_all = base_view = None
+        full_b = view_b = full_key = view_key = 0
+        t_full = t_index = t_view = 0.0
+        sent = 0
+        for tick in range(1, ticks + 1):
+            policy(st)
+            st.step(1.0 / 60.0)
+            if tick % every:
+                continue
+            frame = prev = snapshot.capture(st, tick, prev)
+            t0 = time.perf_counter()
+            full_b += len(snapshot.encode(frame, base_all))
+            t1 = time.perf_counter()
+            index.index(frame)
+            t2 = time.perf_counter()
+            seen = index.view(view.update(st.player_x, st.player_y, interest_radius(st)))
+            view_b += len(snapshot.encode(seen, base_view))
+            t3 = time.perf_counter()
+            t_full += t1 - t0
+            t_index += t2 - t1
+            t_view += t3 - t2
+            full_key += len(snapshot.encode(frame))
+            view_key += len(snapshot.encode(seen))
+            base_all, base_view = frame, seen
+            sent += 1
+        rows = sum(len(t) for t in frame.tables)
+        us = 1e6 / sent
+        print(f"grid {grid:3d} ({rows} rows): whole world keyframe {full_key / sent:.0f} B, "
+              f"delta {full_b / sent:.0f} B, {t_full * us:.1f} us | interest keyframe "
+              f"{view_key / sent:.0f} B, delta {view_b / sent:.0f} B, {t_view * us:.1f} us "
+              f"+ {t_index * us:.1f} us binning per room | cells in {view.entered} out {view.left}")
+
+def main():
+    from .presets import PRESETS
+    ap = argparse.ArgumentParser(description="Snapshot size and cost with and without interest management.")
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    ap.add_argument("--grid", type=int, nargs="+", default=[20, 40, 80])
+    ap.add_argument("--ticks", type=int, default=1200)
+    args = ap.parse_args()
+    bench(args.preset, args.grid, args.ticks)
+
+if __name__ == "__main__":
+    main()
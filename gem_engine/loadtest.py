@@ -0,0 +1,280 @@
+"""Load test: thousands of simulated clients against a local game server.
+
+The server runs in a process of its own, so its CPU time is its own, and
+the clients are spread over --procs more processes on asyncio.  Each room
+gets one player and per-room - 1 spectators.  A player plays a key stream,
+a recorded session log (--record, looped, replay.py) or a random bot's, the
+way the window's keys reach a predicting client: held w/a/s/d, space and
+the left/right arrows become one movement command per input tick, other
+keys go as key events.
+
+End-to-end latency is from sending a command to decoding the first
+snapshot that says the server applied it (snapshot.input_seq): network
+both ways, waiting for the tick, and waiting for the next snapshot.
+
+    python -m gem_engine.loadtest [--clients 1000] [--per-room 4] [--seconds 20]
+                                  [--procs 2] [--record SESSION ...] [--preset final]
+"""
+import argparse, asyncio, multiprocessing, random, time
+from array import array
+from typing import List, Tuple
+
+import numpy as np
+
+from . import protocol, snapshot
+from .client import GameClient
+from .headless import load_module
+from .game import KEY_LEFT, KEY_RIGHT
+from .replay import EV_KEY, EV_KEY_UP, EV_SPECIAL, EV_TICK, read_log
+from .server import TICK_RATE, GameServer, percentile
+
+INPUT_RATE = 30       # commands a player sends per second
+BOT_STREAM_SECONDS = 60.0
+CONNECT_BATCH = 64    # connections opened at once, under the listen backlog
+SENT_RING = 1024      # command send times kept per player
+
+Stream = List[Tuple[float, int, int]]   # (seconds, EV_KEY / EV_KEY_UP / EV_SPECIAL, code)
+
+def log_stream(path: str) -> Stream:
+    """The key events of a session log, timed by its TICK records."""
+    _, _, records = read_log(path)
+    t = 0.0
+    out = []
+    for rec in records:
+        if rec[0] == EV_TICK:
+            t += rec[1]
+        elif rec[0] in (EV_KEY, EV_KEY_UP, EV_SPECIAL) and rec[2] != ord("q"):
+            out.append((t, rec[0], rec[2]))
+    return out
+
+def bot_stream(seed: int, seconds: float = BOT_STREAM_SECONDS, rate: float = 10.0) -> Stream:
+    """What client.bot() presses, as a stream."""
+    r = random.Random(seed)
+    out = []
+    held = None
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        if r.random() < 0.3:
+            if held is not None:
+                out.append((t, EV_KEY_UP, held))
+            held = ord(r.choice("wasd"))
+            out.append((t, EV_KEY, held))
+        if r.random() < 0.05:
+            out.append((t, EV_KEY, ord(" ")))
+            out.append((t, EV_KEY_UP, ord(" ")))
+        if r.random() < 0.1:
+            out.append((t, EV_SPECIAL, r.choice((KEY_LEFT, KEY_RIGHT))))
+    return out
+
+class Player:
+    """Plays a stream into a GameClient and times its commands.  The arrows
+    turn the way the room's preset has them (INVERT_ARROWS)."""
+
+    def __init__(self, client: GameClient, stream: Stream, offset: float, invert_arrows: bool = True):
+        self.client = client
+        self.turn_sign = 1 if invert_arrows else -1
+        self.stream = stream
+        self.length = (stream[-1][0] if stream else 0.0) + 1.0
+        self.at = offset % self.length   # stream time
+        self.pos = 0
+        while self.pos < len(stream) and stream[self.pos][0] < self.at:
+            self.pos += 1
+        self.buttons = 0
+        self.jump = False
+        self.yaw = 0.0    # restart_game's
+        self.seq = 0
+        self.sent = np.zeros(SENT_RING)
+        self.seen = 0
+        self.latency = array("f")
+        client.on_frame = self.on_frame
+
+    def _event(self, kind: int, code: int):
+        key = bytes((code,))
+        if kind == EV_SPECIAL:
+            if code in (KEY_LEFT, KEY_RIGHT):
+                self.yaw += (4 if code == KEY_LEFT else -4) * self.turn_sign
+            else:
+                self.client.send(kind, code)
+        elif key in protocol.MOVE_KEYS:
+            bit = 1 << protocol.MOVE_KEYS.index(key)
+            self.buttons = self.buttons | bit if kind == EV_KEY else self.buttons & ~bit
+        elif key == b" ":
+            self.jump |= kind == EV_KEY
+        else:
+            self.client.send(kind, code)
+
+    def advance(self, dt: float):
+        """Play dt seconds of the stream, then send one command."""
+        stream = self.stream
+        self.at += dt
+        while True:
+            while self.pos < len(stream) and stream[self.pos][0] <= self.at:
+                _, kind, code = stream[self.pos]
+                self._event(kind, code)
+                self.pos += 1
+            if self.at < self.length:
+                break
+            self.at -= self.length   # loop
+            self.pos = 0
+        self.seq += 1
+        buttons = self.buttons | (protocol.JUMP if self.jump else 0)
+        self.jump = False
+        self.sent[self.seq % SENT_RING] = time.perf_counter()
+        self.client.send_command(self.seq, buttons, self.yaw)
+
+    def on_frame(self, frame: snapshot.Frame):
+        seq = snapshot.input_seq(frame)
+        if seq > self.seen:
+            self.seen = seq
+            if self.seq - seq < SENT_RING:
+                self.latency.append(time.perf_counter() - self.sent[seq % SENT_RING])
+
+async def _connect_all(port: int, rooms: List[int], per_room: int, preset: str):
+    async def join(room, role):
+        return await GameClient().connect("127.0.0.1", port, room, preset, seed=room, role=role)
+    clients = []
+    for role, n in ((protocol.PLAYER, 1), (protocol.SPECTATOR, per_room - 1)):
+        todo = [room for room in rooms for _ in range(n)]
+        for i in range(0, len(todo), CONNECT_BATCH):
+            clients += await asyncio.gather(*(join(room, role) for room in todo[i:i + CONNECT_BATCH]))
+    return clients
+
+async def _run_clients(conn, port: int, rooms: List[int], per_room: int, preset: str,
+                       streams: List[Stream], seconds: float, input_rate: int):
+    loop = asyncio.get_running_loop()
+    clients = await _connect_all(port, rooms, per_room, preset)
+    receiving = [asyncio.create_task(c.receive()) for c in clients]
+    r = random.Random(rooms[0] if rooms else 0)
+    invert = load_module(preset).INVERT_ARROWS
+    players = [Player(c, streams[c.room % len(streams)], r.uniform(0.0, 60.0), invert)
+               for c in clients if c.role == protocol.PLAYER]
+    conn.send("ready")
+    await loop.run_in_executor(None, conn.recv)   # go
+    for c in clients:
+        c.bytes_in = c.bytes_out = c.snapshots = 0
+    for p in players:
+        del p.latency[:]
+    period = 1.0 / input_rate
+    t0 = next_t = loop.time()
+    while loop.time() - t0 < seconds:
+        for p in players:
+            p.advance(period)
+        next_t += period
+        await asyncio.sleep(max(0.0, next_t - loop.time()))
+    wall = loop.time() - t0
+    result = {
+        "latency": array("f", [x for p in players for x in p.latency]).tobytes(),
+        "players": len(players),
+        "spectators": len(clients) - len(players),
+        "player_in": sum(p.client.bytes_in for p in players),
+        "player_out": sum(p.client.bytes_out for p in players),
+        "spectator_in": sum(c.bytes_in for c in clients if c.role != protocol.PLAYER),
+        "snapshots": sum(c.snapshots for c in clients),
+        "wall": wall,
+    }
+    conn.send(result)
+    await loop.run_in_executor(None, conn.recv)   # close, once the server has its numbers
+    for c in clients:
+        c.writer.close()
+    await asyncio.gather(*receiving)
+
+def _clients_main(conn, *args):
+    asyncio.run(_run_clients(conn, *args))
+
+async def _run_server(conn, tick_rate: int):
+    loop = asyncio.get_running_loop()
+    server = GameServer(tick_rate)
+    conn.send(await server.start())
+    await loop.run_in_executor(None, conn.recv)   # start
+    rooms0 = {room.id: room.tick for room in server.rooms.values()}
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    await loop.run_in_executor(None, conn.recv)   # stop
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - t0
+    m = server.metrics()
+    m["cpu"] = cpu
+    m["wall"] = wall
+    m["ticks"] = sum(room.tick - rooms0.get(room.id, 0) for room in server.rooms.values())
+    conn.send(m)
+    await loop.run_in_executor(None, conn.recv)   # clients gone
+    for _ in range(100):
+        if not server.rooms:
+            break
+        await asyncio.sleep(0.05)
+    await server.close()
+
+def _server_main(conn, tick_rate: int):
+    asyncio.run(_run_server(conn, tick_rate))
+
+def run(clients: int, per_room: int, seconds: float, procs: int, preset: str,
+        streams: List[Stream], tick_rate: int = TICK_RATE, input_rate: int = INPUT_RATE):
+    ctx = multiprocessing.get_context("spawn")
+    server_conn, child = ctx.Pipe()
+    server = ctx.Process(target=_server_main, args=(child, tick_rate), daemon=True)
+    server.start()
+    port = server_conn.recv()
+    n_rooms = max(1, clients // per_room)
+    rooms = list(range(1, n_rooms + 1))
+    workers = []
+    for i in range(procs):
+        conn, child = ctx.Pipe()
+        p = ctx.Process(target=_clients_main, daemon=True,
+                        args=(child, port, rooms[i::procs], per_room, preset, streams, seconds, input_rate))
+        p.start()
+        workers.append((p, conn))
+    for _, conn in workers:
+        conn.recv()   # ready
+    server_conn.send("start")
+    for _, conn in workers:
+        conn.send("go")
+    results = [conn.recv() for _, conn in workers]
+    server_conn.send("stop")
+    m = server_conn.recv()
+    for p, conn in workers:
+        conn.send("close")
+        p.join()
+    server_conn.send("quit")
+    server.join(timeout=5.0)
+
+    latency = array("f")
+    for res in results:
+        latency.frombytes(res["latency"])
+    lat = sorted(x * 1000.0 for x in latency)
+    players = sum(res["players"] for res in results)
+    spectators = sum(res["spectators"] for res in results)
+    wall = max(res["wall"] for res in results)
+    print(f"{players + spectators} clients ({players} players, {spectators} spectators) in "
+          f"{m['rooms']} rooms, {seconds:.0f} s, {len(streams)} key stream(s), {procs} client processes")
+    if lat:
+        print(f"input -> snapshot latency ms: p50 {percentile(lat, 0.5):.1f} p90 {percentile(lat, 0.9):.1f} "
+              f"p99 {percentile(lat, 0.99):.1f} max {lat[-1]:.1f} ({len(lat)} samples)")
+    rooms = max(1, m["rooms"])
+    print(f"server: cpu {m['cpu'] / m['wall'] * 100:.0f}% of a core, {m['cpu'] * 1000.0 / m['wall'] / rooms:.2f} "
+          f"ms/s per room, {m['ticks'] / m['wall'] / rooms:.1f} ticks/s per room (target {tick_rate}), "
+          f"tick p99 {m['server_tick_us_p99']:.0f} us, {m['slips']} slips, governor level {m['governor_level']}")
+    kib = wall * 1024.0
+    print(f"bandwidth per client: player down {sum(r['player_in'] for r in results) / max(1, players) / kib:.2f} "
+          f"KiB/s, up {sum(r['player_out'] for r in results) / max(1, players) / kib:.2f} KiB/s; "
+          f"spectator down {sum(r['spectator_in'] for r in results) / max(1, spectators) / kib:.2f} KiB/s; "
+          f"{sum(r['snapshots'] for r in results) / max(1, players + spectators) / wall:.1f} snapshots/s each")
+
+def main():
+    from .presets import PRESETS
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--clients", type=int, default=1000)
+    ap.add_argument("--per-room", type=int, default=4, help="one player, the rest spectators")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--procs", type=int, default=2, help="client processes")
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    ap.add_argument("--record", nargs="+", metavar="SESSION", help="session logs to replay instead of bots")
+    ap.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    ap.add_argument("--input-rate", type=int, default=INPUT_RATE)
+    args = ap.parse_args()
+    if args.record:
+        streams = [log_stream(path) for path in args.record]
+    else:
+        streams = [bot_stream(seed) for seed in range(1, 9)]
+    run(args.clients, max(1, args.per_room), args.seconds, max(1, args.procs), args.preset,
+        streams, args.tick_rate, args.input_rate)
+
+if __name__ == "__main__":
+    main()
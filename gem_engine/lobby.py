@@ -0,0 +1,352 @@
+"""Lobby: spread rooms over worker processes and move them when one is slow.
+
+One process with the GIL runs only so many rooms.  The lobby starts a pool
+of worker processes, each a GameServer with its own event loop, and is the
+one address clients know.  A client's HELLO is answered with a REDIRECT to
+the worker that has, or gets, its room (by room id; new rooms go to the
+worker with the fewest), so the lobby never carries game traffic.
+
+Workers report their tick time p99 and each room's cost every STATS_EVERY
+seconds over a control connection.  When a worker's p99 crosses the
+threshold the lobby tells it to MIGRATE its most expensive rooms to the
+least loaded workers: the room is handed off (GameServer.hand_off, which
+replays the room's current game from its last restart on the new worker),
+its clients follow the redirect, and the route is updated on MOVED.
+
+    python -m gem_engine.lobby [--port 7777] [--workers 4] [--threshold-us 8000]
+    python -m gem_engine.lobby --bench 200 [--workers 4] [--seconds 20] [--placement first]
+
+--bench runs that many loopback bot players, one room each, through the
+lobby; with --placement first every room starts on the first worker, so the
+rebalancing has something to do.
+"""
+import argparse, asyncio, multiprocessing, os, struct, time
+from typing import Dict, List, Tuple
+
+from . import protocol
+from .server import TICK_RATE, GameServer, percentile
+
+STATS_EVERY = 0.5            # seconds between worker reports
+THRESHOLD_US = 8000.0        # server tick p99 that triggers a rebalance, about half a 60 Hz tick
+REBALANCE_TARGET = 0.7       # move rooms until the estimate is under this share of the threshold
+REBALANCE_COOLDOWN = 2.0     # seconds a worker is left alone after rooms moved off or onto it
+ROUTE_GRACE = 2.0            # seconds a new route may go unreported before it is dropped
+
+class Worker:
+    """The lobby's view of one worker process, from its last report."""
+    __slots__ = ("port", "writer", "p99", "clients", "costs", "routed", "calm_until", "moved_out")
+
+    def __init__(self, port: int, writer: asyncio.StreamWriter):
+        self.port = port
+        self.writer = writer
+        self.p99 = 0.0
+        self.clients = 0
+        self.costs: Dict[int, float] = {}   # room id -> mean tick time (us)
+        self.routed = 0                     # rooms the lobby sends here
+        self.calm_until = 0.0
+        self.moved_out = 0
+
+class Lobby:
+    def __init__(self, host: str = "127.0.0.1", threshold_us: float = THRESHOLD_US,
+                 placement: str = "least"):
+        self.host = host
+        self.threshold_us = threshold_us
+        self.placement = placement
+        self.workers: List[Worker] = []
+        self.routes: Dict[int, Tuple[Worker, float]] = {}   # room id -> worker, when routed
+        self.migrations = 0
+        self.failed_migrations = 0
+        self._moving: Dict[int, Tuple[Worker, asyncio.Event]] = {}   # room id -> target
+        self._joined = asyncio.Event()
+        self._servers = []
+        self._balancer = None
+
+    async def start(self, port: int = 0) -> Tuple[int, int]:
+        """Listen for clients and for workers; returns both ports."""
+        public = await asyncio.start_server(self._serve, self.host, port)
+        control = await asyncio.start_server(self._control, self.host, 0)
+        self._servers = [public, control]
+        self._balancer = asyncio.create_task(self._rebalance_loop())
+        return public.sockets[0].getsockname()[1], control.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._balancer.cancel()
+        for s in self._servers:
+            s.close()
+        for w in self.workers:
+            w.writer.close()
+        for _ in range(40):   # until the workers hang up too
+            if not self.workers:
+                break
+            await asyncio.sleep(0.05)
+        for s in self._servers:
+            await s.wait_closed()
+
+    async def wait_workers(self, n: int):
+        while len(self.workers) < n:
+            self._joined.clear()
+            await self._joined.wait()
+
+    def route(self, room_id: int) -> Worker:
+        hit = self.routes.get(room_id)
+        if hit is not None:
+            return hit[0]
+        if self.placement == "first":
+            worker = self.workers[0]
+        else:
+            worker = min(self.workers, key=lambda w: w.routed)
+        self.routes[room_id] = (worker, time.monotonic())
+        worker.routed += 1
+        return worker
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            kind, payload = await protocol.read_frame(reader)
+            if kind != protocol.HELLO or not self.workers:
+                return
+            room_id = protocol.HELLO_MSG.unpack(payload)[0]
+            moving = self._moving.get(room_id)
+            if moving is not None:
+                await moving[1].wait()
+            writer.write(protocol.redirect(self.host, self.route(room_id).port))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            writer.close()
+
+    async def _control(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        try:
+            kind, payload = await protocol.read_frame(reader)
+            if kind != protocol.WORKER:
+                return
+            worker = Worker(protocol.WORKER_MSG.unpack(payload)[0], writer)
+            self.workers.append(worker)
+            self._joined.set()
+            while True:
+                kind, payload = await protocol.read_frame(reader)
+                if kind == protocol.STATS:
+                    self._stats(worker, payload)
+                elif kind == protocol.MOVED:
+                    room_id, ok = protocol.MOVED_MSG.unpack(payload)
+                    self._moved(worker, room_id, ok)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            writer.close()
+            if worker is not None:
+                self.workers.remove(worker)
+                for room_id in [r for r, (w, _) in self.routes.items() if w is worker]:
+                    del self.routes[room_id]
+                for room_id in [r for r, (w, _) in self._moving.items() if w is worker]:
+                    self._moving.pop(room_id)[1].set()
+
+    def _stats(self, worker: Worker, payload: bytes):
+        worker.p99, _, worker.clients = protocol.STATS_MSG.unpack_from(payload)
+        costs = worker.costs = {}
+        for off in range(protocol.STATS_MSG.size, len(payload), protocol.ROOM_COST_MSG.size):
+            room_id, cost = protocol.ROOM_COST_MSG.unpack_from(payload, off)
+            costs[room_id] = cost
+        stale = time.monotonic() - ROUTE_GRACE
+        for room_id, (w, since) in list(self.routes.items()):
+            if w is worker and since < stale and room_id not in costs and room_id not in self._moving:
+                del self.routes[room_id]   # everyone left and the worker closed the room
+                worker.routed -= 1
+
+    def _moved(self, source: Worker, room_id: int, ok: int):
+        target, done = self._moving.pop(room_id, (None, None))
+        if target is None:
+            return
+        if ok and target in self.workers:
+            hit = self.routes.get(room_id)
+            if hit is not None:
+                hit[0].routed -= 1
+            self.routes[room_id] = (target, time.monotonic())
+            target.routed += 1
+            source.moved_out += 1
+            self.migrations += 1
+        else:
+            self.failed_migrations += 1
+        done.set()
+
+    def migrate(self, source: Worker, target: Worker, room_id: int):
+        self._moving[room_id] = (target, asyncio.Event())
+        source.writer.write(protocol.frame(protocol.MIGRATE, protocol.MIGRATE_MSG.pack(
+            room_id, self.host.encode(), target.port)))
+
+    def rebalance(self):
+        """Move the most expensive rooms off every worker over the threshold,
+        each to whichever worker is then estimated least loaded.  Rooms too
+        big to fit under the goal anywhere do not stop it: the cheapest are
+        then moved as long as that leaves the target below the source."""
+        now = time.monotonic()
+        goal = self.threshold_us * REBALANCE_TARGET
+        for source in self.workers:
+            if source.p99 <= self.threshold_us or now < source.calm_until or len(source.costs) < 2:
+                continue
+            others = [w for w in self.workers if w is not source and now >= w.calm_until]
+            if not others:
+                return
+            # a room's share of the p99, by its share of the summed room costs
+            scale = source.p99 / (sum(source.costs.values()) or 1.0)
+            load = {w: w.p99 for w in others}
+            over = source.p99 - goal
+            rooms = sorted((kv for kv in source.costs.items() if kv[0] not in self._moving),
+                           key=lambda kv: -kv[1])
+            left = []
+            for room_id, cost in rooms:
+                target = min(others, key=load.get)
+                share = cost * scale
+                if over <= 0 or load[target] + share > goal:
+                    left.append((room_id, share))
+                    continue
+                load[target] += share
+                over -= share
+                self.migrate(source, target, room_id)
+                target.calm_until = now + REBALANCE_COOLDOWN
+            for room_id, share in reversed(left):   # cheapest first
+                target = min(others, key=load.get)
+                if over <= 0 or load[target] + share >= goal + over - share:
+                    break
+                load[target] += share
+                over -= share
+                self.migrate(source, target, room_id)
+                target.calm_until = now + REBALANCE_COOLDOWN
+            source.calm_until = now + REBALANCE_COOLDOWN
+
+    async def _rebalance_loop(self):
+        while True:
+            await asyncio.sleep(STATS_EVERY)
+            self.rebalance()
+
+    def metrics(self) -> str:
+        return " | ".join(f"w{i}: rooms={len(w.costs)} clients={w.clients} p99={w.p99:.0f}us"
+                          for i, w in enumerate(self.workers)) + f" | migrations={self.migrations}"
+
+async def _report(server: GameServer, writer: asyncio.StreamWriter):
+    recent = max(1, int(STATS_EVERY * server.tick_rate))
+    while True:
+        await asyncio.sleep(STATS_EVERY)
+        ticks = list(server.tick_all_us)[-recent:]
+        rooms = list(server.rooms.values())
+        clients = sum(len(room.clients) for room in rooms)
+        parts = [protocol.STATS_MSG.pack(percentile(ticks, 0.99), min(len(rooms), 0xFFFF),
+                                         min(clients, 0xFFFF))]
+        for room in rooms:
+            costs = list(room.tick_us)[-recent:]
+            parts.append(protocol.ROOM_COST_MSG.pack(room.id, sum(costs) / max(1, len(costs))))
+        writer.write(protocol.frame(protocol.STATS, b"".join(parts)))
+
+async def _migrate(server: GameServer, writer: asyncio.StreamWriter, room_id: int, host: str, port: int):
+    ok = await server.hand_off(room_id, host, port)
+    writer.write(protocol.frame(protocol.MOVED, protocol.MOVED_MSG.pack(room_id, ok)))
+
+async def run_worker(host: str, control_port: int, tick_rate: int = TICK_RATE):
+    """A GameServer that registers with the lobby at control_port and runs
+    until the lobby hangs up."""
+    server = GameServer(tick_rate)
+    port = await server.start(host, 0)
+    reader, writer = await asyncio.open_connection(host, control_port)
+    writer.write(protocol.frame(protocol.WORKER, protocol.WORKER_MSG.pack(port)))
+    reporting = asyncio.create_task(_report(server, writer))
+    moves = set()
+    try:
+        while True:
+            kind, payload = await protocol.read_frame(reader)
+            if kind == protocol.MIGRATE:
+                room_id, to_host, to_port = protocol.MIGRATE_MSG.unpack(payload)
+                task = asyncio.create_task(_migrate(server, writer, room_id,
+                                                    protocol.unpack_preset(to_host), to_port))
+                moves.add(task)
+                task.add_done_callback(moves.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        reporting.cancel()
+        writer.close()
+        await server.close()
+
+def _worker_main(host: str, control_port: int, tick_rate: int):
+    try:
+        asyncio.run(run_worker(host, control_port, tick_rate))
+    except KeyboardInterrupt:
+        pass
+
+def spawn_workers(n: int, host: str, control_port: int, tick_rate: int) -> List[multiprocessing.Process]:
+    # spawn, not fork: the lobby's event loop is already running
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_worker_main, args=(host, control_port, tick_rate), daemon=True)
+             for _ in range(n)]
+    for p in procs:
+        p.start()
+    return procs
+
+def _stop_workers(procs: List[multiprocessing.Process]):
+    for p in procs:
+        p.join(timeout=2.0)
+        if p.is_alive():
+            p.terminate()
+
+async def serve(host: str, port: int, workers: int, tick_rate: int, threshold_us: float, placement: str):
+    lobby = Lobby(host, threshold_us, placement)
+    port, control = await lobby.start(port)
+    procs = spawn_workers(workers, host, control, tick_rate)
+    await lobby.wait_workers(workers)
+    print(f"lobby on {host}:{port} with {workers} workers at {tick_rate} ticks/s")
+    try:
+        while True:
+            await asyncio.sleep(5.0)
+            print(lobby.metrics())
+    finally:
+        await lobby.close()
+        _stop_workers(procs)
+
+async def bench(rooms: int, workers: int, seconds: float, preset: str, tick_rate: int,
+                threshold_us: float, placement: str):
+    from .client import bot
+    lobby = Lobby("127.0.0.1", threshold_us, placement)
+    port, control = await lobby.start()
+    procs = spawn_workers(workers, "127.0.0.1", control, tick_rate)
+    await lobby.wait_workers(workers)
+    stop = asyncio.Event()
+    bots = [asyncio.create_task(bot("127.0.0.1", port, room=i + 1, preset=preset, seed=i + 1, stop=stop))
+            for i in range(rooms)]
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        await asyncio.sleep(2.0)
+        print(f"t={time.perf_counter() - t0:4.1f}s {lobby.metrics()}")
+    wall = time.perf_counter() - t0
+    stop.set()
+    clients = await asyncio.gather(*bots)
+    await lobby.close()
+    _stop_workers(procs)
+    print(f"{rooms} rooms on {workers} workers ({os.cpu_count()} cpus): {lobby.migrations} rooms migrated, "
+          f"{lobby.failed_migrations} failed, {sum(c.redirects for c in clients)} clients followed a move; "
+          f"{sum(c.snapshots for c in clients) / wall / max(1, rooms):.1f} snapshots/s per client")
+
+def main():
+    from .presets import PRESETS
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    ap.add_argument("--threshold-us", type=float, default=THRESHOLD_US)
+    ap.add_argument("--placement", default="least", choices=("least", "first"))
+    ap.add_argument("--bench", type=int, metavar="ROOMS")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    args = ap.parse_args()
+    try:
+        if args.bench:
+            asyncio.run(bench(args.bench, args.workers, args.seconds, args.preset, args.tick_rate,
+                              args.threshold_us, args.placement))
+        else:
+            asyncio.run(serve(args.host, args.port, args.workers, args.tick_rate,
+                              args.threshold_us, args.placement))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
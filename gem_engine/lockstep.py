@@ -0,0 +1,403 @@
+"""Lockstep mode: peers exchange only their inputs and each runs every game.
+
+For a match on a local network there is no need to send state.  Each of
+the players has a game of their own, all seeded with the match seed, and
+every peer simulates all of them: the game draws all its randomness from
+st.rng (spawn_gem, spawn_lava_pool, spawn_treasure_box, enemy patrols)
+and new_game() makes the AI deterministic, so the same inputs give the
+same games everywhere.
+
+A LockstepHost only relays.  Each tick a peer sends one TURN byte, its held
+w/a/s/d, a jump press and the left/right arrows (protocol.TURN_LEFT /
+TURN_RIGHT), INPUT_DELAY ticks ahead of the tick it is for.  Once the
+host has every player's byte for a tick it sends all of them as one TURN,
+and each peer steps every game with them.  A peer never runs ahead of the
+turns it has, so the slowest peer sets the pace.  Keys that only move the
+camera (zoom, pitch, first person) apply to the peer's own view at once.
+
+Every HASH_EVERY ticks each peer sends the start of a hash of all its
+games (headless.state_digest); the host compares them and tells everyone
+the tick of a DESYNC.
+
+    python -m gem_engine.lockstep [--port 7778] [--players 2] [--preset full]
+    python -m gem_engine.lockstep --bench 4 [--seconds 10] [--desync-at TICK]
+    python template.py --lockstep HOST:PORT [--room N]
+"""
+import argparse, asyncio, hashlib, os, random, struct, threading, time
+from collections import deque
+from typing import Callable, Dict, List
+
+from . import protocol
+from .game import KEY_DOWN, KEY_LEFT, KEY_RIGHT, KEY_UP
+from .headless import load_module, new_game, state_digest
+from .presets import PRESETS
+from .sim_clock import substeps
+
+TICK_RATE = 60
+INPUT_DELAY = 3       # ticks between sampling an input and running it
+HASH_EVERY = 60       # ticks between desync checks
+MAX_AHEAD = 4 * TICK_RATE   # turn bytes a host queues for one peer before giving up on the match
+VIEW_KEYS = (b"+", b"=", b"-", b"_", b"v")   # only move the camera
+
+def apply_turn(game, bits: int):
+    """Run one player's TURN byte on their game."""
+    if bits & protocol.TURN_LEFT:
+        game.on_special(KEY_LEFT, 0, 0)
+    if bits & protocol.TURN_RIGHT:
+        game.on_special(KEY_RIGHT, 0, 0)
+    protocol.apply_command(game, bits & (protocol.JUMP * 2 - 1), game.cam_yaw)
+
+class LockstepPeer:
+    """One peer's games and its local input.  send(data) takes outgoing
+    frames; turn() runs the TURNs as they come and pump() sends the local
+    input as it falls due, both on the thread that owns the games."""
+
+    def __init__(self, module, seed: int, players: int, slot: int, delay: int, tick_rate: int,
+                 send: Callable[[bytes], None]):
+        self.module = module
+        self.games = [new_game(module, seed) for _ in range(players)]
+        self.slot = slot
+        self.delay = delay
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.send = send
+        self.tick = 0          # turns run
+        self.sent = 0          # turn bytes sent
+        self.turns = deque()   # TURNs received and not run yet
+        self.buttons = 0
+        self.extra = 0         # jump and turns since the last byte
+        self.desyncs: List[int] = []
+        self.t0 = None
+
+    @property
+    def game(self):
+        """The local player's game, the one the window shows."""
+        return self.games[self.slot]
+
+    def on_key(self, key: bytes, x: int, y: int):
+        if key in protocol.MOVE_KEYS:
+            self.buttons |= 1 << protocol.MOVE_KEYS.index(key)
+        elif key == b" ":
+            self.extra |= protocol.JUMP
+        elif key in VIEW_KEYS:
+            self.game.on_key(key, x, y)
+            self.game.keys.discard(key)
+
+    def on_key_up(self, key: bytes, x: int, y: int):
+        if key in protocol.MOVE_KEYS:
+            self.buttons &= ~(1 << protocol.MOVE_KEYS.index(key))
+
+    def on_special(self, key: int, x: int, y: int):
+        if key == KEY_LEFT:
+            self.extra |= protocol.TURN_LEFT
+        elif key == KEY_RIGHT:
+            self.extra |= protocol.TURN_RIGHT
+        elif key in (KEY_UP, KEY_DOWN):
+            self.game.on_special(key, x, y)
+
+    def on_mouse(self, button, state, x, y):
+        self.game.on_mouse(button, state, x, y)
+
+    def digest(self) -> bytes:
+        h = hashlib.sha256()
+        for game in self.games:
+            h.update(state_digest(game).encode())
+        return h.digest()[:8]
+
+    def turn(self, bits: bytes):
+        for game, b in zip(self.games, bits):
+            apply_turn(game, b)
+            for h in substeps(self.dt):
+                game.step(h)
+        self.tick += 1
+        if self.tick % HASH_EVERY == 0:
+            self.send(protocol.frame(protocol.HASH, protocol.HASH_MSG.pack(self.tick, self.digest())))
+
+    def pump(self):
+        """Run the TURNs that have arrived, then send the input bytes due by
+        now, never more than 2 * delay ahead of the turns run."""
+        turns = self.turns
+        while turns:
+            self.turn(turns.popleft())
+        now = time.perf_counter()
+        if self.t0 is None:
+            self.t0 = now
+            for _ in range(self.delay):   # the first ticks run with no input
+                self.send(protocol.frame(protocol.TURN, b"\0"))
+            self.sent = self.delay
+        due = min(int((now - self.t0) * self.tick_rate) + self.delay + 1, self.tick + 2 * self.delay)
+        while self.sent < due:
+            self.send(protocol.frame(protocol.TURN, bytes((self.buttons | self.extra,))))
+            self.extra = 0
+            self.sent += 1
+
+async def join(host: str, port: int, match: int, preset: str = "full", seed: int = 0,
+               send: Callable[[bytes], None] = None):
+    """Connect to a host and wait for the match to fill; returns (peer,
+    reader, writer).  Frames go out through send, by default the writer."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(protocol.hello(match, seed, preset))
+    kind, payload = await protocol.read_frame(reader)
+    if kind != protocol.START:
+        raise ConnectionError("host did not start the match")
+    seed, preset, players, slot, delay, tick_rate = protocol.START_MSG.unpack(payload)
+    peer = LockstepPeer(load_module(protocol.unpack_preset(preset)), seed, players, slot, delay,
+                        tick_rate, send or writer.write)
+    return peer, reader, writer
+
+async def receive(peer: LockstepPeer, reader: asyncio.StreamReader):
+    """Queue TURNs and note DESYNCs until the host hangs up."""
+    try:
+        while True:
+            kind, payload = await protocol.read_frame(reader)
+            if kind == protocol.TURN:
+                peer.turns.append(payload)
+            elif kind == protocol.DESYNC:
+                peer.desyncs.append(protocol.DESYNC_MSG.unpack(payload)[0])
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+class Match:
+    __slots__ = ("id", "seed", "preset", "players", "writers", "inputs", "tick", "hashes",
+                 "checks", "desyncs", "bytes_in", "bytes_out")
+
+    def __init__(self, match_id: int, seed: int, preset: str, players: int):
+        self.id = match_id
+        self.seed = seed
+        self.preset = preset
+        self.players = players
+        self.writers: List[asyncio.StreamWriter] = []
+        self.inputs: List[deque] = []   # per slot, turn bytes not relayed yet
+        self.tick = 0
+        self.hashes: Dict[int, List[bytes]] = {}
+        self.checks = 0
+        self.desyncs = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+class LockstepHost:
+    def __init__(self, players: int = 2, delay: int = INPUT_DELAY, tick_rate: int = TICK_RATE):
+        self.players = players
+        self.delay = delay
+        self.tick_rate = tick_rate
+        self.matches: Dict[int, Match] = {}
+        self.finished: List[Match] = []
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        for match in list(self.matches.values()):
+            for w in match.writers:
+                w.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        match = None
+        try:
+            kind, payload = await protocol.read_frame(reader)
+            if kind != protocol.HELLO:
+                return
+            match_id, seed, preset, _ = protocol.HELLO_MSG.unpack(payload)
+            match = self.matches.get(match_id)
+            if match is None:
+                preset = protocol.unpack_preset(preset)
+                if preset not in PRESETS:
+                    return
+                match = self.matches[match_id] = Match(match_id, seed or random.getrandbits(63),
+                                                       preset, self.players)
+            elif len(match.writers) == match.players:
+                match = None   # full, and already playing
+                return
+            slot = len(match.writers)
+            match.writers.append(writer)
+            match.inputs.append(deque())
+            if len(match.writers) == match.players:
+                for i, w in enumerate(match.writers):
+                    w.write(protocol.frame(protocol.START, protocol.START_MSG.pack(
+                        match.seed, match.preset.encode(), match.players, i, self.delay, self.tick_rate)))
+            while True:
+                kind, payload = await protocol.read_frame(reader)
+                match.bytes_in += len(payload) + 5
+                if kind == protocol.TURN:
+                    match.inputs[slot].extend(payload[:1])
+                    if len(match.inputs[slot]) > MAX_AHEAD:
+                        return
+                    self._relay(match)
+                elif kind == protocol.HASH:
+                    self._check(match, slot, *protocol.HASH_MSG.unpack(payload))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            writer.close()
+            if match is not None and self.matches.get(match.id) is match:
+                del self.matches[match.id]   # a player left: the match is over for everyone
+                self.finished.append(match)
+                for w in match.writers:
+                    w.close()
+
+    def _relay(self, match: Match):
+        inputs = match.inputs
+        if len(inputs) < match.players:
+            return
+        while all(inputs):
+            data = protocol.frame(protocol.TURN, bytes(q.popleft() for q in inputs))
+            for w in match.writers:
+                w.write(data)
+            match.bytes_out += len(data) * len(match.writers)
+            match.tick += 1
+
+    def _check(self, match: Match, slot: int, tick: int, digest: bytes):
+        seen = match.hashes.setdefault(tick, [None] * match.players)
+        seen[slot] = digest
+        if any(h is None for h in seen):
+            return
+        del match.hashes[tick]
+        match.checks += 1
+        if len(set(seen)) > 1:
+            match.desyncs += 1
+            data = protocol.frame(protocol.DESYNC, protocol.DESYNC_MSG.pack(tick))
+            for w in match.writers:
+                w.write(data)
+
+class LockstepGame:
+    """A LockstepPeer on a background connection, with the input methods the
+    renderer wants; pump() runs on the window's thread."""
+
+    def __init__(self, host: str, port: int, match: int, preset: str, seed: int = 0):
+        self.loop = asyncio.new_event_loop()
+        self.peer = None
+        self.error = None
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(host, port, match, preset, seed, ready),
+                         daemon=True).start()
+        ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self, host, port, match, preset, seed, ready):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.peer, reader, writer = self.loop.run_until_complete(
+                join(host, port, match, preset, seed, lambda data: self.loop.call_soon_threadsafe(writer.write, data)))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.error = e
+            return
+        finally:
+            ready.set()
+        self.loop.run_until_complete(receive(self.peer, reader))
+
+    def on_key(self, key: bytes, x: int, y: int):
+        if key == b"q":
+            os._exit(0)
+        self.peer.on_key(key, x, y)
+
+    def on_key_up(self, key: bytes, x: int, y: int):
+        self.peer.on_key_up(key, x, y)
+
+    def on_special(self, key: int, x: int, y: int):
+        self.peer.on_special(key, x, y)
+
+    def on_mouse(self, button, state, x, y):
+        self.peer.on_mouse(button, state, x, y)
+
+    def pump(self):
+        self.peer.pump()
+
+async def _bot_peer(port: int, match: int, preset: str, seed: int, stop: asyncio.Event,
+                    desync_at: int = None):
+    """A peer playing a bot key stream (loadtest.bot_stream) until stop."""
+    from .loadtest import bot_stream
+    from .replay import EV_KEY, EV_KEY_UP, EV_SPECIAL
+    sent = [0]
+
+    def send(data):
+        writer.write(data)
+        sent[0] += len(data)
+    peer, reader, writer = await join("127.0.0.1", port, match, preset, send=send)
+    receiving = asyncio.create_task(receive(peer, reader))
+    stream = bot_stream(seed)
+    length = stream[-1][0] + 1.0
+    pos = lap = 0
+    t0 = time.perf_counter()
+    while not stop.is_set() and not receiving.done():
+        at = time.perf_counter() - t0
+        if at // length > lap:   # play the stream again
+            lap += 1
+            pos = 0
+        at -= lap * length
+        while pos < len(stream) and stream[pos][0] <= at:
+            _, kind, code = stream[pos]
+            if kind == EV_SPECIAL:
+                peer.on_special(code, 0, 0)
+            elif kind == EV_KEY:
+                peer.on_key(bytes((code,)), 0, 0)
+            elif kind == EV_KEY_UP:
+                peer.on_key_up(bytes((code,)), 0, 0)
+            pos += 1
+        peer.pump()
+        if desync_at is not None and peer.tick >= desync_at:
+            peer.game.score += 1   # as if a float came out differently here
+            desync_at = None
+        await asyncio.sleep(0.5 / peer.tick_rate)
+    writer.close()
+    await receiving
+    return peer, sent[0]
+
+async def bench(players: int, seconds: float, preset: str, desync_at: int = None):
+    host = LockstepHost(players)
+    port = await host.start()
+    stop = asyncio.Event()
+    peers = [asyncio.create_task(_bot_peer(port, 1, preset, slot + 1, stop,
+                                           desync_at if slot == players - 1 else None))
+             for slot in range(players)]
+    t0 = time.perf_counter()
+    await asyncio.sleep(seconds)
+    stop.set()
+    results = await asyncio.gather(*peers)
+    wall = time.perf_counter() - t0
+    await host.close()
+    match = host.finished[0] if host.finished else None
+    ticks = min(p.tick for p, _ in results)
+    print(f"{players} peers, {preset}: {ticks} ticks in {wall:.1f} s ({ticks / wall:.1f}/s, target {TICK_RATE}), "
+          f"input delay {INPUT_DELAY} ticks")
+    up = sum(sent for _, sent in results) / players / max(1, ticks)
+    down = match.bytes_out / players / max(1, match.tick) if match else 0.0
+    print(f"per player: up {up:.1f} B/tick, down {down:.1f} B/tick ({(up + down) * TICK_RATE / 1024:.2f} KiB/s)")
+    print(f"hash checks {match.checks if match else 0}, desyncs {match.desyncs if match else 0} "
+          f"(peers saw ticks {sorted(set(t for p, _ in results for t in p.desyncs))}); "
+          f"scores {[g.score for g in results[0][0].games]}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7778)
+    ap.add_argument("--players", type=int, default=2)
+    ap.add_argument("--bench", type=int, metavar="PLAYERS")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--preset", default="full", choices=sorted(PRESETS))
+    ap.add_argument("--desync-at", type=int, metavar="TICK", help="with --bench, corrupt one peer's game")
+    args = ap.parse_args()
+
+    async def serve():
+        host = LockstepHost(args.players)
+        port = await host.start(args.host, args.port)
+        print(f"lockstep host on {args.host}:{port}, {args.players} players per match")
+        while True:
+            await asyncio.sleep(5.0)
+            for m in host.matches.values():
+                print(f"match {m.id}: tick {m.tick}, {len(m.writers)}/{m.players} players, "
+                      f"{m.checks} hash checks, {m.desyncs} desyncs")
+    try:
+        if args.bench:
+            asyncio.run(bench(args.bench, args.seconds, args.preset, args.desync_at))
+        else:
+            asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Client-side prediction of the player's own bowl, with server reconciliation.
+
+A predicting client turns its movement keys into one command per server
+tick (protocol.COMMAND: held w/a/s/d, a jump press, the camera yaw), keeps
+it in an InputRing, sends it, and runs it at once through the same
+move_player() the server uses, so the bowl answers without waiting a round
+trip.  Every snapshot says which command the server applied last
+(snapshot.input_seq).  On arrival the client rewinds to the snapshot and
+replays the commands the server has not seen yet; the rest of the world
+is drawn as the server sent it.
+
+    python -m gem_engine.prediction [--preset final] [--latency-ms 100] [--check]
+
+plays a bot against an in-process server over a simulated link and times
+the reconciliations.  --check instead asserts that they are right: a
+snapshot reconciled twice with no new input moves nothing, and over a
+lossless link every correction stays within CHECK_TOLERANCE.
+"""
+import argparse, math, random, time
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+
+from . import protocol, snapshot
+from .sim_clock import substeps
+
+RING_SIZE = 256   # commands kept, over 4 s at 60 ticks/s
+CHECK_TOLERANCE = 4.0 / snapshot.PLAYER_SCALE   # --check: a few quanta of the player's position
+
+class InputRing:
+    """The last RING_SIZE commands; sequence number s lives in slot s % size."""
+    def __init__(self, size: int = RING_SIZE):
+        self.size = size
+        self.buttons = np.zeros(size, np.uint8)
+        self.yaw = np.zeros(size)
+        self.next = 1   # 0 is the "nothing applied yet" of a fresh room
+
+    def push(self, buttons: int, yaw: float) -> int:
+        seq = self.next
+        i = seq % self.size
+        self.buttons[i] = buttons
+        self.yaw[i] = yaw
+        self.next = seq + 1
+        return seq
+
+    def get(self, seq: int) -> Tuple[int, float]:
+        i = seq % self.size
+        return int(self.buttons[i]), float(self.yaw[i])
+
+    def pending(self, acked: int) -> range:
+        """Sequence numbers after acked that are still in the ring."""
+        return range(max(acked + 1, self.next - self.size), self.next)
+
+class Predictor:
+    def __init__(self, module, tick_rate: int):
+        self.move_player = module.move_player
+        self.turn = module.on_special
+        self.dt = 1.0 / tick_rate
+        self.ring = InputRing()
+        self.buttons = 0      # movement keys held now
+        self.jump = False     # space pressed since the last command
+        self.yaw = None       # camera yaw the next command carries; None until the first snapshot
+        self.dirty = False    # a predicted move changed the world (smashed a cube)
+        self.replayed = 0
+
+    def press(self, key: bytes) -> bool:
+        """Take a key the prediction handles; False for any other key."""
+        if key in protocol.MOVE_KEYS:
+            self.buttons |= 1 << protocol.MOVE_KEYS.index(key)
+        elif key == b" ":
+            self.jump = True
+        else:
+            return False
+        return True
+
+    def release(self, key: bytes) -> bool:
+        if key in protocol.MOVE_KEYS:
+            self.buttons &= ~(1 << protocol.MOVE_KEYS.index(key))
+            return True
+        return key == b" "
+
+    def rotate(self, st, key: int):
+        """Turn the camera locally (KEY_LEFT / KEY_RIGHT); the yaw goes out
+        with the next command."""
+        self.turn(st, key, 0, 0)
+        self.yaw = st.cam_yaw
+
+    def next_command(self) -> Tuple[int, int, float]:
+        buttons = self.buttons | (protocol.JUMP if self.jump else 0)
+        self.jump = False
+        return self.ring.push(buttons, self.yaw), buttons, self.yaw
+
+    def run(self, st, buttons: int, yaw: float):
+        """Predict one tick of st's own movement."""
+        world = (st.geom_version, len(st.treasure_boxes), len(st.breaking_obs))
+        protocol.apply_command(st, buttons, yaw)
+        for h in substeps(self.dt):
+            st.clock.advance(h)
+            self.move_player(st, h)
+        if world != (st.geom_version, len(st.treasure_boxes), len(st.breaking_obs)):
+            self.dirty = True
+
+    def reconcile(self, st, frame: snapshot.Frame, shown: snapshot.Frame = None):
+        """Rewind st to frame and replay the commands the server has not
+        applied yet.  The world is synced incrementally against shown; the
+        player and status always come from frame, as st has been predicted
+        past them."""
+        snapshot.apply(st, frame, None if self.dirty else shown)
+        snapshot.apply_player(st, frame)
+        self.dirty = False
+        st.jump_plan = None   # re-planned from the snapshot's height and vz
+        if self.yaw is None:
+            self.yaw = st.cam_yaw
+        for seq in self.ring.pending(snapshot.input_seq(frame)):
+            self.run(st, *self.ring.get(seq))
+            self.replayed += 1
+        st.cam_yaw = self.yaw
+
+def bench(preset: str, latency_ms: float, ticks: int, tick_rate: int = 60, every: int = 2,
+          quiet: bool = False, check_twice: bool = False) -> float:
+    """A wandering bot on a predicting client, with latency_ms each way
+    between it and an in-process server room.  Returns the largest
+    correction."""
+    from .headless import load_module, new_game
+    module = load_module(preset)
+    server = new_game(module, seed=1)
+    client = module.GameState()
+    predictor = Predictor(module, tick_rate)
+    decoder = snapshot.Decoder()
+    delay = max(1, round(latency_ms / 1000.0 * tick_rate))
+    up, down = deque(), deque()      # (tick due, payload)
+    r = random.Random(1)
+    seq_applied = 0
+    prev = shown = None
+    costs, errors = [], []
+    dt = 1.0 / tick_rate
+    for tick in range(1, ticks + 1):
+        # client: take the newest snapshot, then predict this tick
+        while down and down[0][0] <= tick:
+            frame = decoder.decode(down.popleft()[1])
+            before = (client.player_x, client.player_y)
+            t0 = time.perf_counter()
+            predictor.reconcile(client, frame, shown)
+            costs.append(time.perf_counter() - t0)
+            errors.append(math.hypot(client.player_x - before[0], client.player_y - before[1]))
+            shown = frame
+            if check_twice:
+                before = (client.player_x, client.player_y, client.player_z)
+                predictor.reconcile(client, frame, shown)
+                if (client.player_x, client.player_y, client.player_z) != before:
+                    raise AssertionError(f"tick {tick}: reconciling the same snapshot again moved "
+                                         f"the player from {before} to "
+                                         f"{(client.player_x, client.player_y, client.player_z)}")
+        if predictor.yaw is not None:
+            if r.random() < 0.05:
+                predictor.buttons = 1 << r.randrange(len(protocol.MOVE_KEYS))
+            if r.random() < 0.02:
+                predictor.press(b" ")
+            if r.random() < 0.05:
+                predictor.yaw += r.choice((-4.0, 4.0))
+            cmd = predictor.next_command()
+            predictor.run(client, cmd[1], cmd[2])
+            up.append((tick + delay, cmd))
+        # server: apply what has arrived, step, snapshot
+        while up and up[0][0] <= tick:
+            seq_applied, buttons, yaw = up.popleft()[1]
+            protocol.apply_command(server, buttons, yaw)
+        for h in substeps(dt):
+            server.step(h)
+        if tick % every == 0:
+            prev = snapshot.capture(server, tick, prev, seq_applied)
+            down.append((tick + delay, snapshot.encode(prev)))
+    if quiet:
+        return max(errors)
+    costs.sort()
+    pending = predictor.replayed / max(1, len(costs))
+    print(f"{preset}: one-way latency {delay} ticks, {len(costs)} reconciliations replaying "
+          f"{pending:.1f} commands each")
+    print(f"reconcile p50 {costs[len(costs) // 2] * 1e6:.0f} us, p99 {costs[int(len(costs) * 0.99)] * 1e6:.0f} us "
+          f"({costs[int(len(costs) * 0.99)] * tick_rate * 100:.1f}% of a tick); "
+          f"mean correction {sum(errors) / len(errors):.4f} units, max {max(errors):.3f}")
+    return max(errors)
+
+def check(preset: str, ticks: int):
+    """Raise AssertionError unless reconciliation is exact up to quantization."""
+    worst = bench(preset, 0.0, ticks, quiet=True, check_twice=True)
+    if worst > CHECK_TOLERANCE:
+        raise AssertionError(f"{preset}: correction {worst:.4f} units on a lossless link "
+                             f"(tolerance {CHECK_TOLERANCE:.4f})")
+    print(f"{preset}: ok, max correction {worst:.4f} units over {ticks} ticks")
+
+def main():
+    from .presets import PRESETS
+    ap = argparse.ArgumentParser(description="Time prediction and reconciliation over a simulated link.")
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    ap.add_argument("--latency-ms", type=float, default=100.0, help="one way")
+    ap.add_argument("--ticks", type=int, default=3600)
+    ap.add_argument("--check", action="store_true", help="assert reconciliation is exact instead of timing it")
+    args = ap.parse_args()
+    if args.check:
+        check(args.preset, args.ticks)
+    else:
+        bench(args.preset, args.latency_ms, args.ticks)
+
+if __name__ == "__main__":
+    main()
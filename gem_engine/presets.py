@@ -0,0 +1,47 @@
+"""The game variants, each as a set of overrides on game.py's settings.
+
+    full            Sec19 build: everything, including the chasing enemies
+    final           Final_project.py: full terrain, lava and treasure, no enemies
+    view_adjusted   View adjusted.py: as final, first person toggled with V
+    levels          Optimized feature with levels.py: cubes and gems, level every 5 gems
+    treasure_box    treasure box.py: levels plus treasure boxes
+    template        template.py: score-threshold levels, rolling ball, chase camera
+"""
+from typing import Dict
+
+_CLASSIC = {                 # the early builds: flat arena, cubes only
+    "JUMP_V0": 6.5,
+    "TERRAIN": False,
+    "LAVA": False,
+    "ENEMY": False,
+    "SCENERY": False,
+    "CHEAT_GHOST": False,
+    "FP_TOGGLE": None,
+    "INITIAL_CUBES": 18,
+}
+
+PRESETS: Dict[str, Dict] = {
+    "full": {},
+    "final": {"ENEMY": False},
+    "view_adjusted": {"ENEMY": False, "FP_TOGGLE": "v", "FP_EYE_OFFSET": 0.35},
+    "levels": dict(_CLASSIC, TREASURE=False, LEVEL_UP_GEMS=3, LEVEL_SPEED_BONUS=0.6,
+                   WINDOW_TITLE=b"Gem Catcher - Level Every 5 Gems"),
+    "treasure_box": dict(_CLASSIC, LEVEL_UP_GEMS=3),
+    "template": dict(_CLASSIC, TREASURE=False, LEVEL_MODE="score", START_TIME=60.0,
+                     CAMERA="chase", PLAYER_MODEL="ball", INVERT_ARROWS=False,
+                     WINDOW_TITLE=b"GemRush3D"),
+}
+
+def settings(preset: str, overrides: Dict = None) -> Dict:
+    """The preset's overrides with any extra ones layered on top."""
+    if preset not in PRESETS:
+        raise ValueError(f"unknown preset {preset!r}; choose from {sorted(PRESETS)}")
+    out = dict(PRESETS[preset], PRESET=preset)
+    out.update(overrides or {})
+    return out
+
+def play(preset: str):
+    """Open a window and run the variant (command line as in render.py)."""
+    from .headless import load_module
+    from .render import run
+    run(load_module(preset))
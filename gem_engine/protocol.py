@@ -0,0 +1,102 @@
+"""Wire format between the game server and its clients.
+
+Every message is a frame: u32 length of the rest, u8 message type, payload.
+Inputs reuse the session-log event kinds (replay.EV_KEY, ...), so anything
+the GLUT window can send, a recorded session can send too.
+"""
+import asyncio, struct
+from typing import Tuple
+
+from .replay import EV_KEY, EV_KEY_UP, EV_MOUSE, EV_SPECIAL
+
+HELLO, WELCOME, INPUT, STATE, ACK, COMMAND = range(6)
+REDIRECT = 6                                  # go HELLO at another address instead
+ADOPT, ADOPTED = 7, 8                         # server to server: take over a room
+WORKER, STATS, MIGRATE, MOVED = 9, 10, 11, 12   # worker <-> lobby control (lobby.py)
+START, TURN, HASH, DESYNC = 13, 14, 15, 16      # lockstep matches (lockstep.py)
+
+PLAYER, SPECTATOR = 0, 1
+
+_FRAME = struct.Struct("<IB")            # length (type + payload), type
+HELLO_MSG = struct.Struct("<IQ16sB")     # room id, seed, preset, role
+WELCOME_MSG = struct.Struct("<IQ16sHB")  # room id, seed, preset, tick rate, role
+INPUT_MSG = struct.Struct("<Bihhh")      # kind, key byte / special code / button, state, x, y
+ACK_MSG = struct.Struct("<I")            # tick of the newest snapshot decoded
+COMMAND_MSG = struct.Struct("<IBd")      # sequence number, buttons, cam yaw
+REDIRECT_MSG = struct.Struct("<64sH")    # host, port
+ROOM_MSG = struct.Struct("<IQ16sIIHQIB8s")   # room id, seed, preset, tick, last command, tick rate,
+                                             # base seed, base tick, base flags, keys held at the base;
+JOURNAL_MSG = struct.Struct("<IB")       # ... then per input since the base: tick, INPUT, COMMAND or LAG, its message
+LAG_MSG = struct.Struct("<H")            # steps the player's view of the enemies lags (rewind.py)
+WORKER_MSG = struct.Struct("<H")         # the worker's game port
+STATS_MSG = struct.Struct("<fHH")        # tick time p99 (us), rooms, clients;
+ROOM_COST_MSG = struct.Struct("<If")     # ... then per room: id, mean tick time (us)
+MIGRATE_MSG = struct.Struct("<I64sH")    # room id, host and port of the worker to hand it to
+MOVED_MSG = struct.Struct("<IB")         # room id, 1 if handed over
+START_MSG = struct.Struct("<Q16sBBBH")   # match seed, preset, players, your slot, input delay, tick rate
+HASH_MSG = struct.Struct("<I8s")         # tick, start of the hash of every game after it
+DESYNC_MSG = struct.Struct("<I")         # tick whose hashes differed
+
+# Movement a client predicts travels as one COMMAND per tick instead of
+# key events: the held movement keys and a jump press as bits.
+MOVE_KEYS = (b"w", b"a", b"s", b"d")
+JUMP = 1 << len(MOVE_KEYS)
+# A lockstep TURN byte also carries the arrow keys that turn the camera.
+TURN_LEFT, TURN_RIGHT = JUMP << 1, JUMP << 2
+
+MAX_FRAME = 1 << 24
+
+def frame(kind: int, payload: bytes = b"") -> bytes:
+    return _FRAME.pack(len(payload) + 1, kind) + payload
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """Next (type, payload); raises asyncio.IncompleteReadError at end of stream."""
+    length, kind = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if not 1 <= length <= MAX_FRAME:
+        raise ValueError(f"bad frame length {length}")
+    return kind, await reader.readexactly(length - 1)
+
+def hello(room: int, seed: int, preset: str, role: int = PLAYER) -> bytes:
+    return frame(HELLO, HELLO_MSG.pack(room, seed, preset.encode(), role))
+
+def welcome(room: int, seed: int, preset: str, tick_rate: int, role: int) -> bytes:
+    return frame(WELCOME, WELCOME_MSG.pack(room, seed, preset.encode(), tick_rate, role))
+
+def unpack_preset(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode()
+
+def redirect(host: str, port: int) -> bytes:
+    return frame(REDIRECT, REDIRECT_MSG.pack(host.encode(), port))
+
+def input_frame(kind: int, code: int, state: int = 0, x: int = 0, y: int = 0) -> bytes:
+    return frame(INPUT, INPUT_MSG.pack(kind, code, state, x, y))
+
+def ack(tick: int) -> bytes:
+    return frame(ACK, ACK_MSG.pack(tick))
+
+def command(seq: int, buttons: int, yaw: float) -> bytes:
+    return frame(COMMAND, COMMAND_MSG.pack(seq, buttons, yaw))
+
+def apply_command(game, buttons: int, yaw: float):
+    """Hold exactly the movement keys in buttons, face yaw, and jump if asked."""
+    keys = game.keys
+    for bit, key in enumerate(MOVE_KEYS):
+        if buttons >> bit & 1:
+            keys.add(key)
+        else:
+            keys.discard(key)
+    game.cam_yaw = yaw
+    if buttons & JUMP:
+        game.on_key(b" ", 0, 0)
+        game.on_key_up(b" ", 0, 0)
+
+def apply_input(game, kind: int, code: int, state: int = 0, x: int = 0, y: int = 0):
+    """Feed one input to a GameState the way the window would."""
+    if kind == EV_KEY:
+        game.on_key(bytes((code,)), x, y)
+    elif kind == EV_KEY_UP:
+        game.on_key_up(bytes((code,)), x, y)
+    elif kind == EV_SPECIAL:
+        game.on_special(code, x, y)
+    elif kind == EV_MOUSE:
+        game.on_mouse(code, state, x, y)
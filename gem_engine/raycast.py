@@ -0,0 +1,158 @@
+"""Ray casts against the arena geometry by walking the grid (2D DDA).
+
+Every solid is reduced to axis-aligned boxes standing on the ground: a
+cube, a raised block, or one stair step of a slope.  Boxes are binned into
+the grid cells they overlap when the geometry version changes.  A cast
+walks only the cells the ray's ground projection crosses, nearest first,
+tests the boxes binned there with a slab test, and stops as soon as the
+next cell starts beyond the closest hit so far.  Cost grows with the ray's
+length in cells, not with the number of obstacles.
+"""
+import math
+from typing import List, Optional, Sequence, Tuple
+
+Box = Tuple[float, float, float, float, float]  # min x, min y, max x, max y, height
+
+def slope_step_boxes(slope) -> List[Box]:
+    """The stair steps of a slope tuple as boxes (see slope_height_at)."""
+    sx, sy, sdir, length, width, steps, step_h = slope
+    seg = length / steps
+    out = []
+    for k in range(steps):
+        a = -length*0.5 + k*seg
+        if sdir == 'x':
+            out.append((sx + a, sy - width*0.5, sx + a + seg, sy + width*0.5, (k + 1)*step_h))
+        else:
+            out.append((sx - width*0.5, sy + a, sx + width*0.5, sy + a + seg, (k + 1)*step_h))
+    return out
+
+class RayGrid:
+    def __init__(self, grid_size: int, cell: float, margin: int = 4):
+        # margin: extra cells around the arena so boxes poking past its
+        # edge (a slope near the border) still fall inside the grid
+        self.half = grid_size + margin
+        self.cell = cell
+        self.side = 2 * self.half + 1
+        self.boxes: List[Box] = []
+        self.bins: List[List[int]] = [[] for _ in range(self.side * self.side)]
+        self._version = None
+        self._stamp = [0]
+        self._cast_id = 0
+        self.casts = 0
+
+    def sync(self, version: int, cubes, cube_size: float, rects, slopes):
+        """Rebin the geometry if its version moved on since the last call."""
+        if version == self._version:
+            return
+        self._version = version
+        h = cube_size * 0.5
+        boxes = [(ox - h, oy - h, ox + h, oy + h, cube_size) for (ox, oy) in cubes]
+        boxes += [(rx - sx*0.5, ry - sy*0.5, rx + sx*0.5, ry + sy*0.5, sz) for (rx, ry, sx, sy, sz) in rects]
+        for s in slopes:
+            boxes += slope_step_boxes(s)
+        self.boxes = boxes
+        self._stamp = [0] * len(boxes)
+        for b in self.bins:
+            b.clear()
+        for idx, (x0, y0, x1, y1, _) in enumerate(boxes):
+            i0, j0 = self._cell(x0, y0)
+            i1, j1 = self._cell(x1, y1)
+            for j in range(j0, j1 + 1):
+                row = j * self.side
+                for i in range(i0, i1 + 1):
+                    self.bins[row + i].append(idx)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        last = self.side - 1
+        i = int(math.floor(x / self.cell + self.half + 0.5))
+        j = int(math.floor(y / self.cell + self.half + 0.5))
+        return min(last, max(0, i)), min(last, max(0, j))
+
+    def cast(self, ox: float, oy: float, oz: float, dx: float, dy: float, dz: float,
+             max_dist: float) -> Optional[float]:
+        """Distance along the (normalised) ray to the first box it hits, or
+        None if nothing is hit within max_dist."""
+        n = math.sqrt(dx*dx + dy*dy + dz*dz)
+        if n == 0.0:
+            return None
+        dx /= n; dy /= n; dz /= n
+        self.casts += 1
+        self._cast_id += 1
+        cast_id, stamp, boxes, bins, side = self._cast_id, self._stamp, self.boxes, self.bins, self.side
+
+        # grid-space coordinates: cell (i, j) covers [i, i+1) x [j, j+1)
+        inv = 1.0 / self.cell
+        u = ox * inv + self.half + 0.5
+        v = oy * inv + self.half + 0.5
+        du, dv = dx * inv, dy * inv
+
+        # clip the ray to the grid so origins outside the arena still work
+        t_in, t_out = 0.0, max_dist
+        for p, d in ((u, du), (v, dv)):
+            if d == 0.0:
+                if p < 0.0 or p >= side:
+                    return None
+            else:
+                a, b = (0.0 - p) / d, (side - p) / d
+                if a > b:
+                    a, b = b, a
+                t_in, t_out = max(t_in, a), min(t_out, b)
+        if t_in > t_out:
+            return None
+
+        i = min(side - 1, max(0, int(math.floor(u + du * t_in))))
+        j = min(side - 1, max(0, int(math.floor(v + dv * t_in))))
+        step_i = 1 if du > 0 else -1
+        step_j = 1 if dv > 0 else -1
+        t_next_i = ((i + (step_i > 0)) - u) / du if du != 0.0 else math.inf
+        t_next_j = ((j + (step_j > 0)) - v) / dv if dv != 0.0 else math.inf
+        t_delta_i = abs(1.0 / du) if du != 0.0 else math.inf
+        t_delta_j = abs(1.0 / dv) if dv != 0.0 else math.inf
+
+        best = None
+        t_cell = t_in
+        while t_cell <= t_out and (best is None or t_cell <= best):
+            for idx in bins[j * side + i]:
+                if stamp[idx] == cast_id:
+                    continue
+                stamp[idx] = cast_id
+                t = _ray_box(ox, oy, oz, dx, dy, dz, boxes[idx])
+                if t is not None and t <= max_dist and (best is None or t < best):
+                    best = t
+            if t_next_i < t_next_j:
+                t_cell = t_next_i; t_next_i += t_delta_i; i += step_i
+                if i < 0 or i >= side:
+                    break
+            else:
+                t_cell = t_next_j; t_next_j += t_delta_j; j += step_j
+                if j < 0 or j >= side:
+                    break
+        return best
+
+    def cast_many(self, rays: Sequence[Tuple[float, float, float, float, float, float, float]]) -> List[Optional[float]]:
+        """cast() for a batch of (ox, oy, oz, dx, dy, dz, max_dist) rays."""
+        cast = self.cast
+        return [cast(*r) for r in rays]
+
+    def line_of_sight(self, ax, ay, az, bx, by, bz) -> bool:
+        """True if nothing solid lies between the two points."""
+        dx, dy, dz = bx - ax, by - ay, bz - az
+        d = math.sqrt(dx*dx + dy*dy + dz*dz)
+        return d == 0.0 or self.cast(ax, ay, az, dx, dy, dz, d) is None
+
+def _ray_box(ox, oy, oz, dx, dy, dz, box) -> Optional[float]:
+    x0, y0, x1, y1, h = box
+    t0, t1 = 0.0, math.inf
+    for p, d, lo, hi in ((ox, dx, x0, x1), (oy, dy, y0, y1), (oz, dz, 0.0, h)):
+        if d == 0.0:
+            if p < lo or p > hi:
+                return None
+        else:
+            a, b = (lo - p) / d, (hi - p) / d
+            if a > b:
+                a, b = b, a
+            if a > t0: t0 = a
+            if b < t1: t1 = b
+            if t0 > t1:
+                return None
+    return t0
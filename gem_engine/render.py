@@ -0,0 +1,97 @@
+"""Renderers, and the launcher that opens a game with one.
+
+A renderer shows a GameState and feeds it input.  The OpenGL one lives in
+gl_renderer.py and is only imported by make_renderer("gl"), so the
+simulation, headless runs, batch workers and servers never load PyOpenGL.
+
+    python <variant script> [--seed N] [--record session.gemrec]
+                            [--timescale X] [--fixed-dt SECONDS] [--renderer gl|null]
+                            [--connect HOST:PORT [--room N]]
+                            [--lockstep HOST:PORT [--room N]]
+
+--connect plays on a game server (server.py) instead: input goes to the
+server and the window shows the snapshots it sends back, with the bowl's
+own movement predicted ahead of them.  --lockstep joins a lockstep match
+(lockstep.py): only inputs cross the network and the window shows this
+player's game out of the ones every peer runs.
+"""
+import sys, time
+from functools import partial
+
+from .replay import Recorder
+
+RENDERERS = ("gl", "null")
+
+class Renderer:
+    """What the launcher needs from a display backend.  g is the configured
+    game module, st the GameState being shown.  tick() advances st, by
+    default g.update(st); controls takes input, by default st itself."""
+
+    def run(self, g, st, tick=None, controls=None):
+        """Call tick() and draw until the session is over."""
+        raise NotImplementedError
+
+    def draw(self, g, st):
+        """Show one frame of st."""
+        raise NotImplementedError
+
+class NullRenderer(Renderer):
+    """Shows nothing and takes no input; plays until the session ends."""
+
+    def run(self, g, st, tick=None, controls=None):
+        tick = tick or partial(g.update, st)
+        while st.running:
+            tick()
+            self.draw(g, st)
+
+    def draw(self, g, st):
+        pass
+
+def make_renderer(name: str = "gl") -> Renderer:
+    if name == "null":
+        return NullRenderer()
+    if name == "gl":
+        from .gl_renderer import GLRenderer
+        return GLRenderer()
+    raise ValueError(f"unknown renderer {name!r}; choose from {list(RENDERERS)}")
+
+def run(g, argv=None):
+    """Play the configured game module g with the command line above."""
+    args = sys.argv[1:] if argv is None else argv
+    st = g.GameState()
+    if "--timescale" in args:
+        st.clock.set_scale(float(args[args.index("--timescale") + 1]))
+    if "--fixed-dt" in args:
+        st.clock.fixed_dt = float(args[args.index("--fixed-dt") + 1])
+    seed = int(args[args.index("--seed") + 1]) if "--seed" in args else int(time.time() * 1000)
+    seed &= 0xFFFFFFFFFFFFFFFF
+    st.rng.seed(seed)
+    if "--record" in args:
+        st.recorder = Recorder(args[args.index("--record") + 1], seed, g.PRESET)
+        st.ai.deterministic = True
+    renderer = make_renderer(args[args.index("--renderer") + 1] if "--renderer" in args else "gl")
+    if "--connect" in args:
+        from .client import RemoteGame
+        from .headless import load_module
+        host, port = args[args.index("--connect") + 1].rsplit(":", 1)
+        room = int(args[args.index("--room") + 1]) if "--room" in args else 1
+        remote = RemoteGame(host, int(port), room, g.PRESET, seed)
+        if remote.client.preset != g.PRESET:   # joined a room of another variant
+            g = load_module(remote.client.preset)
+            st = g.GameState()
+        remote.attach(g, st)
+        renderer.run(g, st, remote.pump, remote)
+        return st
+    if "--lockstep" in args:
+        from .lockstep import LockstepGame
+        host, port = args[args.index("--lockstep") + 1].rsplit(":", 1)
+        room = int(args[args.index("--room") + 1]) if "--room" in args else 1
+        lock = LockstepGame(host, int(port), room, g.PRESET, seed)
+        g, st = lock.peer.module, lock.peer.game   # the match's seed and preset
+        renderer.run(g, st, lock.pump, lock)
+        return st
+    st.restart_game()
+    renderer.run(g, st)
+    if st.recorder is not None:
+        st.recorder.close()
+    return st
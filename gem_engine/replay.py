@@ -0,0 +1,121 @@
+"""Compact binary session logs: record live input, replay it headlessly.
+
+A log is a header (magic, version, RNG seed, preset) followed by a stream of records.
+Every simulated frame writes a TICK record holding its dt as float32; input
+records carry the index of the frame they arrived before.  Replaying the
+stream through a fresh game seeded the same way reproduces the session
+exactly, as fast as the CPU allows.
+
+    python -m gem_engine.replay session.gemrec
+"""
+import atexit, struct, sys
+from typing import Iterator, Tuple
+
+MAGIC = b"GEMR"
+VERSION = 2   # 1: no preset field; those logs are all "full" sessions
+
+EV_TICK, EV_KEY, EV_KEY_UP, EV_SPECIAL, EV_MOUSE = range(5)
+
+_HEADER_V1 = struct.Struct("<4sHQ")   # magic, version, seed
+_HEADER = struct.Struct("<4sHQ16s")    # ... and preset name, NUL padded
+_KIND = struct.Struct("<B")
+_TICK = struct.Struct("<f")        # dt
+_KEY = struct.Struct("<IB")        # frame, key byte
+_SPECIAL = struct.Struct("<Ii")    # frame, GLUT special key code
+_MOUSE = struct.Struct("<IBBhh")   # frame, button, state, x, y
+
+_PAYLOAD = {EV_TICK: _TICK, EV_KEY: _KEY, EV_KEY_UP: _KEY, EV_SPECIAL: _SPECIAL, EV_MOUSE: _MOUSE}
+
+class Recorder:
+    def __init__(self, path: str, seed: int, preset: str = "full"):
+        self._f = open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, seed, preset.encode()))
+        self.frame = 0
+        atexit.register(self.close)
+
+    def _write(self, kind: int, *payload):
+        self._f.write(_KIND.pack(kind) + _PAYLOAD[kind].pack(*payload))
+
+    def tick(self, dt: float) -> float:
+        # The live game must step with the float32-rounded dt too, otherwise
+        # the replay would drift from it after the first frame.
+        dt = _TICK.unpack(_TICK.pack(dt))[0]
+        self._write(EV_TICK, dt)
+        self.frame += 1
+        return dt
+
+    def key(self, key: bytes):
+        self._write(EV_KEY, self.frame, key[0])
+
+    def key_up(self, key: bytes):
+        self._write(EV_KEY_UP, self.frame, key[0])
+
+    def special(self, key: int):
+        self._write(EV_SPECIAL, self.frame, key)
+
+    def mouse(self, button: int, state: int, x: int, y: int):
+        self._write(EV_MOUSE, self.frame, button, state, x, y)
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+def read_log(path: str) -> Tuple[int, str, Iterator[Tuple]]:
+    """Return (seed, preset, records); each record is (kind, *payload)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed = _HEADER_V1.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a session log")
+    if version == 1:
+        preset, start = "full", _HEADER_V1.size
+    elif version == VERSION:
+        preset, start = _HEADER.unpack_from(data, 0)[3].rstrip(b"\0").decode(), _HEADER.size
+    else:
+        raise ValueError(f"{path}: unsupported log version {version}")
+
+    def records():
+        off = start
+        while off < len(data):
+            kind = data[off]
+            fmt = _PAYLOAD[kind]
+            yield (kind,) + fmt.unpack_from(data, off + 1)
+            off += 1 + fmt.size
+    return seed, preset, records()
+
+def replay(path: str, game=None):
+    """Run a log through a headless game and return its GameState."""
+    from .headless import load_game
+    seed, preset, records = read_log(path)
+    if game is None:
+        game = load_game(preset, seed=seed)
+    else:
+        game.rng.seed(seed)
+        game.restart_game()
+    for rec in records:
+        kind = rec[0]
+        if kind == EV_TICK:
+            game.step(rec[1])
+        elif kind == EV_KEY:
+            key = bytes((rec[2],))
+            if key != b"q":
+                game.on_key(key, 0, 0)
+        elif kind == EV_KEY_UP:
+            game.on_key_up(bytes((rec[2],)), 0, 0)
+        elif kind == EV_SPECIAL:
+            game.on_special(rec[2], 0, 0)
+        elif kind == EV_MOUSE:
+            game.on_mouse(rec[2], rec[3], rec[4], rec[5])
+    return game
+
+def main():
+    from .headless import state_digest
+    if len(sys.argv) != 2:
+        print("usage: python -m gem_engine.replay SESSION_LOG")
+        sys.exit(2)
+    game = replay(sys.argv[1])
+    print(f"score={game.score} level={game.level} remaining={game.remaining:.3f}")
+    print(f"state={state_digest(game)}")
+
+if __name__ == "__main__":
+    main()
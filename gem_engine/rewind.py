@@ -0,0 +1,49 @@
+"""Recent enemy positions, so a networked room can shoot at what its player saw.
+
+A client draws the enemies as they were in the last snapshot it decoded,
+a round trip and a snapshot interval behind the server, while its own bowl
+is predicted (prediction.py) and so is about where the server has it.  A
+room that sets st.rewind keeps the enemy positions of its last
+REWIND_STEPS steps here, and check_enemy_shot() takes range and line of
+sight from the enemies st.lag_steps steps ago instead of the current ones:
+a player is only shot by an enemy its screen already showed in range.
+The lag is an input like any other (the server journals it), so a room
+stays deterministic.
+"""
+from typing import Tuple
+
+import numpy as np
+
+REWIND_STEPS = 32   # a little over half a second at 60 steps/s; longer lags are clamped
+
+class PositionHistory:
+    """The enemy positions of the last size steps; step s lives in slot
+    s % size.  Rows hold as many enemies as the room has fielded so far."""
+    __slots__ = ("size", "steps", "count", "x", "y")
+
+    def __init__(self, size: int = REWIND_STEPS, capacity: int = 8):
+        self.size = size
+        self.steps = 0
+        self.count = np.zeros(size, np.intp)
+        self.x = np.zeros((size, capacity), np.float32)
+        self.y = np.zeros((size, capacity), np.float32)
+
+    def record(self, xs: np.ndarray, ys: np.ndarray):
+        n = len(xs)
+        if n > self.x.shape[1]:
+            grow = max(n, 2 * self.x.shape[1]) - self.x.shape[1]
+            self.x = np.pad(self.x, ((0, 0), (0, grow)))
+            self.y = np.pad(self.y, ((0, 0), (0, grow)))
+        i = self.steps % self.size
+        self.count[i] = n
+        self.x[i, :n] = xs
+        self.y[i, :n] = ys
+        self.steps += 1
+
+    def back(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Enemy x, y as of n steps before the last recorded one, or the
+        oldest kept."""
+        n = min(n, self.steps - 1, self.size - 1)
+        i = (self.steps - 1 - n) % self.size
+        c = self.count[i]
+        return self.x[i, :c], self.y[i, :c]
@@ -0,0 +1,572 @@
+"""Authoritative game server: many independent rooms on one asyncio loop.
+
+Each room is a headless GameState.  One ticker task steps every room at a
+fixed tick rate and sends each room's clients a snapshot every few ticks:
+the part of the world around the player that the client's camera can see
+(interest.py), as a delta against the last one it acknowledged
+(snapshot.py).  Spectators share one stream per room (SpectatorChannel)
+that is encoded once per snapshot.  Clients only send input and draw what
+they get back: key events (protocol.INPUT), and from a predicting client
+one movement command per tick (protocol.COMMAND, see prediction.py).  The
+first client in a room plays and later ones watch.  Rooms of the same
+preset share one configured game module.
+
+Rooms are deterministic: a room is its seed plus the inputs it applied at
+each tick, which it keeps in a journal.  A restart starts the journal
+over from a fresh game (Room.rebase), so it holds one game's inputs, not
+the room's whole life.  One of them is how far behind the
+player's client shows the enemies, which enemy shots are judged by
+(rewind.py).  hand_off() moves a room to
+another server by sending that (protocol.ADOPT); the receiver replays it
+to the same tick and the clients are redirected there (lobby.py).
+When the server runs short of time, rooms that are idle run their ticks
+in batches and snapshot less often (governor.py).
+
+    python -m gem_engine.server [--host H] [--port P] [--tick-rate 60] [--per-room N]
+    python -m gem_engine.server --bench 200 [--seconds 10] [--preset final]
+                                [--spectators N] [--idle N] [--per-room N]
+
+--bench starts a server plus that many loopback bot players, one room
+each, optionally with N spectators per room and N more rooms whose player
+sits idle, and prints the tick-time and governor metrics.  --per-room N
+also prints the N rooms with the slowest ticks (p99), one line each.
+"""
+import argparse, asyncio, math, random, struct, time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from . import protocol, snapshot
+from .governor import Governor
+from .interest import CellIndex, View, interest_radius
+from .headless import load_module, new_game
+from .presets import PRESETS
+from .replay import EV_KEY, EV_KEY_UP
+from .rewind import REWIND_STEPS, PositionHistory
+from .sim_clock import substeps
+
+TICK_RATE = 60
+SNAPSHOT_EVERY = 2               # ticks between snapshots
+MAX_CATCHUP = 5                  # ticks run back to back before the schedule is let slip
+MAX_CLIENT_BUFFER = 256 * 1024   # skip snapshots to a client with this much still unsent
+SNAPSHOT_HISTORY = 32            # snapshots kept as delta baselines; older acks get a keyframe
+MAX_COMMAND_BACKLOG = 4          # movement commands queued before the oldest are skipped
+SPECTATOR_KEYFRAME_EVERY = 30    # snapshots between keyframes on a spectator channel
+SPECTATOR_BUFFER = 64 * 1024     # a spectator with this much unsent skips snapshots
+RESTORE_BUDGET_US = 2000.0       # replay time between yields when adopting a room
+MOVED_MAX = 4096                 # rooms remembered as handed off, to redirect late joiners
+METRIC_WINDOW = 600              # tick times kept per room
+
+IGNORED_KEYS = (b"q", b"\x1b", b"[", b"]")   # quit, pause and time scale stay client side
+
+def percentile(values, p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p * len(s)))] if s else 0.0
+
+class Client:
+    __slots__ = ("writer", "role", "dropped", "acked", "view", "history", "synced")
+
+    def __init__(self, writer: asyncio.StreamWriter, role: int):
+        self.writer = writer
+        self.role = role
+        self.dropped = 0    # snapshots skipped because the client fell behind
+        self.acked = None   # tick of the newest snapshot the client has decoded
+        self.view = View()
+        self.history: Dict[int, snapshot.Frame] = {}   # tick -> frame sent, oldest first
+        self.synced = False   # spectator: has every frame of its channel's delta chain
+
+class SpectatorChannel:
+    """A room's spectators.  Each snapshot is encoded once, as a delta
+    against the channel's previous one, into one immutable buffer that is
+    written to every subscriber as is.  A subscriber whose socket backs up
+    is skipped, not buffered for; once it drains it rejoins from a keyframe,
+    encoded at most once per snapshot for everyone rejoining, so what a slow
+    spectator missed collapses into a single frame."""
+
+    def __init__(self):
+        self.subscribers: List[Client] = []
+        self.view = View()
+        self.prev = None        # frame the next delta is against
+        self.since_key = 0
+        self.encodes = 0
+        self.bytes_out = 0
+
+    def publish(self, index: CellIndex, x: float, y: float, radius: float):
+        if not self.subscribers:
+            self.prev = None
+            return
+        frame = index.view(self.view.update(x, y, radius))
+        if self.prev is None or self.since_key >= SPECTATOR_KEYFRAME_EVERY:
+            delta = None
+            self.since_key = 0
+        else:
+            delta = memoryview(protocol.frame(protocol.STATE, snapshot.encode(frame, self.prev)))
+            self.encodes += 1
+            self.since_key += 1
+        key = None
+        for c in self.subscribers:
+            transport = c.writer.transport
+            if transport.get_write_buffer_size() > SPECTATOR_BUFFER:
+                c.dropped += 1
+                c.synced = False
+                continue
+            if c.synced and delta is not None:
+                data = delta
+            else:
+                if key is None:
+                    key = memoryview(protocol.frame(protocol.STATE, snapshot.encode(frame)))
+                    self.encodes += 1
+                data = key
+                c.synced = True
+            transport.write(data)
+            self.bytes_out += len(data)
+        self.prev = frame
+
+JOURNAL_INPUT, JOURNAL_COMMAND, JOURNAL_LAG = 0, 1, 2
+BASE_CHEAT, BASE_FIRST_PERSON = 1, 2   # ROOM_MSG base flags
+RESTART_KEY = ord("r")
+MAX_BASE_KEYS = 8                      # keys held across a restart that an export carries
+
+class Room:
+    def __init__(self, room_id: int, module, seed: int):
+        self.id = room_id
+        self.preset = module.PRESET
+        self.module = module
+        self.seed = seed
+        self.game = new_game(module, seed)
+        self.game.rewind = PositionHistory()
+        self.base = (seed, 0, 0, b"")   # seed, tick, flags and held keys the journal starts from
+        self.lag = 0                    # lag_steps from the player's last ack, for the next tick
+        self.tick = 0
+        self.clients: List[Client] = []
+        self.inputs: List[tuple] = []   # INPUT_MSG tuples waiting for the next tick
+        self.commands = deque(maxlen=16 * MAX_COMMAND_BACKLOG)   # COMMAND_MSG tuples, one per tick
+        self.command_seq = 0            # last command applied
+        self.journal: List[bytes] = []  # every input applied, packed with its tick
+        self.index = CellIndex()
+        self.spectators = SpectatorChannel()
+        self.last_frame = None
+        self.tick_us = deque(maxlen=METRIC_WINDOW)
+        self.bytes_out = 0
+        self.input_tick = 0   # last tick that applied any input
+        self.owed = 0         # ticks due but not yet run (governor sim stride)
+        self.unsent = 0       # ticks run since the last snapshot
+        self.strides = (1, 1)
+
+    def step(self, dt: float):
+        game = self.game
+        journal = self.journal
+        if self.inputs or self.commands:
+            self.input_tick = self.tick
+        if self.lag != game.lag_steps:
+            game.lag_steps = self.lag
+            journal.append(protocol.JOURNAL_MSG.pack(self.tick, JOURNAL_LAG) + protocol.LAG_MSG.pack(self.lag))
+        restart = False
+        for ev in self.inputs:
+            protocol.apply_input(game, *ev)
+            journal.append(protocol.JOURNAL_MSG.pack(self.tick, JOURNAL_INPUT) + protocol.INPUT_MSG.pack(*ev))
+            restart |= ev[0] == EV_KEY and ev[1] == RESTART_KEY
+        self.inputs.clear()
+        commands = self.commands
+        if commands:
+            seq, buttons, yaw = commands.popleft()
+            while len(commands) >= MAX_COMMAND_BACKLOG:   # client ran ahead; skip, keep jumps
+                seq, later, yaw = commands.popleft()
+                buttons = later | (buttons & protocol.JUMP)
+            protocol.apply_command(game, buttons, yaw)
+            self.command_seq = seq
+            journal.append(protocol.JOURNAL_MSG.pack(self.tick, JOURNAL_COMMAND)
+                           + protocol.COMMAND_MSG.pack(seq, buttons, yaw))
+        t0 = time.perf_counter_ns()
+        for h in substeps(dt):
+            game.step(h)
+        self.tick_us.append((time.perf_counter_ns() - t0) / 1000.0)
+        self.tick += 1
+        if restart:
+            flags = (BASE_CHEAT if game.cheat_mode else 0) | (BASE_FIRST_PERSON if game.first_person_mode else 0)
+            self.rebase(game.rng.getrandbits(64), self.tick, flags, b"".join(sorted(game.keys))[:MAX_BASE_KEYS])
+
+    def rebase(self, seed: int, tick: int, flags: int, keys: bytes):
+        """Replace the game, from tick on, with a fresh one of seed that keeps
+        what a restart keeps (flags, held keys), and start the journal over."""
+        game = self.game = new_game(self.module, seed)
+        game.rewind = PositionHistory()
+        game.cheat_mode = bool(flags & BASE_CHEAT)
+        game.first_person_mode = bool(flags & BASE_FIRST_PERSON)
+        game.keys.update(bytes((k,)) for k in keys)
+        self.base = (seed, tick, flags, keys)
+        self.journal.clear()
+
+    def export(self, tick_rate: int) -> bytes:
+        """The room as its base and journal, for restore() on another server."""
+        return b"".join([protocol.ROOM_MSG.pack(self.id, self.seed, self.preset.encode(), self.tick,
+                                                self.command_seq, tick_rate, *self.base)] + self.journal)
+
+    @classmethod
+    async def restore(cls, data: bytes, module_of) -> "Room":
+        """Rebuild an exported room by replaying its journal up to its tick;
+        module_of(preset) gives the configured game module.  Yields to the
+        loop whenever RESTORE_BUDGET_US of replay has run, so the server's
+        other rooms keep their rate however heavy this one is."""
+        (room_id, seed, preset, tick, command_seq, tick_rate,
+         base_seed, base_tick, base_flags, base_keys) = protocol.ROOM_MSG.unpack_from(data)
+        room = cls(room_id, module_of(protocol.unpack_preset(preset)), seed)
+        if base_tick:
+            room.rebase(base_seed, base_tick, base_flags, base_keys.rstrip(b"\0"))
+            room.tick = base_tick
+            room.command_seq = command_seq   # in case no command came since
+        dt = 1.0 / tick_rate
+        off = protocol.ROOM_MSG.size
+        budget = int(RESTORE_BUDGET_US * 1000.0)
+        deadline = time.perf_counter_ns() + budget
+        while room.tick < tick:
+            while off < len(data):
+                at, kind = protocol.JOURNAL_MSG.unpack_from(data, off)
+                if at != room.tick:
+                    break
+                off += protocol.JOURNAL_MSG.size
+                if kind == JOURNAL_LAG:
+                    room.lag = protocol.LAG_MSG.unpack_from(data, off)[0]
+                    off += protocol.LAG_MSG.size
+                    continue
+                msg = protocol.INPUT_MSG if kind == JOURNAL_INPUT else protocol.COMMAND_MSG
+                (room.inputs if kind == JOURNAL_INPUT else room.commands).append(msg.unpack_from(data, off))
+                off += msg.size
+            room.step(dt)
+            if time.perf_counter_ns() >= deadline:
+                await asyncio.sleep(0)
+                deadline = time.perf_counter_ns() + budget
+        room.tick_us.clear()
+        return room
+
+    def broadcast(self):
+        game = self.game
+        frame = self.last_frame = snapshot.capture(game, self.tick, self.last_frame,
+                                                          self.command_seq)
+        self.index.index(frame)
+        # Every client follows the room's player, so clients at the same zoom
+        # share one cut-out, and one encoding per baseline.
+        radius = interest_radius(game)
+        self.spectators.publish(self.index, game.player_x, game.player_y, radius)
+        views = {}     # rect -> frame
+        encoded = {}   # (rect, base frame) -> STATE message
+        for c in self.clients:
+            if c.role != protocol.PLAYER:
+                continue
+            if c.writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                c.dropped += 1
+                continue
+            rect = c.view.update(game.player_x, game.player_y, radius)
+            view = views.get(rect)
+            if view is None:
+                view = views[rect] = self.index.view(rect)
+            history = c.history
+            history[view.tick] = view
+            if len(history) > SNAPSHOT_HISTORY:
+                del history[next(iter(history))]
+            base = history.get(c.acked)
+            data = encoded.get((rect, base))
+            if data is None:
+                data = encoded[rect, base] = protocol.frame(protocol.STATE, snapshot.encode(view, base))
+            c.writer.write(data)
+            self.bytes_out += len(data)
+
+    def metrics(self) -> Dict[str, float]:
+        ai = self.game.ai.metrics()
+        return {
+            "tick": self.tick,
+            "clients": len(self.clients),
+            "tick_us_p50": percentile(self.tick_us, 0.50),
+            "tick_us_p99": percentile(self.tick_us, 0.99),
+            "tick_us_max": max(self.tick_us, default=0.0),
+            "bytes_out": self.bytes_out + self.spectators.bytes_out,
+            "spectator_encodes": self.spectators.encodes,
+            "dropped": sum(c.dropped for c in self.clients),
+            "cells_entered": sum(c.view.entered for c in self.clients),
+            "cells_left": sum(c.view.left for c in self.clients),
+            "sim_stride": self.strides[0],
+            "snapshot_stride": self.strides[1],
+            "ai_agents": ai["agents"],
+            "ai_latency_ms_p99": ai["latency_p99"] * 1000.0,
+        }
+
+class GameServer:
+    def __init__(self, tick_rate: int = TICK_RATE, snapshot_every: int = SNAPSHOT_EVERY):
+        self.tick_rate = tick_rate
+        self.snapshot_every = snapshot_every
+        self.rooms: Dict[int, Room] = {}
+        self.late_ticks = 0   # ticks run back to back to catch up
+        self.slips = 0        # times the server fell too far behind and dropped ticks
+        self.loop_lag_ms = deque(maxlen=METRIC_WINDOW)
+        self.tick_all_us = deque(maxlen=METRIC_WINDOW)   # one server tick: every room, with snapshots
+        self.ticks = 0
+        self.governor = Governor(tick_rate)
+        self.steps_per_tick = len(list(substeps(1.0 / tick_rate)))
+        self.moved: Dict[int, Tuple[str, int]] = {}   # room id -> where it was handed off to
+        self._moving: Dict[int, asyncio.Event] = {}
+        self._modules = {}
+        self._server = None
+        self._ticker = None
+
+    def module(self, preset: str):
+        m = self._modules.get(preset)
+        if m is None:
+            m = self._modules[preset] = load_module(preset)
+        return m
+
+    def open_room(self, room_id: int, preset: str, seed: int) -> Room:
+        room = self.rooms[room_id] = Room(room_id, self.module(preset), seed or random.getrandbits(63))
+        return room
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Listen and start ticking; returns the port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        self._ticker = asyncio.create_task(self._run())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._ticker.cancel()
+        self._server.close()
+        for room in self.rooms.values():
+            for c in room.clients:
+                c.writer.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        room = client = None
+        try:
+            kind, payload = await protocol.read_frame(reader)
+            if kind == protocol.ADOPT:
+                room = await Room.restore(payload, self.module)
+                self.rooms[room.id] = room
+                self.moved.pop(room.id, None)
+                writer.write(protocol.frame(protocol.ADOPTED))
+                await writer.drain()
+                room = None
+                return
+            if kind != protocol.HELLO:
+                return
+            room_id, seed, preset, role = protocol.HELLO_MSG.unpack(payload)
+            preset = protocol.unpack_preset(preset)
+            moving = self._moving.get(room_id)
+            if moving is not None:
+                await moving.wait()
+            if room_id in self.moved and room_id not in self.rooms:
+                writer.write(protocol.redirect(*self.moved[room_id]))
+                return
+            room = self.rooms.get(room_id)
+            if room is None:
+                if preset not in PRESETS:
+                    return
+                room = self.open_room(room_id, preset, seed)
+            if role == protocol.PLAYER and any(c.role == protocol.PLAYER for c in room.clients):
+                role = protocol.SPECTATOR
+            client = Client(writer, role)
+            room.clients.append(client)
+            if role == protocol.SPECTATOR:
+                room.spectators.subscribers.append(client)
+            writer.write(protocol.welcome(room.id, room.seed, room.preset, self.tick_rate, role))
+            while True:
+                kind, payload = await protocol.read_frame(reader)
+                if kind == protocol.ACK:
+                    client.acked = acked = protocol.ACK_MSG.unpack(payload)[0]
+                    if client.role == protocol.PLAYER and acked <= room.tick:
+                        # the enemies this client sees are as of its snapshot
+                        room.lag = min(REWIND_STEPS - 1, (room.tick + 1 - acked) * self.steps_per_tick)
+                    continue
+                if client.role != protocol.PLAYER:
+                    continue
+                if kind == protocol.COMMAND:
+                    seq, buttons, yaw = protocol.COMMAND_MSG.unpack(payload)
+                    if math.isfinite(yaw):
+                        room.commands.append((seq, buttons & (protocol.JUMP * 2 - 1), yaw))
+                    continue
+                if kind != protocol.INPUT:
+                    continue
+                ev = protocol.INPUT_MSG.unpack(payload)
+                if ev[0] in (EV_KEY, EV_KEY_UP):
+                    if not 0 <= ev[1] < 256 or bytes((ev[1],)) in IGNORED_KEYS:
+                        continue
+                room.inputs.append(ev)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            if client is not None:
+                room.clients.remove(client)
+                if client.role == protocol.SPECTATOR:
+                    room.spectators.subscribers.remove(client)
+                if not room.clients and self.rooms.get(room.id) is room:
+                    del self.rooms[room.id]
+            writer.close()
+
+    async def hand_off(self, room_id: int, host: str, port: int) -> bool:
+        """Move a room to the server at host:port and send its clients there.
+        The room stops ticking here at once; if the other server cannot take
+        it, it resumes here."""
+        room = self.rooms.pop(room_id, None)
+        if room is None:
+            return False
+        moving = self._moving[room_id] = asyncio.Event()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(protocol.frame(protocol.ADOPT, room.export(self.tick_rate)))
+            kind, _ = await protocol.read_frame(reader)
+            writer.close()
+            if kind != protocol.ADOPTED:
+                raise ConnectionError("room not adopted")
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if room.clients:
+                self.rooms[room_id] = room
+            return False
+        finally:
+            del self._moving[room_id]
+            moving.set()
+        if len(self.moved) >= MOVED_MAX:
+            del self.moved[next(iter(self.moved))]
+        self.moved[room_id] = (host, port)
+        data = protocol.redirect(host, port)
+        for c in room.clients:
+            c.writer.write(data)
+            c.writer.close()
+        return True
+
+    def tick_rooms(self, dt: float):
+        every = self.snapshot_every
+        governor = self.governor
+        n = self.ticks = self.ticks + 1
+        t0 = time.perf_counter_ns()
+        for room in list(self.rooms.values()):
+            sim, snap = room.strides = governor.strides(room)
+            room.owed += 1
+            if room.owed < sim and (n + room.id) % sim:
+                continue
+            for _ in range(room.owed):   # fixed-step catch-up
+                room.step(dt)
+            room.unsent += room.owed
+            room.owed = 0
+            if room.unsent >= every * snap:
+                room.unsent = 0
+                room.broadcast()
+        us = (time.perf_counter_ns() - t0) / 1000.0
+        self.tick_all_us.append(us)
+        governor.observe(us)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        next_t = loop.time()
+        while True:
+            self.loop_lag_ms.append(max(0.0, loop.time() - next_t) * 1000.0)
+            ran = 0
+            while loop.time() >= next_t and ran < MAX_CATCHUP:
+                self.tick_rooms(period)
+                next_t += period
+                ran += 1
+            self.late_ticks += max(0, ran - 1)
+            if loop.time() - next_t > period * MAX_CATCHUP:
+                self.slips += 1
+                next_t = loop.time()
+            await asyncio.sleep(max(0.0, next_t - loop.time()))
+
+    def metrics(self) -> Dict[str, float]:
+        ticks = [t for room in self.rooms.values() for t in room.tick_us]
+        ai = [room.game.ai.metrics() for room in self.rooms.values()]
+        return {
+            "rooms": len(self.rooms),
+            "clients": sum(len(room.clients) for room in self.rooms.values()),
+            "tick_us_p50": percentile(ticks, 0.50),
+            "tick_us_p99": percentile(ticks, 0.99),
+            "server_tick_us_p99": percentile(self.tick_all_us, 0.99),
+            "loop_lag_ms_p99": percentile(self.loop_lag_ms, 0.99),
+            "late_ticks": self.late_ticks,
+            "slips": self.slips,
+            "governor_level": self.governor.level,
+            "governor_load": self.governor.load,
+            "governor_changes": self.governor.changes,
+            "rooms_idle": sum(self.governor.idle(room) for room in self.rooms.values()),
+            "rooms_shed": sum(room.strides != (1, 1) for room in self.rooms.values()),
+            "ai_agents": sum(a["agents"] for a in ai),
+            "ai_latency_ms_p99": max((a["latency_p99"] for a in ai), default=0.0) * 1000.0,   # worst room
+        }
+
+def _print_metrics(m: Dict[str, float]):
+    print(" ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in m.items()))
+
+def _print_rooms(rooms: List[Tuple[int, Dict[str, float]]], worst: int):
+    """The worst rooms by tick time, from (room id, Room.metrics()) pairs."""
+    for room_id, m in sorted(rooms, key=lambda r: -r[1]["tick_us_p99"])[:worst]:
+        print(f"  room {room_id}: ", end="")
+        _print_metrics(m)
+
+async def serve(host: str, port: int, tick_rate: int, per_room: int = 0):
+    server = GameServer(tick_rate)
+    port = await server.start(host, port)
+    print(f"serving on {host}:{port} at {tick_rate} ticks/s")
+    while True:
+        await asyncio.sleep(5.0)
+        _print_metrics(server.metrics())
+        _print_rooms([(room.id, room.metrics()) for room in server.rooms.values()], per_room)
+
+async def bench(rooms: int, seconds: float, preset: str, tick_rate: int, spectators: int = 0,
+                idle: int = 0, per_room: int = 0):
+    from .client import bot, spectator
+    server = GameServer(tick_rate)
+    port = await server.start()
+    stop = asyncio.Event()
+    bots = [asyncio.create_task(bot("127.0.0.1", port, room=i + 1, preset=preset, seed=i + 1, stop=stop))
+            for i in range(rooms)]
+    idlers = [asyncio.create_task(spectator("127.0.0.1", port, room=rooms + i + 1, stop=stop,
+                                            preset=preset, role=protocol.PLAYER))
+              for i in range(idle)]
+    await asyncio.sleep(0.5)   # players first, so they get the rooms
+    watchers = [asyncio.create_task(spectator("127.0.0.1", port, room=i + 1, stop=stop))
+                for i in range(rooms) for _ in range(spectators)]
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    ticks0 = sum(room.tick for room in server.rooms.values())
+    encodes0 = sum(room.spectators.encodes for room in server.rooms.values())
+    await asyncio.sleep(seconds)
+    m = server.metrics()
+    room_metrics = [(room.id, room.metrics()) for room in server.rooms.values()]
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    sim_us = sum(sum(room.tick_us) for room in server.rooms.values())
+    ticks = sum(room.tick for room in server.rooms.values()) - ticks0
+    encodes = sum(room.spectators.encodes for room in server.rooms.values()) - encodes0
+    stop.set()
+    clients = await asyncio.gather(*bots)
+    watched = await asyncio.gather(*watchers)
+    await asyncio.gather(*idlers)
+    await server.close()
+    _print_metrics(m)
+    _print_rooms(room_metrics, per_room)
+    if watched:
+        print(f"{len(watched)} spectators: {encodes / max(1, ticks // SNAPSHOT_EVERY):.2f} "
+              f"encodes per room snapshot, {sum(c.bytes_in for c in watched) / wall / len(watched) / 1024:.1f} KiB/s "
+              f"per spectator, {sum(c.snapshots for c in watched) / wall / len(watched):.1f} snapshots/s each")
+    rooms += idle
+    print(f"{ticks / wall / max(1, rooms):.1f} ticks/s per room (target {tick_rate}), "
+          f"sim {sim_us / 1000.0 / wall / max(1, rooms):.2f} ms/s per room, "
+          f"process cpu {cpu / wall * 100:.0f}% incl. bots, "
+          f"{sum(c.bytes_in for c in clients) / wall / max(1, len(clients)) / 1024:.1f} KiB/s per client")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    ap.add_argument("--bench", type=int, metavar="ROOMS")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    ap.add_argument("--spectators", type=int, default=0, help="per room, with --bench")
+    ap.add_argument("--idle", type=int, default=0, help="extra rooms whose player never moves, with --bench")
+    ap.add_argument("--per-room", type=int, default=0, metavar="N", help="also print the N slowest rooms")
+    args = ap.parse_args()
+    try:
+        if args.bench:
+            asyncio.run(bench(args.bench, args.seconds, args.preset, args.tick_rate, args.spectators,
+                              args.idle, args.per_room))
+        else:
+            asyncio.run(serve(args.host, args.port, args.tick_rate, args.per_room))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""Versioned binary snapshots of a GameState, sent as deltas.
+
+capture() turns what the renderer draws into a Frame: a few packed blocks
+(player, status, popup, enemies) and one table per kind of world entity,
+keyed by the entity's quantized identity (lava pools by x, y, r) with its
+changing fields as the value.  encode(frame, base) sends only the blocks
+and table rows that differ from base, the newest frame the client has
+acknowledged; with no base it sends a keyframe.  On the client a Decoder
+rebuilds frames from their bases and apply() edits a GameState in place
+to match.  What only the server needs (RNG, events, treasure effects,
+enemy AI) stays out.
+
+Positions travel as int16 multiples of 1/POS_SCALE unit, the player's as
+int32 multiples of 1/PLAYER_SCALE and times as whole milliseconds.  Two
+entities of one kind that quantize to the same key arrive as one.
+
+    python -m gem_engine.snapshot [--preset final] [--ticks 3000]
+
+times capture, encode and decode over a bot-played session.
+"""
+import argparse, struct, time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FORMAT = 2
+
+POS_SCALE = 64.0        # world entities: 1/64 unit, +-512 units
+PLAYER_SCALE = 1024.0   # the player: 1/1024 unit
+SCALE_SCALE = 1024.0    # size of a breaking cube
+LAVA_TTL_SCALE = 10.0   # lava countdown in 1/10 s, so a pool changes a few times a second
+DECODER_FRAMES = 64     # frames a decoder keeps while it only gets keyframes
+
+KEYFRAME, DELTA = 0, 1
+
+_HEAD = struct.Struct("<BBIIH")            # format, KEYFRAME/DELTA, tick, base tick, section mask
+_PLAYER = struct.Struct("<3i7fI")          # position, roll angle + axis, cam yaw/pitch/dist, vz,
+                                           # last movement command applied
+_STATUS = struct.Struct("<iHfiiiB")        # score, level, remaining, now/boost/popup ms, flags
+_COUNT = struct.Struct("<H")
+_ROWS = struct.Struct("<HH")               # removed keys, added or changed rows
+
+RUNNING, CHEAT, FIRST_PERSON, ON_GROUND = 1, 2, 4, 8
+
+# Packed blocks, then tables; a section's index is its bit in the mask.
+PLAYER, STATUS, POPUP, ENEMIES = range(4)
+GEMS, OBSTACLES, RECTS, SLOPES, TREASURE, LAVA, BREAKING = range(4, 11)
+_BLOCKS = 4
+_GEOMETRY = (OBSTACLES, RECTS, SLOPES)   # changes here bump st.geom_version
+
+def _q(v: float, scale: float = POS_SCALE) -> int:
+    return int(round(v * scale))
+
+def _ms(t: float) -> int:
+    return int(round(t * 1000.0))
+
+class _Table:
+    """One GameState list: struct of a row's key and of its value, and the
+    conversions between list items and (key, value)."""
+    def __init__(self, attr: str, key: str, value: str, row, item):
+        self.attr = attr
+        self.key = struct.Struct("<" + key)
+        self.row = struct.Struct("<" + key + value)
+        self.width = len(self.key.unpack(bytes(self.key.size)))
+        self.to_row = row    # list item -> (key, value)
+        self.to_item = item  # (key, value) -> list item
+
+_TABLES = {
+    OBSTACLES: _Table("obstacles", "hh", "",
+                      lambda o: ((_q(o[0]), _q(o[1])), ()),
+                      lambda k, v: (k[0] / POS_SCALE, k[1] / POS_SCALE)),
+    RECTS: _Table("obstacles_rect", "hhhhh", "",
+                  lambda r: (tuple(_q(c) for c in r), ()),
+                  lambda k, v: tuple(c / POS_SCALE for c in k)),
+    SLOPES: _Table("slopes", "hhBhhBh", "",
+                   lambda s: ((_q(s[0]), _q(s[1]), s[2] == 'y', _q(s[3]), _q(s[4]), s[5], _q(s[6])), ()),
+                   lambda k, v: (k[0] / POS_SCALE, k[1] / POS_SCALE, 'y' if k[2] else 'x',
+                                 k[3] / POS_SCALE, k[4] / POS_SCALE, k[5], k[6] / POS_SCALE)),
+    TREASURE: _Table("treasure_boxes", "hh", "",
+                     lambda b: ((_q(b[0]), _q(b[1])), ()),
+                     lambda k, v: (k[0] / POS_SCALE, k[1] / POS_SCALE, "")),
+    LAVA: _Table("lava_pools", "hhH", "H",
+                 lambda p: ((_q(p[0]), _q(p[1]), _q(p[2])), (_q(p[3], LAVA_TTL_SCALE),)),
+                 lambda k, v: (k[0] / POS_SCALE, k[1] / POS_SCALE, k[2] / POS_SCALE,
+                               v[0] / LAVA_TTL_SCALE)),
+    BREAKING: _Table("breaking_obs", "hh", "hH",
+                     lambda b: ((_q(b[0]), _q(b[1])), (_q(b[2], SCALE_SCALE), _ms(max(0.0, b[3])))),
+                     lambda k, v: (k[0] / POS_SCALE, k[1] / POS_SCALE,
+                                   v[0] / SCALE_SCALE, v[1] / 1000.0)),
+}
+_TABLES[GEMS] = _Table("gems", "hhB", "", None, None)   # x, y, palette kind
+
+_SECTIONS = GEMS + len(_TABLES)
+
+def input_seq(frame: "Frame") -> int:
+    """The last movement command the server had applied at frame."""
+    return _PLAYER.unpack_from(frame.blocks[PLAYER])[-1]
+
+def pack_enemies(qx: np.ndarray, qy: np.ndarray) -> bytes:
+    """The ENEMIES block from quantized positions."""
+    return _COUNT.pack(len(qx)) + qx.astype("<i2", copy=False).tobytes() + qy.astype("<i2", copy=False).tobytes()
+
+def unpack_enemies(block: bytes):
+    n = _COUNT.unpack_from(block)[0]
+    q = np.frombuffer(block, "<i2", 2 * n, _COUNT.size)
+    return q[:n], q[n:]
+
+class Frame:
+    """Everything a client draws at one server tick.  Frames are never
+    changed after they are built, so they can share tables and cross
+    threads."""
+    __slots__ = ("tick", "blocks", "tables", "geom_version")
+
+    def __init__(self, tick: int, blocks: List[bytes], tables: List[Dict[tuple, tuple]],
+                 geom_version: int = None):
+        self.tick = tick
+        self.blocks = blocks   # PLAYER .. ENEMIES, packed
+        self.tables = tables   # GEMS .. BREAKING, key -> value
+        self.geom_version = geom_version   # st.geom_version captured, server side
+
+def capture(st, tick: int, prev: Optional[Frame] = None, seq: int = 0) -> Frame:
+    """st as a Frame.  prev, the last frame captured from st, lends its
+    geometry tables while st.geom_version has not moved; seq is the last
+    movement command applied (prediction.py)."""
+    flags = ((RUNNING if st.running else 0) | (CHEAT if st.cheat_mode else 0)
+             | (FIRST_PERSON if st.first_person_mode else 0) | (ON_GROUND if st.on_ground else 0))
+    popup = st.popup_msg.encode()[:255]
+    xs, ys = st.enemies.positions()
+    blocks = [
+        _PLAYER.pack(_q(st.player_x, PLAYER_SCALE), _q(st.player_y, PLAYER_SCALE),
+                     _q(st.player_z, PLAYER_SCALE), st.roll_angle, st.roll_axis_x, st.roll_axis_y,
+                     st.cam_yaw, st.cam_pitch, st.cam_dist, st.vz, seq),
+        _STATUS.pack(st.score, st.level, st.remaining, _ms(st.clock.now),
+                     _ms(st.boost_until), _ms(st.popup_until), flags),
+        bytes((len(popup),)) + popup,
+        pack_enemies(np.rint(xs * POS_SCALE).astype("<i2"), np.rint(ys * POS_SCALE).astype("<i2")),
+    ]
+    gx, gy = st.gems.positions()
+    gems = dict.fromkeys(zip(np.rint(gx * POS_SCALE).astype(np.int16).tolist(),
+                             np.rint(gy * POS_SCALE).astype(np.int16).tolist(),
+                             st.gems.kinds().tolist()), ())
+    tables = [gems]
+    same_geometry = prev is not None and prev.geom_version == st.geom_version
+    for sec in range(OBSTACLES, _SECTIONS):
+        if same_geometry and sec in _GEOMETRY:
+            tables.append(prev.tables[sec - GEMS])
+        else:
+            tables.append(dict(map(_TABLES[sec].to_row, getattr(st, _TABLES[sec].attr))))
+    return Frame(tick, blocks, tables, st.geom_version)
+
+def _diff(old: Dict[tuple, tuple], new: Dict[tuple, tuple]):
+    """Keys gone from old, and the rows of new that are new or changed."""
+    removed = [k for k in old if k not in new]
+    changed = [(k, v) for k, v in new.items() if old.get(k) != v]
+    return removed, changed
+
+def encode(frame: Frame, base: Optional[Frame] = None) -> bytes:
+    """frame as a delta against base, the newest frame the client has
+    acknowledged, or as a keyframe if there is none."""
+    mask = 0
+    parts = [b""]
+    for sec, block in enumerate(frame.blocks):
+        if base is None or base.blocks[sec] != block:
+            mask |= 1 << sec
+            parts.append(block)
+    for i, table in enumerate(frame.tables):
+        sec = GEMS + i
+        old = {} if base is None else base.tables[i]
+        if base is not None and (old is table or old == table):
+            continue
+        mask |= 1 << sec
+        spec = _TABLES[sec]
+        removed, changed = _diff(old, table)
+        parts.append(_ROWS.pack(len(removed), len(changed)))
+        parts.extend(spec.key.pack(*k) for k in removed)
+        parts.extend(spec.row.pack(*k, *v) for k, v in changed)
+    parts[0] = _HEAD.pack(FORMAT, KEYFRAME if base is None else DELTA, frame.tick,
+                          frame.tick if base is None else base.tick, mask)
+    return b"".join(parts)
+
+class Decoder:
+    """Rebuilds Frames from a stream of keyframes and deltas.  Keeps the
+    frames a later delta may be based on: the server only moves its
+    baseline forward, so everything older than the last base is dropped.
+    A keyframe drops nothing; acks sent before it can still come back as
+    the base of a delta."""
+
+    def __init__(self):
+        self.frames: Dict[int, Frame] = {}
+
+    def decode(self, data: bytes) -> Frame:
+        fmt, kind, tick, base_tick, mask = _HEAD.unpack_from(data)
+        if fmt != FORMAT:
+            raise ValueError(f"unsupported snapshot format {fmt}")
+        if kind == KEYFRAME:
+            base = Frame(tick, [b""] * _BLOCKS, [{}] * len(_TABLES))
+        else:
+            base = self.frames.get(base_tick)
+            if base is None:
+                raise ValueError(f"delta against unknown snapshot {base_tick}")
+        data = memoryview(data)
+        off = _HEAD.size
+        blocks = list(base.blocks)
+        tables = list(base.tables)
+        for sec in range(_SECTIONS):
+            if not mask >> sec & 1:
+                continue
+            if sec == PLAYER or sec == STATUS:
+                size = (_PLAYER if sec == PLAYER else _STATUS).size
+            elif sec == POPUP:
+                size = 1 + data[off]
+            elif sec == ENEMIES:
+                size = _COUNT.size + 4 * _COUNT.unpack_from(data, off)[0]
+            else:
+                spec = _TABLES[sec]
+                n_removed, n_changed = _ROWS.unpack_from(data, off)
+                off += _ROWS.size
+                table = dict(tables[sec - GEMS])
+                end = off + n_removed * spec.key.size
+                for k in spec.key.iter_unpack(data[off:end]):
+                    table.pop(k, None)
+                off, end = end, end + n_changed * spec.row.size
+                w = spec.width
+                for row in spec.row.iter_unpack(data[off:end]):
+                    table[row[:w]] = row[w:]
+                tables[sec - GEMS] = table
+                off = end
+                continue
+            blocks[sec] = bytes(data[off:off + size])
+            off += size
+        frame = Frame(tick, blocks, tables)
+        frames = self.frames
+        if kind == DELTA:
+            for t in [t for t in frames if t < base_tick]:
+                del frames[t]
+        elif len(frames) >= DECODER_FRAMES:   # keyframes only: the server is not getting our acks
+            del frames[min(frames)]
+        frames[tick] = frame
+        return frame
+
+def _sync_list(items: list, old: Dict[tuple, tuple], new: Dict[tuple, tuple], to_item):
+    if not old:
+        items[:] = [to_item(k, v) for k, v in new.items()]
+        return
+    removed, changed = _diff(old, new)
+    try:
+        for k in removed:
+            items.remove(to_item(k, old[k]))
+        for k, v in changed:
+            if k in old:
+                items[items.index(to_item(k, old[k]))] = to_item(k, v)
+            else:
+                items.append(to_item(k, v))
+    except ValueError:   # st was edited behind our back; start over from the frame
+        items[:] = [to_item(k, v) for k, v in new.items()]
+
+def _sync_gems(gems, old: Dict[tuple, tuple], new: Dict[tuple, tuple]):
+    if not old:
+        gems.clear()
+    removed, changed = _diff(old, new)
+    if removed:
+        x, y = gems.positions()
+        kind = gems.kinds()
+        qx = np.rint(x * POS_SCALE).astype(np.int16)
+        qy = np.rint(y * POS_SCALE).astype(np.int16)
+        gone = set(removed)
+        gems.remove(np.array([i for i, k in enumerate(zip(qx.tolist(), qy.tolist(), kind.tolist()))
+                              if k in gone], np.intp))
+    for (qx, qy, kind), _ in changed:
+        gems.add(qx / POS_SCALE, qy / POS_SCALE, kind)
+
+def _apply_player(st, block: bytes):
+    (px, py, pz, st.roll_angle, st.roll_axis_x, st.roll_axis_y,
+     st.cam_yaw, st.cam_pitch, st.cam_dist, st.vz, _) = _PLAYER.unpack(block)
+    st.player_x, st.player_y, st.player_z = px / PLAYER_SCALE, py / PLAYER_SCALE, pz / PLAYER_SCALE
+
+def _apply_status(st, block: bytes):
+    st.score, st.level, st.remaining, now, boost, popup, flags = _STATUS.unpack(block)
+    st.clock.now, st.boost_until, st.popup_until = now / 1000.0, boost / 1000.0, popup / 1000.0
+    st.running = bool(flags & RUNNING)
+    st.cheat_mode = bool(flags & CHEAT)
+    st.first_person_mode = bool(flags & FIRST_PERSON)
+    st.on_ground = bool(flags & ON_GROUND)
+
+def apply_player(st, frame: Frame):
+    """Set the player and status blocks of frame on st whatever st holds
+    now: a predicting client has moved its player past the frame it last
+    showed, so an unchanged block does not mean st already matches it."""
+    _apply_player(st, frame.blocks[PLAYER])
+    _apply_status(st, frame.blocks[STATUS])
+
+def apply(st, frame: Frame, shown: Optional[Frame] = None):
+    """Make st look like frame, editing only what differs from shown, the
+    frame st was last synced to.  With shown None every list is rewritten."""
+    blocks = frame.blocks
+    old_blocks = shown.blocks if shown is not None else [b""] * _BLOCKS
+    if blocks[PLAYER] != old_blocks[PLAYER]:
+        _apply_player(st, blocks[PLAYER])
+    if blocks[STATUS] != old_blocks[STATUS]:
+        _apply_status(st, blocks[STATUS])
+    if blocks[POPUP] != old_blocks[POPUP]:
+        st.popup_msg = blocks[POPUP][1:].decode(errors="replace")
+    if blocks[ENEMIES] != old_blocks[ENEMIES]:
+        qx, qy = unpack_enemies(blocks[ENEMIES])
+        enemies = st.enemies
+        enemies.clear()
+        for x, y in zip((qx / POS_SCALE).tolist(), (qy / POS_SCALE).tolist()):
+            enemies.spawn(x, y)
+
+    geometry = False
+    for i, new in enumerate(frame.tables):
+        old = shown.tables[i] if shown is not None else {}
+        if old is new:
+            continue
+        sec = GEMS + i
+        if sec == GEMS:
+            _sync_gems(st.gems, old, new)
+        else:
+            _sync_list(getattr(st, _TABLES[sec].attr), old, new, _TABLES[sec].to_item)
+            geometry = geometry or sec in _GEOMETRY
+    if geometry:
+        st.geom_version += 1
+
+def bench(preset: str, ticks: int, every: int = 2):
+    """Play ticks steps with the greedy bot, snapshotting every few, and
+    time each stage against a mirror GameState."""
+    from .batch_runner import greedy_policy
+    from .headless import load_module, new_game
+    module = load_module(preset)
+    st = new_game(module, seed=1)
+    mirror = module.GameState()
+    policy = greedy_policy(1)
+    decoder = Decoder()
+    base = shown = prev = None
+    t_capture = t_encode = t_decode = t_apply = 0.0
+    key_bytes = delta_bytes = sent = 0
+    for tick in range(1, ticks + 1):
+        policy(st)
+        st.step(1.0 / 60.0)
+        if tick % every:
+            continue
+        t0 = time.perf_counter()
+        frame = prev = capture(st, tick, prev)
+        t1 = time.perf_counter()
+        data = encode(frame, base)
+        t2 = time.perf_counter()
+        got = decoder.decode(data)
+        t3 = time.perf_counter()
+        apply(mirror, got, shown)
+        t4 = time.perf_counter()
+        t_capture += t1 - t0; t_encode += t2 - t1; t_decode += t3 - t2; t_apply += t4 - t3
+        key_bytes += len(encode(frame))
+        delta_bytes += len(data)
+        sent += 1
+        base, shown = frame, got
+    us = 1e6 / sent
+    print(f"{preset}: {sent} snapshots, keyframe {key_bytes / sent:.0f} B, delta {delta_bytes / sent:.0f} B")
+    print(f"capture {t_capture * us:.1f} us, encode {t_encode * us:.1f} us, "
+          f"decode {t_decode * us:.1f} us, apply {t_apply * us:.1f} us per snapshot")
+
+def main():
+    from .presets import PRESETS
+    ap = argparse.ArgumentParser(description="Time snapshot capture, encode and decode.")
+    ap.add_argument("--preset", default="final", choices=sorted(PRESETS))
+    ap.add_argument("--ticks", type=int, default=3000)
+    args = ap.parse_args()
+    bench(args.preset, args.ticks)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""Batched NumPy environment: N independent gem-collecting games stepped at once.
+
+Meant for training and evaluating bots, not for rendering.  Every piece of
+per-game state lives in an array with one row per environment, and
+try_move, collect_overlaps, in_lava and the jump physics of the full-feature
+build are re-expressed as array operations over all rows together, so a
+step costs a handful of NumPy calls whether N is 1 or 10,000.
+
+Actions are input bitmasks, the same keys on_key understands:
+
+    IN_W | IN_A   -> walk forward-left,   IN_JUMP -> jump (when on the ground)
+
+Movement is relative to a per-environment camera yaw (0 by default, i.e.
+w moves along +x, a along +y, as in the game with an untouched camera).
+
+The world per environment is fixed-size: INITIAL_CUBES cubes, N_GEMS
+regular gems and, as the game has them, N_RECTS raised blocks and one
+stepped slope with a TOP_GEM_TYPE gem on top (TERRAIN) and MAX_LAVA lava
+pool slots (LAVA).  Without TERRAIN cubes cannot be climbed or smashed and
+the ground is flat.  Level-ups come every LEVEL_GEMS gems and award the
+bonus score and time but do not add geometry.  Treasure boxes, the enemy
+and LEVEL_MODE "score" are not simulated.
+
+Every setting is read from game.py as loaded for a preset and overrides
+(headless.load_module), so the environment plays the variant asked for.
+
+    env = VecEnv(4096, seed=0, preset="full", overrides={"LAVA_DPS": 10.0})
+    obs = env.reset()
+    obs, reward, done = env.step(actions)
+"""
+import numpy as np
+
+from .headless import load_module
+
+N_RECTS = 4
+N_GEMS = 8
+
+IN_W, IN_S, IN_A, IN_D, IN_JUMP = 1, 2, 4, 8, 16
+
+OBS_PLAYER = 6   # x, y, z, vz, remaining, boost left
+OBS_PER_GEM = 4  # dx, dy, points, is boost
+
+class VecEnv:
+    def __init__(self, num_envs: int, seed: int = 0, dt: float = 1.0 / 60.0,
+                 preset: str = "full", overrides: dict = None):
+        self.g = g = load_module(preset, overrides)
+        self.extent = g.GRID_SIZE * g.CELL
+        self.gem_points = tuple(points for _, _, points in g.GEM_TYPES)
+        self.top_points = g.TOP_GEM_TYPE[2]
+        self.n_cubes = g.INITIAL_CUBES
+        self.n_rects = N_RECTS if g.TERRAIN else 0
+        self.n_top = 1 if g.TERRAIN else 0   # gem slot 0 starts on top of the slope
+        self.n_lava = g.MAX_LAVA if g.LAVA else 0
+        self.n = num_envs
+        self.dt = dt
+        self.rng = np.random.default_rng(seed)
+        self.yaw = np.zeros(num_envs, np.float32)
+        n, f32 = num_envs, np.float32
+        k = N_GEMS + self.n_top
+
+        self.px = np.zeros(n, f32); self.py = np.zeros(n, f32)
+        self.pz = np.full(n, g.PLAYER_RADIUS, f32); self.vz = np.zeros(n, f32)
+        self.on_ground = np.ones(n, bool)
+        self.boost_left = np.zeros(n, f32)
+        self.remaining = np.full(n, g.START_TIME, f32)
+        self.score = np.zeros(n, np.int32)
+        self.level = np.ones(n, np.int32)
+        self.gems_collected = np.zeros(n, np.int32)
+        self.lava_accum = np.zeros(n, f32)
+        self.done = np.zeros(n, bool)
+
+        c, r = self.n_cubes, self.n_rects
+        self.cx = np.zeros((n, c), f32); self.cy = np.zeros((n, c), f32)
+        self.cube_alive = np.ones((n, c), bool)
+        self.rx = np.zeros((n, r), f32); self.ry = np.zeros((n, r), f32)
+        self.rsx = np.zeros((n, r), f32); self.rsy = np.zeros((n, r), f32)
+        self.rsz = np.zeros((n, r), f32)
+        # slope footprint as an axis-aligned box plus its stair parameters
+        self.sx = np.zeros(n, f32); self.sy = np.zeros(n, f32)
+        self.s_along_x = np.zeros(n, bool)
+        self.s_len = np.zeros(n, f32); self.s_wid = np.zeros(n, f32)
+        self.s_steps = np.zeros(n, np.int32); self.s_step_h = np.zeros(n, f32)
+
+        self.gx = np.zeros((n, k), f32); self.gy = np.zeros((n, k), f32)
+        self.gpts = np.zeros((n, k), np.int32); self.gboost = np.zeros((n, k), bool)
+
+        l = self.n_lava
+        self.lx = np.zeros((n, l), f32); self.ly = np.zeros((n, l), f32)
+        self.lr = np.zeros((n, l), f32); self.lt = np.zeros((n, l), f32)
+
+    @property
+    def obs_size(self) -> int:
+        return OBS_PLAYER + OBS_PER_GEM * (N_GEMS + self.n_top)
+
+    # ---------- world generation ----------
+    def _rand_cells(self, shape):
+        g = self.g
+        return (self.rng.integers(-g.GRID_SIZE, g.GRID_SIZE + 1, shape) * g.CELL).astype(np.float32)
+
+    def _rand_xy_avoiding_player(self, rows, k, min_dist):
+        # rand_xy_avoiding_player for k points in each of the given rows
+        x = self._rand_cells((len(rows), k)); y = self._rand_cells((len(rows), k))
+        for _ in range(32):
+            bad = (x - self.px[rows, None])**2 + (y - self.py[rows, None])**2 <= min_dist*min_dist
+            if not bad.any():
+                break
+            x[bad] = self._rand_cells(bad.sum()); y[bad] = self._rand_cells(bad.sum())
+        return x, y
+
+    def _free_xy(self, rows, k, min_dist):
+        # rand_xy_avoiding_player, re-rolled while pos_hits_any_obstacle
+        x, y = self._rand_xy_avoiding_player(rows, k, min_dist)
+        for _ in range(32):
+            bad = self._hits_obstacle(rows, x, y) | (
+                (x - self.px[rows, None])**2 + (y - self.py[rows, None])**2 <= min_dist*min_dist)
+            if not bad.any():
+                break
+            x[bad] = self._rand_cells(bad.sum()); y[bad] = self._rand_cells(bad.sum())
+        return x, y
+
+    def _roll_gems(self, rows, cols):
+        # gem type for every (row, col) pair, as spawn_gem picks it
+        g = self.g
+        m = len(rows)
+        boost = self.rng.random(m) < g.BOOST_CHANCE
+        pts = np.asarray(self.gem_points, np.int32)[self.rng.integers(0, len(self.gem_points), m)]
+        self.gboost[rows, cols] = boost
+        self.gpts[rows, cols] = np.where(boost, 0, pts)
+
+    def _respawn_gems(self, mask):
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return
+        x, y = self._free_xy(rows, 1, 1.0)
+        self.gx[rows, cols] = x[:, 0]; self.gy[rows, cols] = y[:, 0]
+        self._roll_gems(rows, cols)
+
+    def _spawn_lava(self, mask):
+        g = self.g
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return
+        x, y = self._free_xy(rows, 1, 5.0)
+        m = len(rows)
+        self.lx[rows, cols] = x[:, 0]; self.ly[rows, cols] = y[:, 0]
+        self.lr[rows, cols] = self.rng.uniform(g.LAVA_MIN_R, g.LAVA_MAX_R, m)
+        self.lt[rows, cols] = self.rng.uniform(g.LAVA_TTL*0.8, g.LAVA_TTL*1.2, m)
+
+    def reset(self, mask=None) -> np.ndarray:
+        """Start new games in the masked environments (all of them by default)."""
+        g = self.g
+        if mask is None:
+            mask = np.ones(self.n, bool)
+        rows = np.nonzero(mask)[0]
+        m = len(rows)
+        if m:
+            self.px[rows] = 0.0; self.py[rows] = 0.0
+            self.pz[rows] = g.PLAYER_RADIUS; self.vz[rows] = 0.0
+            self.on_ground[rows] = True
+            self.boost_left[rows] = 0.0
+            self.remaining[rows] = g.START_TIME
+            self.score[rows] = 0; self.level[rows] = 1; self.gems_collected[rows] = 0
+            self.lava_accum[rows] = 0.0
+            self.done[rows] = False
+
+            self.cx[rows], self.cy[rows] = self._rand_xy_avoiding_player(rows, self.n_cubes, 4.0)
+            self.cube_alive[rows] = True
+            if g.TERRAIN:
+                r = self.n_rects
+                self.rx[rows], self.ry[rows] = self._rand_xy_avoiding_player(rows, r, 3.0)
+                self.rsx[rows] = self.rng.uniform(1.2, 3.0, (m, r))
+                self.rsy[rows] = self.rng.uniform(0.8, 2.2, (m, r))
+                self.rsz[rows] = self.rng.uniform(1.0, 2.0, (m, r))
+
+                self.s_len[rows] = 0.0  # no slope while placing it
+                sx, sy = self._free_xy(rows, 1, 6.0)
+                self.sx[rows] = sx[:, 0]; self.sy[rows] = sy[:, 0]
+                self.s_along_x[rows] = self.rng.random(m) < 0.5
+                self.s_len[rows] = self.rng.uniform(4.0, 7.0, m)
+                self.s_wid[rows] = self.rng.uniform(1.2, 2.0, m)
+                self.s_steps[rows] = self.rng.integers(4, 7, m)
+                self.s_step_h[rows] = self.rng.uniform(0.35, 0.55, m)
+
+                half = self.s_len[rows] * 0.5
+                along = self.s_along_x[rows]
+                self.gx[rows, 0] = np.where(along, self.sx[rows] + half, self.sx[rows])
+                self.gy[rows, 0] = np.where(along, self.sy[rows], self.sy[rows] + half)
+                self.gpts[rows, 0] = self.top_points; self.gboost[rows, 0] = False
+            gem_mask = np.zeros_like(self.gboost); gem_mask[rows, self.n_top:] = True
+            self._respawn_gems(gem_mask)
+
+            if self.n_lava:
+                self.lt[rows] = 0.0
+                lava_mask = np.zeros_like(self.lt, bool)
+                lava_mask[rows, :min(g.LAVA_BASE, self.n_lava)] = True
+                self._spawn_lava(lava_mask)
+        return self.observe()
+
+    # ---------- vectorized game rules ----------
+    def _slope_height(self, rows, x, y):
+        # slope_height_at for points x, y of shape (len(rows),) or (len(rows), k)
+        extra = (slice(None),) + (None,) * (np.ndim(x) - 1)
+        sx, sy = self.sx[rows][extra], self.sy[rows][extra]
+        along = self.s_along_x[rows][extra]
+        length, width = self.s_len[rows][extra], self.s_wid[rows][extra]
+        steps, step_h = self.s_steps[rows][extra], self.s_step_h[rows][extra]
+        off = np.where(along, np.abs(y - sy), np.abs(x - sx))
+        t = np.where(along, x - (sx - length*0.5), y - (sy - length*0.5)) / np.maximum(length, 1e-6)
+        inside = (off <= width*0.5) & (t >= 0.0) & (t <= 1.0) & (length > 0.0)
+        idx = np.clip(np.floor(t * steps).astype(np.int32), 0, steps - 1)
+        return np.where(inside, (idx + 1) * step_h, 0.0)
+
+    def _slope_box(self, rows):
+        along = self.s_along_x[rows]
+        return (np.where(along, self.s_len[rows], self.s_wid[rows]),
+                np.where(along, self.s_wid[rows], self.s_len[rows]))
+
+    def _hits_obstacle(self, rows, x, y):
+        # pos_hits_any_obstacle for points of shape (len(rows), k)
+        g = self.g
+        r = g.GEM_RADIUS
+        xc, yc = x[:, :, None], y[:, :, None]
+        hit = ((np.abs(xc - self.cx[rows, None]) <= r + g.OBSTACLE_SIZE*0.5) &
+               (np.abs(yc - self.cy[rows, None]) <= r + g.OBSTACLE_SIZE*0.5) &
+               self.cube_alive[rows, None]).any(2)
+        hit |= ((np.abs(xc - self.rx[rows, None]) <= r + self.rsx[rows, None]*0.5) &
+                (np.abs(yc - self.ry[rows, None]) <= r + self.rsy[rows, None]*0.5)).any(2)
+        bx, by = self._slope_box(rows)
+        hit |= ((np.abs(x - self.sx[rows, None]) <= bx[:, None]*0.5) &
+                (np.abs(y - self.sy[rows, None]) <= by[:, None]*0.5) & (self.s_len[rows, None] > 0.0))
+        return hit
+
+    def ground_height(self, x, y):
+        """ground_height_at for one point per environment."""
+        g = self.g
+        if not g.TERRAIN:
+            return np.zeros(self.n, np.float32)
+        half = (g.PLAYER_DIAM + g.OBSTACLE_SIZE) * 0.5
+        cube = ((np.abs(x[:, None] - self.cx) <= half) & (np.abs(y[:, None] - self.cy) <= half) &
+                self.cube_alive).any(1)
+        h = np.where(cube, 1.0, 0.0).astype(np.float32)
+        rect = ((np.abs(x[:, None] - self.rx) <= (g.PLAYER_DIAM + self.rsx)*0.5) &
+                (np.abs(y[:, None] - self.ry) <= (g.PLAYER_DIAM + self.rsy)*0.5))
+        h = np.maximum(h, np.where(rect, self.rsz, 0.0).max(1))
+        return np.maximum(h, self._slope_height(np.arange(self.n), x, y))
+
+    def try_move(self, dx, dy, active):
+        """try_move for every environment at once."""
+        g = self.g
+        ext = self.extent
+        px, py, pz = self.px, self.py, self.pz
+        nx = np.clip(px + dx, -ext, ext); ny = np.clip(py + dy, -ext, ext)
+        boosting = self.boost_left > 0.0
+
+        half = (g.PLAYER_DIAM + g.OBSTACLE_SIZE) * 0.5
+        ox = np.abs(self.cx - nx[:, None]) <= half; oy = np.abs(self.cy - py[:, None]) <= half
+        qx = np.abs(self.cx - px[:, None]) <= half; qy = np.abs(self.cy - ny[:, None]) <= half
+        hit_x = ox & oy & self.cube_alive & active[:, None]
+        hit_y = qx & qy & self.cube_alive & active[:, None]
+        if not g.TERRAIN:   # cubes are walls: no climbing, no smashing
+            self.px = np.where(active & ~hit_x.any(1), nx, px)
+            self.py = np.where(active & ~hit_y.any(1), ny, py)
+            return
+        smash = (hit_x | hit_y) & boosting[:, None]
+        self.cube_alive &= ~smash
+        low = (pz < 1.0 + g.PLAYER_RADIUS - g.CLIMB_MARGIN)[:, None] & ~boosting[:, None]
+        blocked_x = (hit_x & low).any(1); blocked_y = (hit_y & low).any(1)
+
+        rhx, rhy = (g.PLAYER_DIAM + self.rsx)*0.5, (g.PLAYER_DIAM + self.rsy)*0.5
+        low = pz[:, None] < self.rsz + g.PLAYER_RADIUS - g.CLIMB_MARGIN
+        blocked_x |= ((np.abs(nx[:, None] - self.rx) <= rhx) & (np.abs(py[:, None] - self.ry) <= rhy) & low).any(1)
+        blocked_y |= ((np.abs(px[:, None] - self.rx) <= rhx) & (np.abs(ny[:, None] - self.ry) <= rhy) & low).any(1)
+
+        bx, by = self._slope_box(np.arange(self.n))
+        shx, shy = (g.PLAYER_DIAM + bx)*0.5, (g.PLAYER_DIAM + by)*0.5
+        has = self.s_len > 0.0
+        fx = has & (np.abs(nx - self.sx) <= shx) & (np.abs(py - self.sy) <= shy)
+        fy = has & (np.abs(px - self.sx) <= shx) & (np.abs(ny - self.sy) <= shy)
+        all_rows = np.arange(self.n)
+        blocked_x |= fx & (pz < self._slope_height(all_rows, nx, py) + g.PLAYER_RADIUS - g.CLIMB_MARGIN)
+        blocked_y |= fy & (pz < self._slope_height(all_rows, px, ny) + g.PLAYER_RADIUS - g.CLIMB_MARGIN)
+
+        self.px = np.where(active & ~blocked_x, nx, px)
+        self.py = np.where(active & ~blocked_y, ny, py)
+
+    def in_lava(self):
+        """in_lava for every environment's player."""
+        g = self.g
+        alive = self.lt > 0.0
+        d2 = (self.lx - self.px[:, None])**2 + (self.ly - self.py[:, None])**2
+        return ((d2 <= (self.lr + g.PLAYER_RADIUS*0.2)**2) & alive).any(1)
+
+    def collect_overlaps(self) -> np.ndarray:
+        """collect_overlaps for gems; returns points gained per environment."""
+        g = self.g
+        d2 = (self.gx - self.px[:, None])**2 + (self.gy - self.py[:, None])**2
+        hit = (d2 <= (g.PLAYER_RADIUS + g.GEM_RADIUS)**2) & ~self.done[:, None]
+        gained = np.where(hit & ~self.gboost, self.gpts, 0).sum(1).astype(np.int32)
+        self.boost_left = np.where((hit & self.gboost).any(1), g.BOOST_DURATION, self.boost_left).astype(np.float32)
+        n_hit = hit.sum(1).astype(np.int32)
+        before = self.gems_collected // g.LEVEL_GEMS
+        self.gems_collected += n_hit
+        level_ups = self.gems_collected // g.LEVEL_GEMS - before
+        self.level += level_ups
+        gained += 50 * level_ups
+        self.remaining += 20.0 * level_ups
+        self.score += gained
+        self._respawn_gems(hit)
+        return gained
+
+    def step(self, actions: np.ndarray):
+        """Advance every environment by dt; returns (obs, reward, done).
+
+        Environments that finished are reported done once and restarted on
+        the following step.
+        """
+        g = self.g
+        self.reset(self.done)
+        dt = self.dt
+        actions = np.asarray(actions)
+        score_before = self.score.copy()
+        running = ~self.done
+
+        jump = ((actions & IN_JUMP) != 0) & self.on_ground & running
+        self.vz = np.where(jump, g.JUMP_V0, self.vz).astype(np.float32)
+        self.on_ground &= ~jump
+
+        self.remaining = np.maximum(0.0, self.remaining - dt).astype(np.float32)
+        running &= self.remaining > 0.0
+        speed = np.where(self.boost_left > 0.0, g.BASE_SPEED * g.BOOST_MULTIPLIER, g.BASE_SPEED)
+
+        move_y = ((actions & IN_W) != 0).astype(np.float32) - ((actions & IN_S) != 0)
+        move_x = ((actions & IN_A) != 0).astype(np.float32) - ((actions & IN_D) != 0)
+        mag = np.hypot(move_x, move_y)
+        moving = running & (mag > 0.0)
+        mag = np.where(mag > 0.0, mag, 1.0)
+        move_x /= mag; move_y /= mag
+        fwdx, fwdy = np.cos(np.radians(self.yaw)), np.sin(np.radians(self.yaw))
+        dirx = fwdx*move_y - fwdy*move_x
+        diry = fwdy*move_y + fwdx*move_x
+        self.try_move(dirx * speed * dt, diry * speed * dt, moving)
+
+        if self.n_lava:
+            # The game applies LAVA_SLOW_MULT after moving, so lava only costs score.
+            lava = self.in_lava()
+            self.lava_accum += np.where(lava, g.LAVA_DPS * dt, 0.0).astype(np.float32)
+            dec = np.floor(self.lava_accum).astype(np.int32)
+            self.score = np.maximum(0, self.score - dec)
+            self.lava_accum -= dec
+
+            self.lt -= dt
+            target = np.minimum(self.n_lava, g.LAVA_BASE + self.level // 2)
+            self._spawn_lava((self.lt <= 0.0) & (np.arange(self.n_lava) < target[:, None]))
+
+        gh = self.ground_height(self.px, self.py)
+        air = ~self.on_ground
+        self.vz = np.where(air, self.vz + g.GRAVITY * dt, self.vz).astype(np.float32)
+        z_air = self.pz + self.vz * dt
+        land = air & (z_air <= gh + g.PLAYER_RADIUS + 1e-4)
+        self.pz = np.where(air & ~land, z_air, gh + g.PLAYER_RADIUS).astype(np.float32)
+        self.vz = np.where(land, 0.0, self.vz).astype(np.float32)
+        self.on_ground |= land
+
+        self.collect_overlaps()
+        self.boost_left = np.maximum(0.0, self.boost_left - dt).astype(np.float32)
+
+        self.done = ~running
+        reward = (self.score - score_before).astype(np.float32)
+        return self.observe(), reward, self.done.copy()
+
+    def observe(self) -> np.ndarray:
+        g = self.g
+        obs = np.empty((self.n, self.obs_size), np.float32)
+        obs[:, 0] = self.px / self.extent
+        obs[:, 1] = self.py / self.extent
+        obs[:, 2] = self.pz
+        obs[:, 3] = self.vz / g.JUMP_V0
+        obs[:, 4] = self.remaining / g.START_TIME
+        obs[:, 5] = self.boost_left / g.BOOST_DURATION
+        gems = obs[:, OBS_PLAYER:].reshape(self.n, N_GEMS + self.n_top, OBS_PER_GEM)
+        gems[:, :, 0] = (self.gx - self.px[:, None]) / self.extent
+        gems[:, :, 1] = (self.gy - self.py[:, None]) / self.extent
+        gems[:, :, 2] = self.gpts / self.top_points
+        gems[:, :, 3] = self.gboost
+        return obs